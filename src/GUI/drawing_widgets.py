@@ -1,24 +1,47 @@
-import time
+import math
 
 import matplotlib
 matplotlib.use('QtAgg')
+import numpy as np
 
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
 from matplotlib.figure import Figure
 
 from PyQt6.QtCore import (
     QObject,
+    QRectF,
     QRunnable,
+    QThreadPool,
+    QTimer,
+    Qt,
     pyqtSignal,
     pyqtSlot
 )
+from PyQt6.QtGui import (
+    QImage,
+    QPainter
+)
+from PyQt6.QtWidgets import QWidget
 
 from wfc.utils import show_tiles
-from wfc.wfc import WFC
+from wfc.wfc import (
+    WFC,
+    CancellationToken,
+    StepProgress
+)
 
-from typing import TypeAlias
+from numpy.typing import NDArray
+from typing import (
+    Literal,
+    Optional,
+    TypeAlias
+)
 
 ms: TypeAlias = int
+# cells in view as row and column slices, and the level of detail
+Viewport: TypeAlias = tuple[slice, slice, Literal['tile', 'cell']]
+# cells covered by an image as (row_start, col_start, row_stop, col_stop)
+Region: TypeAlias = tuple[int, int, int, int]
 
 class MplCanvas(FigureCanvasQTAgg):
     def __init__(self, width=8, height=5, dpi=100):
@@ -42,57 +65,253 @@ class MplCanvas(FigureCanvasQTAgg):
         show_tiles(tiles, ax=self.ax)
 
 
+class ImageCanvas(QWidget):
+    """
+    Widget for showing frames of the animation. The RGB frame is wrapped
+    in a QImage without copying and painted scaled with nearest-neighbour,
+    keeping the aspect ratio.
+
+    Once the dimension of the grid is known through `set_grid`, the view can be
+    zoomed with the mouse wheel, panned by dragging and fitted back to the widget
+    by double-clicking. Frames then only need to cover the visible cells, see
+    `viewport` and `render_viewport`.
+    """
+    view_changed=pyqtSignal()
+    def __init__(self):
+        super().__init__()
+        self._frame = None
+        self._image = None
+        self._region = None
+        self._shape = None
+        self._tile_px = 1
+        # pixels per cell and the cell at the middle of the widget, None to fit the grid
+        self._zoom = None
+        self._centre = None
+        self._drag = None
+
+    def set_grid(self, shape: tuple[int, int], tile_px: int):
+        """
+        Set the dimension of the grid in cells and the size of its tiles in pixels.
+        The view is fitted to the widget.
+        """
+        self._shape = shape
+        self._tile_px = tile_px
+        self._zoom = self._centre = None
+        self.view_changed.emit()
+
+    def show_image(self, image: NDArray, region: Optional[Region] = None):
+        """
+        Show an image of the cells in `region`, given as `(row_start, col_start, row_stop, col_stop)`.
+        `None` means the image covers the whole grid.
+        """
+        # the QImage only references the array, so keep it alive with the widget
+        self._frame = np.ascontiguousarray(image, dtype='uint8')
+        height, width = self._frame.shape[:2]
+        self._image = QImage(self._frame.data, width, height,
+                             self._frame.strides[0], QImage.Format.Format_RGB888)
+        self._region = region
+        self.update()
+
+    def _fit(self) -> float:
+        return min(self.width() / self._shape[1], self.height() / self._shape[0])
+
+    def _view(self) -> tuple[float, float, float]:
+        """
+        The zoom and the centre of the view, in cells.
+        """
+        if self._zoom is None:
+            return self._fit(), self._shape[0] / 2, self._shape[1] / 2
+        return self._zoom, *self._centre
+
+    def viewport(self) -> Optional[Viewport]:
+        """
+        The cells in view as a pair of slices and the level of detail to render them
+        with. When a cell is drawn smaller than half of its tile, every cell is drawn
+        as a pixel of its average colour and only every few cells are kept when
+        cells are smaller than a pixel. This is `None` if no grid is set.
+        """
+        if self._shape is None: return None
+        zoom, row, col = self._view()
+        lod = 'tile' if zoom >= self._tile_px / 2 else 'cell'
+        stride = 1 if lod == 'tile' else max(1, math.ceil(1 / zoom))
+
+        def _span(centre: float, length: int, cells: int) -> slice:
+            start = max(0, math.floor(centre - length / 2 / zoom))
+            stop = min(cells, math.ceil(centre + length / 2 / zoom))
+            # align to the stride so that panning does not change the sampled cells
+            start -= start % stride
+            return slice(start, max(stop, start + 1), stride)
+        return (_span(row, self.height(), self._shape[0]),
+                _span(col, self.width(), self._shape[1]),
+                lod)
+
+    def paintEvent(self, event):
+        if self._image is None: return
+
+        if self._shape is None:
+            scale = min(self.width() / self._image.width(), self.height() / self._image.height())
+            width, height = self._image.width() * scale, self._image.height() * scale
+            target = QRectF((self.width() - width) / 2, (self.height() - height) / 2, width, height)
+        else:
+            zoom, row, col = self._view()
+            top, left, bottom, right = self._region or (0, 0, *self._shape)
+            target = QRectF(self.width() / 2 + (left - col) * zoom,
+                            self.height() / 2 + (top - row) * zoom,
+                            (right - left) * zoom, (bottom - top) * zoom)
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+        painter.drawImage(target, self._image)
+        painter.end()
+
+    def wheelEvent(self, event):
+        if self._shape is None: return
+        zoom, row, col = self._view()
+        fit = self._fit()
+        new_zoom = zoom * 1.25 ** (event.angleDelta().y() / 120)
+        new_zoom = min(max(new_zoom, fit / 2), max(fit, 8 * self._tile_px))
+
+        # keep the cell under the cursor in place
+        x, y = event.position().x() - self.width() / 2, event.position().y() - self.height() / 2
+        self._centre = row + y / zoom - y / new_zoom, col + x / zoom - x / new_zoom
+        self._zoom = new_zoom
+        self.update()
+        self.view_changed.emit()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton: self._drag = event.position()
+
+    def mouseMoveEvent(self, event):
+        if self._drag is None or self._shape is None: return
+        zoom, row, col = self._view()
+        delta = event.position() - self._drag
+        self._drag = event.position()
+        self._zoom = zoom
+        self._centre = row - delta.y() / zoom, col - delta.x() / zoom
+        self.update()
+        self.view_changed.emit()
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton: self._drag = None
+
+    def mouseDoubleClickEvent(self, event):
+        if self._shape is None: return
+        self._zoom = self._centre = None
+        self.update()
+        self.view_changed.emit()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if not self._shape is None: self.view_changed.emit()
+
+
+def render_viewport(wfc: WFC, viewport: Viewport) -> tuple[NDArray, Region]:
+    """
+    Render the cells of a viewport given by `ImageCanvas.viewport`.
+
+    :return: The image and the region of cells it covers, for `ImageCanvas.show_image`.
+    :rtype: tuple[numpy.NDArray, tuple[int, int, int, int]]
+    """
+    rows, cols, lod = viewport
+    image = wfc.view(rows, cols, lod)
+    n_rows = len(range(rows.start, rows.stop, rows.step))
+    n_cols = len(range(cols.start, cols.stop, cols.step))
+    return image, (rows.start, cols.start,
+                   rows.start + n_rows * rows.step, cols.start + n_cols * cols.step)
+
+
 class _AnimatorSignals(QObject):
     finished=pyqtSignal()
+    cancelled=pyqtSignal()
 
 class Animator(QRunnable):
-    def __init__(self, canvas: MplCanvas, wfc: WFC, interval: ms):
+    """
+    Runs the wave function collapse in a worker thread as fast as possible.
+    The worker only publishes its latest frame, which the GUI thread
+    picks up every `interval` milliseconds. Frames produced in between are dropped,
+    so drawing never slows down the solver.
+
+    If the object does not render frames itself (`WFC.frames` is False), the worker
+    instead renders the viewport of the canvas once per `interval`, so drawing
+    only costs as much as the cells in view.
+    """
+    def __init__(self, canvas: ImageCanvas, wfc: WFC, interval: ms):
         super().__init__()
         self._canvas = canvas
         self._wfc = wfc
-        self._sleep_int = interval
         self._signal = _AnimatorSignals()
-        self._kill = False
+        self._token = CancellationToken()
+        self._running = False
+
+        # latest (image, region) published by the worker and the last one drawn
+        self._frame = None
+        self._shown = None
+        # viewport of the canvas and whether the worker should render it
+        self._viewport = None
+        self._requested = False
+        self._timer = QTimer()
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._present)
 
         self.setAutoDelete(False)
 
+    def start(self, threadpool: QThreadPool):
+        if self._running: return
+        self._token = CancellationToken()
+        self._running = True
+        self._viewport = self._canvas.viewport()
+        self._requested = False
+        self._timer.start()
+        threadpool.start(self)
+
+    def _render(self) -> tuple[NDArray, Optional[Region]]:
+        viewport = self._viewport
+        if viewport is None: return self._wfc.wfc_result[1], None
+        return render_viewport(self._wfc, viewport)
+
     @pyqtSlot()
     def run(self):
-        self._kill = False
-        axes_image = None
-        try: image = next(self._wfc)
-        except StopIteration:
-            image = self._wfc.wfc_result[1]
-            self._about_to_finish()
-
-        while not self._kill:
-            if axes_image is None:
-                axes_image, ax = self._canvas.show_image(image)
-                self._canvas.draw()
-            else:
-                axes_image.set_data(image)
-                ax.draw_artist(axes_image)
-                self._canvas.blit(ax.bbox)
-
-            if self._sleep_int > 0: time.sleep(self._sleep_int / 1000)
-
-            try: image = next(self._wfc)
-            except StopIteration:
-                image = self._wfc.wfc_result[1]
-                self._about_to_finish()
+        progress = StepProgress(0, None, False)
+        try:
+            while not (progress.finished or self._token.is_cancelled):
+                progress = self._wfc.step(1, token=self._token)
+                if not progress.image is None:
+                    self._frame = progress.image, None
+                elif self._requested and progress.steps:
+                    self._requested = False
+                    self._frame = self._render()
+            if progress.finished:
+                self._frame = (self._wfc.wfc_result[1], None) if self._wfc.frames else self._render()
+        finally:
+            self._running = False
+        # emitted once the worker no longer touches the WFC
+        if progress.finished: self._signal.finished.emit()
+        else: self._signal.cancelled.emit()
+
+    def _present(self):
+        # read the flag before the frame, a stopped worker has already published its last frame
+        running = self._running
+        frame = self._frame
+        self._viewport = self._canvas.viewport()
+        self._requested = True
+        if not frame is self._shown:
+            self._canvas.show_image(*frame)
+            self._shown = frame
+        elif not running:
+            self._timer.stop()
 
 
     @property
     def finished(self):
         return self._signal.finished
+
+    @property
+    def cancelled(self):
+        return self._signal.cancelled
     
     @property
     def is_running(self):
-        return not self._kill
-    
-    def _about_to_finish(self):
-        self._kill = True
-        self._signal.finished.emit()
+        return self._running
 
     def terminate(self):
-        self._kill = True
\ No newline at end of file
+        self._token.cancel()
@@ -9,12 +9,13 @@ from PyQt6.QtWidgets import (
     QLabel,
     QLineEdit,
     QPushButton,
+    QSlider,
     QWidget,
     QVBoxLayout
 )
 
 from GUI.dialogs import ErrorDialog
-from GUI.drawing_widgets import MplCanvas
+from GUI.drawing_widgets import ImageCanvas
 
 from typing import Literal, Optional
 
@@ -25,6 +26,7 @@ INFO_FONT.setPointSize(10)
 class Home(QWidget):
     button_clicked=pyqtSignal(str)
     change_dim_req=pyqtSignal(int, int)
+    scrub_req=pyqtSignal(int)
     def __init__(self):
         super().__init__()
         vbox = QVBoxLayout()
@@ -35,7 +37,7 @@ class Home(QWidget):
         self.setLayout(vbox)
 
     def _init_canvas(self):
-        self.canvas = MplCanvas()
+        self.canvas = ImageCanvas()
 
         temp = QVBoxLayout()
         temp.addWidget(self.canvas)
@@ -70,21 +72,47 @@ class Home(QWidget):
         self.dim_label = QLabel()
         self.dim_label.setFont(INFO_FONT)
 
+        self.replay_label = QLabel('Replay:')
+        self.replay_label.setFont(INFO_FONT)
+        self.replay_slider = QSlider(Qt.Orientation.Horizontal)
+        self.replay_slider.setFixedWidth(250)
+        self.replay_slider.valueChanged.connect(self._scrub)
+        self.set_replay_range(0)
+
         grid = QGridLayout()
         grid.addWidget(dim_butt, 0, 0, 1, 2)
         grid.addWidget(self.line_edit, 0, 2, 1, 2)
         grid.addWidget(self.start_butt, 1, 0)
         grid.addWidget(self.pause_butt, 1, 1)
         grid.addWidget(self.dim_label, 1, 2, 1, 2)
+        grid.addWidget(self.replay_label, 0, 4)
+        grid.addWidget(self.replay_slider, 1, 4)
 
         placeholder_wid = QWidget()
-        placeholder_wid.setFixedSize(300, 70)
+        placeholder_wid.setFixedSize(570, 70)
         placeholder_wid.setLayout(grid)
         return placeholder_wid
     
+    def set_replay_range(self, n_steps: int):
+        """
+        Allow scrubbing through `n_steps` recorded steps. The slider is
+        disabled when there is nothing to scrub through.
+        """
+        self.replay_slider.blockSignals(True)
+        self.replay_slider.setRange(0, max(n_steps - 1, 0))
+        self.replay_slider.setValue(max(n_steps - 1, 0))
+        self.replay_slider.blockSignals(False)
+        self.replay_slider.setDisabled(n_steps == 0)
+        self.replay_label.setText(f'Replay: step {n_steps} of {n_steps}' if n_steps else 'Replay:')
+
+    def _scrub(self, step: int):
+        self.replay_label.setText(f'Replay: step {step + 1} of {self.replay_slider.maximum() + 1}')
+        self.scrub_req.emit(step)
+
     def button_clicks(self, button_type: Literal['start', 'pause', 'dim']):
         if button_type == 'start':
             self.start_butt.setDisabled(True)
+            self.set_replay_range(0)
             self.button_clicked.emit('start')
         elif button_type == 'pause':
             self.start_butt.setDisabled(False)
@@ -4,8 +4,12 @@ from matplotlib.pyplot import imread
 
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import (
+    QObject,
+    QRunnable,
+    QThreadPool,
     Qt,
-    pyqtSignal
+    pyqtSignal,
+    pyqtSlot
 )
 from PyQt6.QtWidgets import (
     QCheckBox,
@@ -13,6 +17,7 @@ from PyQt6.QtWidgets import (
     QGridLayout,
     QHBoxLayout,
     QLabel,
+    QProgressBar,
     QPushButton,
     QSpinBox,
     QVBoxLayout,
@@ -20,9 +25,10 @@ from PyQt6.QtWidgets import (
 )
 
 from GUI import _ROOT_DIR
+from GUI.dialogs import ErrorDialog
 from GUI.drawing_widgets import MplCanvas
 from wfc.cell_image import TileImage
-from wfc.utils import load_patterns, generate_patterns
+from wfc.utils import load_tiles, generate_patterns
 
 from typing import Literal
 
@@ -36,6 +42,58 @@ WARNING_FONT = QFont()
 WARNING_FONT.setBold(True)
 WARNING_FONT.setUnderline(True)
 
+# maximum number of patterns shown at once in the gallery
+PAGE_SIZE = 100
+
+
+class _JobCancelled(Exception):
+    """
+    Raised inside the progress callback to abort a cancelled job.
+    """
+
+class _PatternJobSignals(QObject):
+    progress=pyqtSignal(int, int)
+    finished=pyqtSignal(list)
+    failed=pyqtSignal(str)
+
+class _PatternJob(QRunnable):
+    """
+    Generates or loads patterns in a worker thread, reporting progress
+    back to the GUI thread.
+    """
+    def __init__(self, path: tuple[bool, str], n_pixels: int, rotate: bool):
+        super().__init__()
+        self.signals = _PatternJobSignals()
+        self._path = path
+        self._n_pixels = n_pixels
+        self._rotate = rotate
+        self._cancelled = False
+
+        self.setAutoDelete(False)
+
+    @pyqtSlot()
+    def run(self):
+        is_image, path = self._path
+        try:
+            if is_image:
+                patterns = generate_patterns(path, self._n_pixels, self._rotate,
+                                             progress=self._report)
+            else:
+                patterns = load_tiles(path, self._rotate, progress=self._report)
+        except _JobCancelled:
+            return
+        except Exception as exc:
+            self.signals.failed.emit(str(exc))
+            return
+        if not self._cancelled: self.signals.finished.emit(patterns)
+
+    def _report(self, done: int, total: int):
+        if self._cancelled: raise _JobCancelled()
+        self.signals.progress.emit(done, total)
+
+    def cancel(self):
+        self._cancelled = True
+
 class _ButtonPanel(QWidget):
     browse_req=pyqtSignal(bool)
     change_config_req=pyqtSignal(int, str)
@@ -58,6 +116,11 @@ class _ButtonPanel(QWidget):
         grid.addWidget(rotate, 2, 0)
         grid.addLayout(pix_hbox, 2, 1)
 
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFixedHeight(15)
+        self.progress_bar.setTextVisible(False)
+        grid.addWidget(self.progress_bar, 3, 0)
+
         self.warning_label = QLabel()
         self.warning_label.setFont(WARNING_FONT)
         self.warning_label.setStyleSheet('color: red')
@@ -81,20 +144,22 @@ class _ButtonPanel(QWidget):
         return choose_image, choose_tileset
     
     def _init_pattern_area(self) -> tuple[QPushButton, QPushButton]:
-        generate_pattern = QPushButton()
-        save_pattern = QPushButton()
-        generate_pattern.setText('Generate Patterns')
-        save_pattern.setText('Save Patterns')
+        self.generate_butt = QPushButton()
+        self.save_butt = QPushButton()
+        self.generate_butt.setText('Generate Patterns')
+        self.save_butt.setText('Save Patterns')
         
-        generate_pattern.setFont(INFO_FONT)
-        save_pattern.setFont(INFO_FONT)
-        generate_pattern.setFixedSize(150, 30)
-        save_pattern.setFixedSize(135, 30)
+        self.generate_butt.setFont(INFO_FONT)
+        self.save_butt.setFont(INFO_FONT)
+        self.generate_butt.setFixedSize(150, 30)
+        self.save_butt.setFixedSize(135, 30)
+        # enabled once patterns are generated, see ImageLoader._update_save
+        self.save_butt.setEnabled(False)
         
-        generate_pattern.clicked.connect(self.generate_req.emit)
-        save_pattern.clicked.connect(self.save_req.emit)
+        self.generate_butt.clicked.connect(self.generate_req.emit)
+        self.save_butt.clicked.connect(self.save_req.emit)
         
-        return generate_pattern, save_pattern
+        return self.generate_butt, self.save_butt
 
     def _init_config_area(self) -> tuple[QPushButton, QHBoxLayout]:
         rotate_check = QCheckBox()
@@ -123,11 +188,38 @@ class _ButtonPanel(QWidget):
         return rotate_check, hbox
 
     def change_pixels(self, value: int):
-        txt = '' if value < 4 else 'No. of pixels > 3 may cause lag!'
+        txt = '' if value < 4 else 'No. of pixels > 3 may take a while!'
         self.warning_label.setText(txt)
         self.change_config_req.emit(value, 'n_pixels')
 
 
+class _Pager(QWidget):
+    page_req=pyqtSignal(int)
+    def __init__(self):
+        super().__init__()
+        self.prev_butt = QPushButton('<')
+        self.next_butt = QPushButton('>')
+        self.prev_butt.setFixedSize(30, 25)
+        self.next_butt.setFixedSize(30, 25)
+        self.prev_butt.clicked.connect(lambda: self.page_req.emit(-1))
+        self.next_butt.clicked.connect(lambda: self.page_req.emit(1))
+
+        self.page_label = QLabel()
+        self.page_label.setFont(ALTER_INFO_FONT)
+
+        hbox = QHBoxLayout()
+        hbox.addWidget(self.prev_butt)
+        hbox.addWidget(self.page_label)
+        hbox.addWidget(self.next_butt)
+        hbox.setAlignment(Qt.AlignmentFlag.AlignHCenter)
+        self.setLayout(hbox)
+
+    def set_page(self, page: int, n_pages: int, n_patterns: int):
+        self.page_label.setText(f'Page {page + 1}/{n_pages} ({n_patterns} patterns)')
+        self.prev_butt.setDisabled(page == 0)
+        self.next_butt.setDisabled(page >= n_pages - 1)
+
+
 class ImageLoader(QWidget):
     change_pattern_req=pyqtSignal(list)
     def __init__(self):
@@ -135,24 +227,30 @@ class ImageLoader(QWidget):
 
         self._load_default()
 
+        self._job = None
+        self._page = 0
+
         place1, place2 = self._init_canvas()
+        self.pager = _Pager()
+        self.pager.page_req.connect(lambda step: self.show_page(self._page + step))
         grid = QGridLayout()
         grid.addWidget(self._init_button_panel(), 0, 0)
         grid.addWidget(place1, 0, 1)
         grid.addWidget(place2, 0, 2)
+        grid.addWidget(self.pager, 1, 2)
         self.setLayout(grid)
 
         self.generate_patterns()
         self._patterns_data['rotate'] = False
 
     def _init_button_panel(self):
-        panel = _ButtonPanel()
-        panel.setFixedSize(390, 120)
-        panel.browse_req.connect(self.browse)
-        panel.generate_req.connect(self.generate_patterns)
-        panel.save_req.connect(lambda: self.change_pattern_req.emit(self._patterns_data['patterns']))
-        panel.change_config_req.connect(self.change_config)
-        return panel
+        self.panel = _ButtonPanel()
+        self.panel.setFixedSize(390, 120)
+        self.panel.browse_req.connect(self.browse)
+        self.panel.generate_req.connect(self._generate_clicked)
+        self.panel.save_req.connect(self._save_clicked)
+        self.panel.change_config_req.connect(self.change_config)
+        return self.panel
 
     def _init_canvas(self):
         self.canvas = MplCanvas(5, 5)
@@ -200,16 +298,73 @@ class ImageLoader(QWidget):
 
         self.generate_patterns()
 
+    def _save_clicked(self):
+        if self._job is None and self._patterns_data['patterns']:
+            self.change_pattern_req.emit(self._patterns_data['patterns'])
+
+    def _update_save(self):
+        """
+        Only allow saving finished, non-empty pattern lists.
+        """
+        self.panel.save_butt.setEnabled(self._job is None and bool(self._patterns_data['patterns']))
+
+    def _generate_clicked(self):
+        if self._job is None: self.generate_patterns()
+        else: self.cancel_job()
+
     def generate_patterns(self):
-        path, rotate = self._patterns_data['path'][1], self._patterns_data['rotate']
+        self.cancel_job()
         if self._patterns_data['path'][0]:
-            self.canvas.show_image(imread(path))
+            self.canvas.show_image(imread(self._patterns_data['path'][1]))
             self.canvas.draw()
 
-            self._patterns_data['patterns'] = generate_patterns(path, self._patterns_data['n_pixels'],
-                                                                rotate)
-        else:
-            self._patterns_data['patterns'] = [TileImage(tile, 1) for tile in load_patterns(path, rotate)]
-
-        self.pattern_canvas.show_tiles([i.image for i in self._patterns_data['patterns']])
-        self.pattern_canvas.draw()
\ No newline at end of file
+        job = _PatternJob(self._patterns_data['path'], self._patterns_data['n_pixels'],
+                          self._patterns_data['rotate'])
+        # results of a replaced job are ignored
+        job.signals.progress.connect(lambda done, total: job is self._job and self._show_progress(done, total))
+        job.signals.finished.connect(lambda patterns: job is self._job and self._job_finished(patterns))
+        job.signals.failed.connect(lambda msg: job is self._job and self._job_failed(msg))
+
+        self._job = job
+        self._update_save()
+        self.panel.generate_butt.setText('Cancel')
+        self.panel.progress_bar.setValue(0)
+        QThreadPool.globalInstance().start(job)
+
+    def cancel_job(self):
+        if self._job is None: return
+        self._job.cancel()
+        self._end_job()
+
+    def _end_job(self):
+        self._job = None
+        self._update_save()
+        self.panel.generate_butt.setText('Generate Patterns')
+        self.panel.progress_bar.setValue(0)
+
+    def _show_progress(self, done: int, total: int):
+        self.panel.progress_bar.setMaximum(total)
+        self.panel.progress_bar.setValue(done)
+
+    def _job_finished(self, patterns: list[TileImage]):
+        self._patterns_data['patterns'] = patterns
+        self._end_job()
+        self.show_page(0)
+
+    def _job_failed(self, msg: str):
+        self._end_job()
+        ErrorDialog(self, f'Could not load patterns: {msg}').exec()
+
+    def show_page(self, page: int):
+        """
+        Draw one page of at most `PAGE_SIZE` patterns in the gallery.
+        """
+        patterns = self._patterns_data['patterns']
+        n_pages = max(1, -(-len(patterns) // PAGE_SIZE))
+        self._page = min(max(page, 0), n_pages - 1)
+
+        tiles = patterns[self._page * PAGE_SIZE:(self._page + 1) * PAGE_SIZE]
+        if tiles: self.pattern_canvas.show_tiles([i.image for i in tiles])
+        else: self.pattern_canvas.clear_image()
+        self.pattern_canvas.draw()
+        self.pager.set_page(self._page, n_pages, len(patterns))
@@ -8,12 +8,14 @@ from PyQt6.QtWidgets import (
 
 from GUI import _ROOT_DIR
 from GUI.dialogs import ErrorDialog, ConfirmationDialog
-from GUI.drawing_widgets import Animator
+from GUI.drawing_widgets import (
+    Animator,
+    render_viewport
+)
 from GUI.home import Home
 from GUI.image_choser import ImageLoader
 
-from wfc.cell_image import TileImage
-from wfc.utils import load_patterns
+from wfc.utils import load_tiles
 from wfc.wfc import WFC
 
 from typing import Literal
@@ -43,9 +45,13 @@ class MainWindow(QMainWindow):
     def _establish_connections(self):
         self.home.button_clicked.connect(self.process_animation)
         self.home.change_dim_req.connect(lambda rows, cols: self.config_wfc((rows, cols), 'dim'))
+        self.home.scrub_req.connect(self.scrub)
         self.animator.finished.connect(lambda: self.process_animation('finish'))
+        # the replay is built once the worker has stopped appending to the decision log
+        self.animator.cancelled.connect(self._prepare_replay)
         self.tab.currentChanged.connect(self._change_tab)
         self.image_loader.change_pattern_req.connect(lambda x: self.config_wfc(x, 'patterns'))
+        self.home.canvas.view_changed.connect(self._render_view)
 
     def _change_tab(self, index: int):
         self.home.start_butt.setDisabled(False)
@@ -53,15 +59,19 @@ class MainWindow(QMainWindow):
 
     def _prepare_wfc(self):
         path = osp.join(_ROOT_DIR, 'images', 'tilesets', 'Circuit')
-        default_tiles = [TileImage(pattern, 1) for pattern in load_patterns(path)]
+        default_tiles = load_tiles(path)
         dimension = (20, 30)
-        self.WFC = WFC(dimension, default_tiles, rerun=True)
+        # frames are rendered from the viewport of the canvas instead
+        self.WFC = WFC(dimension, default_tiles, rerun=True, record=True, frames=False)
+        self.replay = None
+        # whether the canvas shows the grid of the WFC, rather than a replay or a placeholder
+        self._live = False
+        self._set_grid()
         self.home.canvas.show_image(self.WFC.wfc_result[1])
-        self.home.canvas.draw()
         self.home.dim_label.setText(f'Dimension: {dimension}')
 
         self.threadpool = QThreadPool()
-        self.animator = Animator(self.home.canvas, self.WFC, 2)
+        self.animator = Animator(self.home.canvas, self.WFC, 16)
 
 
     def config_wfc(self, value, param: Literal['patterns', 'dim']):
@@ -72,6 +82,9 @@ class MainWindow(QMainWindow):
             except TypeError:
                 ErrorDialog(self, 'Found non-tile data while saving patterns!').exec()
                 return
+            except ValueError:
+                ErrorDialog(self, 'There are no patterns to save!').exec()
+                return
         elif param == 'dim':
             try:
                 self.WFC.output_dimension = value
@@ -82,17 +95,40 @@ class MainWindow(QMainWindow):
                 return
             
 
-        _, ax = self.home.canvas.show_image(self.WFC.wfc_result[1])
-        self.home.canvas.draw()
-        self.home.canvas.blit(ax.bbox)
+        self.replay = None
+        self._live = False
+        self.home.set_replay_range(0)
+        self._set_grid()
+        self.home.canvas.show_image(self.WFC.wfc_result[1])
+
+    def _set_grid(self):
+        tile_px = next(self.WFC.patterns).image.shape[0]
+        self.home.canvas.set_grid(self.WFC.output_dimension, tile_px)
+
+    def _render_view(self):
+        # the animator renders the view itself while running
+        if not self._live or self.animator.is_running: return
+        viewport = self.home.canvas.viewport()
+        self.home.canvas.show_image(*render_viewport(self.WFC, viewport))
 
 
     def process_animation(self, state: Literal['start', 'pause', 'finish']):
         match state:
             case 'start':
-                self.threadpool.start(self.animator)
+                self._live = True
+                self.animator.start(self.threadpool)
             case 'pause':
-                if self.animator.is_running:
-                    self.animator.terminate()
+                if self.animator.is_running: self.animator.terminate()
             case 'finish':
-                self.home.start_butt.setDisabled(False)
\ No newline at end of file
+                self.home.start_butt.setDisabled(False)
+                self._prepare_replay()
+
+    def _prepare_replay(self):
+        if self.WFC.decision_log is None: return
+        self.replay = self.WFC.replay()
+        self.home.set_replay_range(len(self.replay))
+
+    def scrub(self, step: int):
+        if self.replay is None: return
+        self._live = False
+        self.home.canvas.show_image(self.replay.frame(step))
\ No newline at end of file
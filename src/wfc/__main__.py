@@ -0,0 +1,173 @@
+"""
+Generate maps in bulk from the command line.
+```
+python -m wfc images/tileset_generator/Flowers.png --size 40 40 --count 100 -o output
+python -m wfc images/tilesets/Circuit --size 20 20 --format tiles
+```
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from PIL import Image
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    as_completed
+)
+
+from .cell_image import TileImage
+from .restart import RestartPolicy
+from .utils import (
+    generate_patterns,
+    load_tiles
+)
+from .wfc import (
+    UnsatisfiableError,
+    WFC
+)
+
+
+from typing import Optional
+
+
+# patterns and settings of the current worker process, see `_init_worker`
+_worker: dict[str, object] = {}
+
+def _load(source: str, n_pixels: int, rotate: bool) -> list[TileImage]:
+    """
+    Load a tileset from a directory of tiles or generate one from an image.
+    """
+    if os.path.isdir(source):
+        return load_tiles(source, rotate)
+    return generate_patterns(source, n_pixels, rotate)
+
+def _init_worker(patterns: list[TileImage], args: argparse.Namespace):
+    _worker['patterns'] = patterns
+    _worker['args'] = args
+
+def _generate(index: int, seed: Optional[int]) -> tuple[int, bool, float, int]:
+    """
+    Generate one map and write it to the output directory.
+
+    :return: A tuple of the index of the map, whether it succeeded,
+        the time taken in seconds and the number of attempts. Maps that
+        cannot be filled after presolving have no attempt and are not written.
+    :rtype: tuple[int, bool, float, int]
+    """
+    args = _worker['args']
+    policy = None
+    if not (args.max_attempts is None and args.time_budget is None):
+        policy = RestartPolicy(args.max_attempts, args.time_budget)
+    wfc = WFC(
+        tuple(args.size), _worker['patterns'],
+        repeat_until_success=not args.no_retry,
+        propagation=args.propagation,
+        seed=seed,
+        presolve=args.presolve,
+        frames=False,
+        metrics=None,
+        restart_policy=policy
+    )
+    start = time.perf_counter()
+    try:
+        success, image = wfc.run()
+    except UnsatisfiableError:
+        return index, False, time.perf_counter() - start, 0
+    seconds = time.perf_counter() - start
+
+    name = os.path.join(args.output, f'{args.prefix}{index:0{len(str(args.count - 1))}d}')
+    if args.format == 'png':
+        Image.fromarray(image).save(f'{name}.png')
+    else:
+        np.save(f'{name}.npy', wfc.wfc_tiles)
+    return index, success, seconds, wfc.run_stats.attempts
+
+def _parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m wfc',
+        description='Generate maps with the wave function collapse algorithm.'
+    )
+    parser.add_argument('source', help='Image to generate patterns from, or directory of tiles.')
+    parser.add_argument('-n', '--n-pixels', type=int, default=3,
+                        help='Dimension of the patterns generated from an image. Default: 3.')
+    parser.add_argument('-r', '--rotate', action='store_true', help='Augment the patterns by rotation.')
+    parser.add_argument('-s', '--size', type=int, nargs=2, default=(30, 30), metavar=('ROWS', 'COLS'),
+                        help='Dimension of the maps in tiles. Default: 30 30.')
+    parser.add_argument('-c', '--count', type=int, default=1, help='Number of maps to generate. Default: 1.')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed of the first map, the i-th map uses seed + i. Default: random.')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Number of worker processes, 0 to run in this process. Default: number of processors.')
+    parser.add_argument('-o', '--output', default='output', help='Output directory. Default: output.')
+    parser.add_argument('--prefix', default='map_', help='Prefix of the output files. Default: map_.')
+    parser.add_argument('-f', '--format', choices=('png', 'tiles'), default='png',
+                        help='Write images, or pattern indices as .npy arrays. Default: png.')
+    parser.add_argument('--propagation', choices=('stack', 'batched'), default='batched',
+                        help='Propagation mode. Default: batched.')
+    parser.add_argument('--presolve', action='store_true', help='Presolve the configuration before running.')
+    parser.add_argument('--no-retry', action='store_true',
+                        help='Do not restart after a contradiction, failed maps are written as is.')
+    parser.add_argument('--max-attempts', type=int, default=None,
+                        help='Give up on a map after this many attempts. Default: no limit.')
+    parser.add_argument('--time-budget', type=float, default=None, metavar='SECONDS',
+                        help='Give up on a map after this many seconds. Default: no limit.')
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.source):
+        parser.error(f'{args.source} does not exist')
+    elif args.count < 1: parser.error('--count must be a positive integer')
+    elif min(args.size) < 1: parser.error('--size must be positive integers')
+    elif not args.max_attempts is None and args.max_attempts < 1:
+        parser.error('--max-attempts must be a positive integer')
+    elif not args.time_budget is None and args.time_budget <= 0:
+        parser.error('--time-budget must be a positive number')
+    return args
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = _parse_args(argv)
+    os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    patterns = _load(args.source, args.n_pixels, args.rotate)
+    print(f'Loaded {len(patterns)} patterns in {time.perf_counter() - start:.2f}s', file=sys.stderr)
+
+    seeds = [None if args.seed is None else args.seed + i for i in range(args.count)]
+    results = []
+    start = time.perf_counter()
+    def _report(result: tuple[int, bool, float, int]):
+        results.append(result)
+        index, success, seconds, attempts = result
+        if not attempts:
+            print(f'[{len(results)}/{args.count}] map {index} FAILED, '
+                  f'some cells have no possible pattern after presolving', file=sys.stderr)
+            return
+        print(f"[{len(results)}/{args.count}] map {index} {'done' if success else 'FAILED'}"
+              f" in {seconds:.2f}s, {attempts} attempt{'s' * (attempts > 1)}", file=sys.stderr)
+
+    if args.workers == 0:
+        _init_worker(patterns, args)
+        for index, seed in enumerate(seeds): _report(_generate(index, seed))
+    else:
+        with ProcessPoolExecutor(
+            args.workers, initializer=_init_worker, initargs=(patterns, args)
+        ) as executor:
+            futures = [executor.submit(_generate, index, seed) for index, seed in enumerate(seeds)]
+            for future in as_completed(futures): _report(future.result())
+    elapsed = time.perf_counter() - start
+
+    seconds = np.array([result[2] for result in results])
+    failures = sum(not result[1] for result in results)
+    restarts = sum(max(result[3] - 1, 0) for result in results)
+    print(
+        f'{len(results)} maps in {elapsed:.2f}s ({len(results) / elapsed:.2f} maps/s), '
+        f'{failures} failed, {restarts} restarts '
+        f'({restarts / len(results):.2f} per map), '
+        f'p50 {np.percentile(seconds, 50):.2f}s, p95 {np.percentile(seconds, 95):.2f}s'
+    )
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
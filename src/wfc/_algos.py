@@ -1,6 +1,9 @@
 import random as rand
+import time
+import numpy as np
 
 from dataclasses import dataclass
+from scipy.sparse import csr_array, sparray
 
 from .cell_image import (
     Cell,
@@ -8,13 +11,41 @@ from .cell_image import (
     TileImage
 )
 from .priority_queue import PriorityQueue
-from .utils import concat_grid
+from .restart import RestartPolicy
+from .utils import (
+    _OverlappingModel_TileImage,
+    _overlapping_adjacency
+)
 
 
 from numpy.typing import NDArray
 from typing import (
+    TYPE_CHECKING,
     Generator,
+    Literal,
+    Optional,
+    Sequence,
+    TypeAlias
 )
+if TYPE_CHECKING:
+    from .metrics import RunStats
+    from .replay import DecisionLog
+
+
+# Order in which directions are stored in compiled adjacency tables.
+_DIRECTIONS = (Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT)
+
+# Adjacency tables are stored as sparse matrices when a tileset has at least
+# this many patterns and at most this fraction of pairs are adjacent.
+_SPARSE_MIN_PATTERNS = 1024
+_SPARSE_MAX_DENSITY = 0.05
+
+# Part of a grid as a pair of (row, column) slices.
+_Window: TypeAlias = tuple[slice, slice]
+
+# Compiled adjacency tables, either a dense boolean array of shape (4, T, T)
+# or a sequence of four sparse (T, T) matrices. Both are indexed as table[d][i, j].
+_Adjacency: TypeAlias = NDArray | Sequence[sparray]
 
 
 @dataclass
@@ -27,12 +58,14 @@ class _CellDataContainer:
     :param int index: The position of the cell in the grid. This index
         is given in the flattened grid and **not** as (row, col).
     :param Cell cell: The actual Cell object.
+    :param float bias: The entropy taken off the cell when comparing. This is `0` by default.
     """
     index: int
     cell: Cell
+    bias: float = 0.
 
     def __lt__(self, other:'_CellDataContainer') -> bool:
-        return self.cell.entropy < other.cell.entropy
+        return self.cell.entropy - self.bias < other.cell.entropy - other.bias
     def __eq__(self, other: '_CellDataContainer') -> bool:
         return self.index == other.index
     
@@ -43,12 +76,21 @@ def _propogate(
     position: int,
     output_dimension: tuple[int, int],
     generated_img: list[Cell],
-    non_collapse_queue: PriorityQueue[_CellDataContainer]
+    non_collapse_queue: PriorityQueue[_CellDataContainer],
+    pending: Optional[bytearray] = None,
+    collapsed: Optional[list[int]] = None,
+    changed: Optional[list[int]] = None,
+    items: Optional[list[_CellDataContainer]] = None
 ) -> bool:
     """
     Propogate state updates from the given position. The propogation
     works in four directions: up, down, left and right.
 
+    Changed cells are kept in a worklist and flagged as pending while they are in it,
+    so a cell is queued at most once no matter how many of its neighbours change
+    before it is processed. When processed, a cell updates its neighbours with its
+    latest options. A contradiction is reported as soon as a cell runs out of options.
+
     :param int position: The position to propogate from. This should
         be given as if the grid is flattened and **not** a (row, col) pair.
     :param tuple[int, int] output_dimension: The actual dimension of the grid.
@@ -56,55 +98,757 @@ def _propogate(
     :param PriorityQueue[_CellDataContainer] non_collapse_queue: The current
         priority queue of uncollapsed cell. This is used to update the priority
         of existing cells after updating the state.
+    :param bytearray, optional pending: One zeroed flag per cell, used for the worklist
+        and zeroed again before returning. This is `None` by default, in which case
+        it is allocated for this call.
+    :param list[int], optional collapsed: List to append the positions of the cells
+        collapsed by the propogation to. This is `None` by default.
+    :param list[int], optional changed: List to append the positions of the cells
+        that lost options to, a cell may appear more than once. This is `None` by default.
+    :param list[_CellDataContainer], optional items: The container of every cell, pushed
+        to the queue instead of a new container so its bias is kept. This is `None` by default.
     :return bool: Whether or not all cells are still valid after updating.
     """
-    col = position % output_dimension[1]
-    row = (position - col) // output_dimension[1]
-
-    stack: list[tuple[int, int, int, int, Direction]] = []
-    if row - 1 > -1:
-        stack.append((row - 1, col, row, col, Direction.UP))
-    if row + 1 < output_dimension[0]:
-        stack.append((row + 1, col, row, col, Direction.DOWN))
-    if col - 1 > -1:
-        stack.append((row, col - 1, row, col, Direction.LEFT))
-    if col + 1 < output_dimension[1]:
-        stack.append((row, col + 1, row, col, Direction.RIGHT))
+    n_rows, n_cols = output_dimension
+    if pending is None: pending = bytearray(n_rows * n_cols)
 
+    stack = [position]
+    pending[position] = 1
     while stack:
-        row, col, other_row, other_col, direction = stack.pop()
-        
-        index = row * output_dimension[1] + col
-        other_index = other_row * output_dimension[1] + other_col
-        if (
-            generated_img[index].is_collapsed or\
-            not generated_img[index].update_options(generated_img[other_index], direction)
-        ):
-            continue
-        elif not generated_img[index].is_valid:
-            return False
-        
-        non_collapse_queue.push(_CellDataContainer(index, generated_img[index]))
+        other_index = stack.pop()
+        pending[other_index] = 0
+        other_cell = generated_img[other_index]
+        col = other_index % n_cols
+        row = other_index // n_cols
 
+        neighbours: list[tuple[int, Direction]] = []
         if row - 1 > -1:
-            stack.append((row - 1, col, row, col, Direction.UP))
-        if row + 1 < output_dimension[0]:
-            stack.append((row + 1, col, row, col, Direction.DOWN))
+            neighbours.append((other_index - n_cols, Direction.UP))
+        if row + 1 < n_rows:
+            neighbours.append((other_index + n_cols, Direction.DOWN))
         if col - 1 > -1:
-            stack.append((row, col - 1, row, col, Direction.LEFT))
-        if col + 1 < output_dimension[1]:
-            stack.append((row, col + 1, row, col, Direction.RIGHT))
+            neighbours.append((other_index - 1, Direction.LEFT))
+        if col + 1 < n_cols:
+            neighbours.append((other_index + 1, Direction.RIGHT))
 
-    return all(cell.is_valid for cell in generated_img)
+        for index, direction in neighbours:
+            # collapsed cells are checked too, two neighbours can collapse
+            # in the same propogation before either of them is processed
+            cell = generated_img[index]
+            was_collapsed = cell.is_collapsed
+            updated = cell.update_options(other_cell, direction)
+            # cells left with one option collapse, even if nothing was removed
+            if not (collapsed is None or was_collapsed) and cell.is_collapsed:
+                collapsed.append(index)
+            if not updated: continue
+            if not changed is None: changed.append(index)
+            if not cell.is_valid:
+                for i in stack: pending[i] = 0
+                return False
 
-def _wfc(
+            non_collapse_queue.push(_CellDataContainer(index, cell) if items is None else items[index])
+            if not pending[index]:
+                pending[index] = 1
+                stack.append(index)
+    return True
+
+def _compile_adjacency(patterns: list[TileImage]) -> _Adjacency:
+    """
+    Evaluate the adjacency rules of a tileset once and store them as boolean
+    tables, one per direction in the order of `_DIRECTIONS`, where
+    `result[d][i, j]` is `patterns[i].is_adjacent_to(patterns[j], _DIRECTIONS[d])`.
+
+    Since this relies on `TileImage.is_adjacent_to`, custom adjacency rules
+    defined by subclasses are compiled as well. Tiles generated by the overlapping
+    model from the same image use the default rules and are compiled without
+    comparing every pair.
+
+    Large tilesets where few pairs are adjacent are stored as sparse matrices,
+    others as a dense array of shape `(4, T, T)`. See `_Adjacency`.
+
+    :param list[TileImage] patterns: The tileset to compile.
+    :return _Adjacency: The compiled adjacency tables.
+    """
+    if patterns and all(
+        type(tile).is_adjacent_to is _OverlappingModel_TileImage.is_adjacent_to and
+        tile.palette is patterns[0].palette
+        for tile in patterns
+    ):
+        tables = _overlapping_adjacency(patterns)
+        n_pairs = sum(table.nnz for table in tables)
+    else:
+        tables = np.zeros((len(_DIRECTIONS), len(patterns), len(patterns)), dtype=bool)
+        for d, direction in enumerate(_DIRECTIONS):
+            for i, tile in enumerate(patterns):
+                for j, other in enumerate(patterns):
+                    tables[d, i, j] = tile.is_adjacent_to(other, direction)
+        n_pairs = np.count_nonzero(tables)
+
+    if (
+        len(patterns) >= _SPARSE_MIN_PATTERNS and
+        n_pairs <= _SPARSE_MAX_DENSITY * len(_DIRECTIONS) * len(patterns)**2
+    ):
+        return [csr_array(table) for table in tables]
+    return np.stack([
+        table if isinstance(table, np.ndarray) else table.toarray()
+        for table in tables
+    ])
+
+class _GridImage:
+    """
+    Rendering shared by the grids. Subclasses keep `wave`, a boolean array of shape
+    `(n_cells, n_patterns)` where `wave[i, k]` tells whether cell `i` can still
+    collapse to pattern `k`, and `_count`, the number of options of every cell,
+    so that the grid is drawn with array operations only.
+    """
+    __slots__ = '_colours', '_count', '_images', '_loaded', '_output_dim', '_patterns', 'wave'
+    def __init__(self, patterns: list[TileImage], output_dimension: tuple[int, int]):
+        self._patterns = patterns
+        self._output_dim = output_dimension
+        self.wave = None
+        self._count = None
+        # images are read from the patterns when first drawn, see `_tile_images`
+        self._images = None
+        self._loaded = np.zeros(len(patterns), dtype=bool)
+        self._colours = None
+
+    def domains(self, indices: Optional[NDArray] = None) -> NDArray:
+        """
+        The options of every cell, or of the cells at `indices`, as a boolean
+        array of shape `(n_cells, n_patterns)`.
+        """
+        return self.wave.copy() if indices is None else self.wave[indices]
+
+    def render(self, window: Optional[_Window] = None) -> NDArray:
+        """
+        The image of the grid, or of the cells in `window` only.
+        """
+        # single pixel tiles, as with the overlapping model, are their own average colour
+        tile_h, tile_w = self._patterns[0].image.shape[:2]
+        if (tile_h, tile_w) == (1, 1): return self.colours(window)
+        indices = _window_indices(self._output_dim, window)
+        height, width = indices.shape
+        indices = indices.ravel()
+        collapsed = self._count[indices] == 1
+
+        frame = np.empty((len(indices), tile_h, tile_w, 3), dtype='uint8')
+        frame[collapsed] = self._tile_images(self.wave[indices[collapsed]].argmax(axis=1))
+        if not collapsed.all():
+            frame[~collapsed] = self._average(indices[~collapsed])[:, None, None]
+
+        return frame.reshape(height, width, tile_h, tile_w, 3)\
+                    .transpose(0, 2, 1, 3, 4)\
+                    .reshape(height * tile_h, width * tile_w, 3)
+
+    def colours(self, window: Optional[_Window] = None) -> NDArray:
+        """
+        One colour per cell, averaged over the options of the cell, as an image
+        of shape `(rows, cols, 3)`. Cells without options are black.
+        """
+        if window is None:
+            colours = _mean_colours(self.wave, self._count, self._colour_table())
+            return colours.reshape(*self._output_dim, 3)
+        indices = _window_indices(self._output_dim, window)
+        return self._average(indices.ravel()).reshape(*indices.shape, 3)
+
+    def _average(self, indices: NDArray) -> NDArray:
+        """
+        The average colour of the options of the given cells.
+        """
+        return _mean_colours(self.wave[indices], self._count[indices], self._colour_table())
+
+    def _colour_table(self) -> NDArray:
+        """
+        The colour table of the patterns, computed the first time it is needed.
+        """
+        if self._colours is None: self._colours = _colour_table(self._patterns)
+        return self._colours
+
+    def _tile_images(self, tiles: NDArray) -> NDArray:
+        """
+        The images of the given patterns. Images are read from the patterns the first
+        time they are drawn, so lazily loaded tiles that are never drawn are not decoded.
+        """
+        if self._images is None:
+            self._images = np.empty((len(self._patterns), *self._patterns[0].image.shape), dtype='uint8')
+        for k in np.unique(tiles[~self._loaded[tiles]]):
+            self._images[k] = self._patterns[k].image
+            self._loaded[k] = True
+        return self._images[tiles]
+
+    def tiles(self) -> NDArray:
+        """
+        The pattern index of every collapsed cell as an array of shape
+        `output_dimension`. Uncollapsed cells are given -1.
+        """
+        return np.where(self._count == 1, self.wave.argmax(axis=1), -1).reshape(self._output_dim)
+
+class _CellGrid(_GridImage):
+    """
+    Grid of `Cell` objects. States are updated one edge at a time
+    with `_propogate`. The options of the cells are mirrored in `wave`
+    after every change, which the grid is drawn from.
+    """
+    __slots__ = (
+        '_bias',
+        '_cells',
+        '_changes',
+        '_full',
+        '_indices',
+        '_items',
+        '_pending',
+        '_queue',
+        '_remaining',
+        '_rng',
+        '_was_reset'
+    )
+    def __init__(self,
+        patterns: list[TileImage],
+        output_dimension: tuple[int, int],
+        rng: Optional[rand.Random] = None
+    ):
+        super().__init__(patterns, output_dimension)
+        self._bias = None
+        self._cells = None
+        self._changes = None
+        self._was_reset = False
+        self._items = None
+        self._pending = bytearray(output_dimension[0] * output_dimension[1])
+        self._remaining = 0
+        # cell with every option, shared by the cells of the grid until they are narrowed
+        self._full = Cell(patterns)
+        self._full.entropy
+        self._rng = rand if rng is None else rng
+        # tiles are identified by their position in patterns
+        self._indices = {id(tile): i for i, tile in enumerate(patterns)}
+
+    @property
+    def is_collapsed(self) -> bool:
+        return not self._remaining
+
+    @property
+    def rng_state(self) -> tuple:
+        """
+        The state of the random generator of the grid, as given by `random.Random.getstate()`.
+        """
+        return self._rng.getstate()
+    @rng_state.setter
+    def rng_state(self, value: tuple):
+        self._rng.setstate(value)
+
+    def seed(self, value: int):
+        """
+        Reseed the random generator of the grid.
+        """
+        self._rng.seed(value)
+
+    def reset(self):
+        """
+        Give every cell all options again. The cells of the grid are reused.
+        """
+        if self._cells is None:
+            self._cells = [self._full.copy() for _ in range(self._output_dim[0] * self._output_dim[1])]
+            self._items = [_CellDataContainer(i, cell) for i, cell in enumerate(self._cells)]
+            self.wave = np.ones((len(self._cells), len(self._patterns)), dtype=bool)
+            self._count = np.full(len(self._cells), len(self._patterns))
+        else:
+            for cell in self._cells: cell.assign(self._full)
+            self.wave.fill(True)
+            self._count.fill(len(self._patterns))
+            self._clear_bias()
+        self._remaining = len(self._cells)
+        # all cells have the same entropy, so the cells in order already form a heap
+        self._queue = PriorityQueue.from_entries(
+            (item, count, False) for count, item in enumerate(self._items, 1)
+        )
+        if not self._changes is None:
+            self._changes.clear()
+            self._was_reset = True
+
+    def load(self, domains: NDArray, queue: Optional[NDArray] = None):
+        """
+        Replace the state of the grid with the given domains. Cells without
+        options are left invalid. The queue of uncollapsed cells is
+        rebuilt from `queue` if given, see `queue_entries()`.
+
+        The cells of the grid are reused, and cells with the same options share them.
+        """
+        if self._cells is None:
+            self._cells = [self._full.copy() for _ in range(len(domains))]
+            self._items = [_CellDataContainer(i, cell) for i, cell in enumerate(self._cells)]
+            self.wave = domains.copy()
+            self._count = np.empty(len(domains), dtype=int)
+        else:
+            self.wave[:] = domains
+            self._clear_bias()
+        self._count[:] = domains.sum(axis=1)
+        # one cell per distinct domain, assigned to every cell with that domain
+        shared: dict[bytes, Cell] = {}
+        for cell, options in zip(self._cells, domains):
+            if (template := shared.get(key := options.tobytes())) is None:
+                if options.all() and len(options) > 1:
+                    template = self._full
+                elif not options.any():
+                    template = self._full.copy()
+                    template.clear()
+                else:
+                    template = Cell([self._patterns[k] for k in np.flatnonzero(options)])
+                    if len(template.options) == 1: template.collapse(template.options[0])
+                    template.entropy
+                shared[key] = template
+            cell.assign(template)
+        self._remaining = sum(not cell.is_collapsed for cell in self._cells)
+        if queue is None:
+            self._queue = PriorityQueue((item for item in self._items if not item.cell.is_collapsed))
+        else:
+            self._queue = PriorityQueue.from_entries(
+                (self._items[i], int(count), bool(is_removed)) for i, count, is_removed in queue
+            )
+        if not self._changes is None:
+            self._changes[:] = np.flatnonzero(~domains.all(axis=1)).tolist()
+            self._was_reset = True
+
+    def queue_entries(self) -> NDArray:
+        """
+        The queue of uncollapsed cells as an int array of `(cell index, count, is_removed)`
+        rows, in the order of `PriorityQueue.entries()`. Loading the domains with
+        these entries gives a grid that pops cells in the exact same order.
+        """
+        return np.array([
+            (item.index, count, is_removed) for item, count, is_removed in self._queue.entries()
+        ], dtype=np.int64).reshape(-1, 3)
+
+    def set_bias(self, bias: Optional[NDArray]):
+        """
+        Take `bias` off the entropy of every cell when picking the next cell to
+        collapse, `None` for no bias. The queue is rebuilt, so this is given after
+        `reset()` or `load()`, which both clear the bias.
+        """
+        if bias is None and self._bias is None: return
+        self._bias = bias
+        for item, value in zip(self._items, [0.] * len(self._items) if bias is None else bias.tolist()):
+            item.bias = value
+        self._queue = PriorityQueue((item for item in self._items if not item.cell.is_collapsed))
+
+    def _clear_bias(self):
+        if self._bias is None: return
+        self._bias = None
+        for item in self._items: item.bias = 0.
+
+    def pop(self) -> int:
+        """
+        Remove and return the index of the uncollapsed cell with the lowest entropy.
+        """
+        while (item := self._queue.pop()).cell.is_collapsed: pass
+        return item.index
+
+    def collapse(self, index: int, tile: Optional[int] = None) -> int:
+        """
+        Collapse a cell, either randomly or to the given pattern.
+
+        :return int: The index of the pattern the cell has collapsed to.
+        """
+        if not self._cells[index].is_collapsed: self._remaining -= 1
+        tile = self._indices[id(self._cells[index].collapse(
+            None if tile is None else self._patterns[tile], self._rng
+        ))]
+        self.wave[index] = False
+        self.wave[index, tile] = True
+        self._count[index] = 1
+        if not self._changes is None: self._changes.append(index)
+        return tile
+
+    def random_cell(self, weights: Optional[NDArray] = None) -> int:
+        """
+        Pick a cell uniformly, or in proportion to `weights` if given.
+        """
+        if weights is None: return self._rng.randint(0, len(self._cells) - 1)
+        return _weighted_choice(self._rng, weights)
+
+    def contradictions(self) -> NDArray:
+        """
+        The indices of the cells without options.
+        """
+        return np.flatnonzero(self._count == 0)
+
+    def propagate(self, index: int | NDArray) -> bool:
+        """
+        Propogate state updates from the given cell or cells.
+        """
+        collapsed, changed = [], []
+        valid = all([
+            _propogate(int(i), self._output_dim, self._cells, self._queue,
+                       self._pending, collapsed, changed, self._items)
+            for i in np.atleast_1d(index)
+        ])
+        self._remaining -= len(collapsed)
+        # mirror the new options of the changed cells in the wave
+        for i in set(changed):
+            options = [self._indices[id(tile)] for tile in self._cells[i].options]
+            self.wave[i] = False
+            self.wave[i, options] = True
+            self._count[i] = len(options)
+        if not self._changes is None: self._changes.extend(changed)
+        return valid
+
+    def track_changes(self, enable: bool):
+        """
+        Start or stop recording which cells change, see `changes()`. When started
+        on a grid in use, every cell that does not have all options is reported.
+        """
+        if not enable: self._changes = None
+        elif self._changes is None:
+            self._changes = []
+            if not self._cells is None:
+                self._changes.extend(np.flatnonzero(self._count < len(self._patterns)).tolist())
+                self._was_reset = True
+
+    def changes(self) -> tuple[bool, NDArray]:
+        """
+        The cells changed since the last call, while changes are tracked.
+
+        :return: A tuple of whether or not every cell was given all options again
+            before the changes, and the sorted indices of the changed cells.
+        :rtype: tuple[bool, numpy.NDArray]
+        """
+        reset, self._was_reset = self._was_reset, False
+        if not self._changes: return reset, np.empty(0, dtype=int)
+        cells = np.unique(self._changes)
+        self._changes.clear()
+        return reset, cells
+
+class _WaveGrid(_GridImage):
+    """
+    Grid stored as a boolean wave of shape `(n_cells, n_patterns)` where
+    `wave[i, k]` tells whether cell `i` can still collapse to pattern `k`.
+    A cell with exactly one option left is considered collapsed.
+
+    Propagation is done in sweeps over the whole changed frontier. In each
+    sweep, the options allowed by every frontier cell are computed for all
+    four directions with one matrix product per direction, so the number of
+    Python-level iterations depends on how far the changes travel rather than
+    on how many cells they touch.
+    """
+    __slots__ = (
+        '_bias',
+        '_changes',
+        '_entropy',
+        '_full_entropy',
+        '_neighbours',
+        '_remaining',
+        '_rng',
+        '_supports',
+        '_was_reset',
+        '_weights'
+    )
+    def __init__(self,
+        patterns: list[TileImage],
+        output_dimension: tuple[int, int],
+        adjacency: _Adjacency,
+        rng: Optional[rand.Random] = None
+    ):
+        super().__init__(patterns, output_dimension)
+        self._bias = None
+        self._rng = rand if rng is None else rng
+        # options of a cell @ supports[d] gives the options allowed for
+        # its neighbour in direction d, sparse tables stay sparse
+        self._supports = [adjacency[d].T.astype(np.float32) for d in range(len(_DIRECTIONS))]
+
+        frequencies = np.array([tile.frequency for tile in patterns], dtype=float)
+        self._weights = np.stack((frequencies, frequencies * np.log2(frequencies)), axis=1)
+        # entropy of a cell with every option, computed the same way as in `_update`
+        total, weighted = (np.ones((1, len(patterns)), dtype=bool) @ self._weights)[0]
+        self._full_entropy = np.log2(total) - weighted / total if len(patterns) > 1 else np.inf
+        self._changes = None
+        self._was_reset = False
+
+        rows, cols = np.divmod(np.arange(output_dimension[0] * output_dimension[1]), output_dimension[1])
+        self._neighbours = np.full((len(_DIRECTIONS), rows.size), -1)
+        for d, (row_off, col_off) in enumerate(((-1, 0), (1, 0), (0, -1), (0, 1))):
+            valid = (
+                (rows + row_off > -1) & (rows + row_off < output_dimension[0]) &
+                (cols + col_off > -1) & (cols + col_off < output_dimension[1])
+            )
+            self._neighbours[d, valid] = (rows[valid] + row_off) * output_dimension[1] + cols[valid] + col_off
+
+    @property
+    def is_collapsed(self) -> bool:
+        return not self._remaining
+
+    @property
+    def rng_state(self) -> tuple:
+        """
+        The state of the random generator of the grid, as given by `random.Random.getstate()`.
+        """
+        return self._rng.getstate()
+    @rng_state.setter
+    def rng_state(self, value: tuple):
+        self._rng.setstate(value)
+
+    def seed(self, value: int):
+        """
+        Reseed the random generator of the grid.
+        """
+        self._rng.seed(value)
+
+    def reset(self):
+        """
+        Give every cell all options again. The arrays of the grid are reused.
+        """
+        n_cells, n_patterns = self._neighbours.shape[1], len(self._weights)
+        if self.wave is None:
+            self.wave = np.ones((n_cells, n_patterns), dtype=bool)
+            self._count = np.full(n_cells, n_patterns)
+            self._entropy = np.empty(n_cells)
+        else:
+            self.wave.fill(True)
+            self._count.fill(n_patterns)
+        self._entropy.fill(self._full_entropy)
+        self._bias = None
+        self._remaining = n_cells if n_patterns > 1 else 0
+        if not self._changes is None:
+            self._changes.clear()
+            self._was_reset = True
+
+    def load(self, domains: NDArray, queue: Optional[NDArray] = None):
+        """
+        Replace the state of the grid with the given domains. Since cells are
+        picked from the wave directly, there is no queue and `queue` is ignored.
+        """
+        if self.wave is None:
+            self.wave = domains.copy()
+            self._count = np.ones(len(domains), dtype=int)
+            self._entropy = np.empty(len(domains))
+        else:
+            self.wave[:] = domains
+            self._count.fill(1)
+        self._bias = None
+        self._remaining = 0
+        self._update(np.arange(len(domains)), self._count.copy())
+        if not self._changes is None:
+            self._changes[:] = [np.flatnonzero(self._count < len(self._weights))]
+            self._was_reset = True
+
+    def queue_entries(self) -> None:
+        """
+        There is no queue to save, see `load()`.
+        """
+        return None
+
+    def _update(self, indices: NDArray, prev_count: NDArray):
+        """
+        Refresh the option counts and entropies of the given cells.
+        """
+        count = self.wave[indices].sum(axis=1)
+        self._count[indices] = count
+        self._remaining += np.count_nonzero(count > 1) - np.count_nonzero(prev_count > 1)
+
+        total, weighted = (self.wave[indices] @ self._weights).T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._entropy[indices] = np.where(count > 1, np.log2(total) - weighted / total, np.inf)
+
+    def pop(self) -> int:
+        """
+        Return the index of the uncollapsed cell with the lowest entropy.
+        """
+        return int(np.argmin(self._entropy if self._bias is None else self._entropy - self._bias))
+
+    def set_bias(self, bias: Optional[NDArray]):
+        """
+        Take `bias` off the entropy of every cell when picking the next cell to
+        collapse, `None` for no bias. This is given after `reset()` or `load()`,
+        which both clear the bias.
+        """
+        self._bias = bias
+
+    def collapse(self, index: int, tile: Optional[int] = None) -> int:
+        """
+        Collapse a cell, either randomly or to the given pattern.
+
+        :return int: The index of the pattern the cell has collapsed to.
+        """
+        if tile is None:
+            options = np.flatnonzero(self.wave[index])
+            tile = int(self._rng.choices(options, weights=self._weights[options, 0])[0])
+        self.wave[index] = False
+        self.wave[index, tile] = True
+
+        indices = np.array([index])
+        self._update(indices, self._count[indices])
+        if not self._changes is None: self._changes.append(indices)
+        return tile
+
+    def random_cell(self, weights: Optional[NDArray] = None) -> int:
+        """
+        Pick a cell uniformly, or in proportion to `weights` if given.
+        """
+        if weights is None: return self._rng.randint(0, len(self._count) - 1)
+        return _weighted_choice(self._rng, weights)
+
+    def contradictions(self) -> NDArray:
+        """
+        The indices of the cells without options.
+        """
+        return np.flatnonzero(self._count == 0)
+
+    def propagate(self, index: int | NDArray, fixpoint: bool = False) -> bool:
+        """
+        Propogate state updates from the given cell or cells. Propogation stops
+        as soon as a cell runs out of options, unless `fixpoint` is True, in
+        which case it goes on until no option can be removed.
+        """
+        frontier = np.unique(np.atleast_1d(index))
+        while frontier.size:
+            changed = []
+            for d in range(len(_DIRECTIONS)):
+                targets = self._neighbours[d, frontier]
+                sources, targets = frontier[targets > -1], targets[targets > -1]
+                if not targets.size: continue
+
+                before = self.wave[targets]
+                after = before & (self.wave[sources].astype(np.float32) @ self._supports[d] > 0)
+                modified = (after != before).any(axis=1)
+                if modified.any():
+                    self.wave[targets[modified]] = after[modified]
+                    changed.append(targets[modified])
+            if not changed: break
+
+            frontier = np.unique(np.concatenate(changed))
+            self._update(frontier, self._count[frontier])
+            if not self._changes is None: self._changes.append(frontier)
+            if not (fixpoint or self._count[frontier].all()): return False
+        return not fixpoint or bool(self._count.all())
+
+    def track_changes(self, enable: bool):
+        """
+        Start or stop recording which cells change, see `changes()`. When started
+        on a grid in use, every cell that does not have all options is reported.
+        """
+        if not enable: self._changes = None
+        elif self._changes is None:
+            self._changes = []
+            if not self.wave is None:
+                self._changes.append(np.flatnonzero(self._count < len(self._weights)))
+                self._was_reset = True
+
+    def changes(self) -> tuple[bool, NDArray]:
+        """
+        The cells changed since the last call, while changes are tracked.
+
+        :return: A tuple of whether or not every cell was given all options again
+            before the changes, and the sorted indices of the changed cells.
+        :rtype: tuple[bool, numpy.NDArray]
+        """
+        reset, self._was_reset = self._was_reset, False
+        if not self._changes: return reset, np.empty(0, dtype=int)
+        cells = np.unique(np.concatenate(self._changes))
+        self._changes.clear()
+        return reset, cells
+
+def _presolve(
     patterns: list[TileImage],
     output_dimension: tuple[int, int],
-    repeat_until_success: bool
-) -> Generator[NDArray, None, tuple[bool, NDArray]]:
+    adjacency: Optional[_Adjacency] = None
+) -> NDArray:
+    """
+    Enforce arc consistency of the adjacency rules over the whole grid before
+    any collapse. Every option that has no compatible option in one of the
+    neighbouring cells is removed until none is left to remove. This takes care of
+    patterns that cannot be placed anywhere and of the restrictions of border cells.
+    Since no solution uses a removed option, attempts can start from the result
+    instead of full superposition.
+
+    :param list[TileImage] patterns: The tileset.
+    :param tuple[int, int] output_dimension: The dimension of the grid.
+    :param _Adjacency, optional adjacency: Compiled adjacency tables of the tileset.
+        This is `None` by default, which compiles them.
+    :return numpy.NDArray: The domains of every cell as a boolean array of shape
+        `(n_cells, n_patterns)`. If a cell has no option left, the grid
+        cannot be filled with the tileset. Since a cell without options leaves
+        its neighbours without options too, no cell has options left then.
     """
-    Wave function collapse on a set of tiles. In order to work properly,
-    this set should contain square tiles with the same shape.
+    grid = _make_grid(patterns, output_dimension, 'batched', adjacency)
+    grid.reset()
+    grid.propagate(np.arange(output_dimension[0] * output_dimension[1]), fixpoint=True)
+    return grid.domains()
+
+def _weighted_choice(rng: rand.Random, weights: NDArray) -> int:
+    """
+    Pick an index in proportion to non-negative `weights`.
+    """
+    return rng.choices(range(len(weights)), cum_weights=np.cumsum(weights).tolist())[0]
+
+def _colour_table(patterns: list[TileImage]) -> NDArray:
+    """
+    The average colour of every pattern as a float array of shape `(n_patterns, 3)`.
+    """
+    return np.stack([tile.image for tile in patterns]).mean(axis=(1, 2))
+
+def _mean_colours(domains: NDArray, count: NDArray, colours: NDArray) -> NDArray:
+    """
+    The average colour of the options of every cell with one matrix product.
+
+    :param NDArray domains: Boolean array of shape `(n_cells, n_patterns)`.
+    :param NDArray count: The number of options of every cell.
+    :param NDArray colours: The colour table given by `_colour_table`.
+    :return NDArray: A uint8 array of shape `(n_cells, 3)`, cells without options are black.
+    """
+    # rows of cells without options are all zeros already
+    return ((domains @ colours) / np.maximum(count, 1)[:, None]).astype('uint8')
+
+def _window_indices(output_dimension: tuple[int, int], window: Optional[_Window]) -> NDArray:
+    """
+    The flattened indices of the cells of a window, as an array of the shape of the window.
+    """
+    indices = np.arange(output_dimension[0] * output_dimension[1]).reshape(output_dimension)
+    return indices if window is None else indices[window]
+
+def _make_grid(
+    patterns: list[TileImage],
+    output_dimension: tuple[int, int],
+    propagation: Literal['stack', 'batched'] = 'stack',
+    adjacency: Optional[_Adjacency] = None,
+    rng: Optional[rand.Random] = None
+) -> _CellGrid | _WaveGrid:
+    """
+    Create the grid used by the given propagation mode. See `_wfc` for the parameters.
+    """
+    if propagation == 'batched':
+        if adjacency is None: adjacency = _compile_adjacency(patterns)
+        return _WaveGrid(patterns, output_dimension, adjacency, rng)
+    return _CellGrid(patterns, output_dimension, rng)
+
+def _propagate_with_stats(
+    grid: _CellGrid | _WaveGrid,
+    index: int | NDArray,
+    stats: Optional['RunStats']
+) -> bool:
+    """
+    Propogate state updates on the grid and count it in `stats`.
+    """
+    if stats is None: return grid.propagate(index)
+
+    start = time.perf_counter()
+    valid = grid.propagate(index)
+    stats.propagations += 1
+    stats.propagation_seconds += time.perf_counter() - start
+    if not valid: stats.contradictions += 1
+    return valid
+
+def _wfc(
+    grid: _CellGrid | _WaveGrid,
+    repeat_until_success: bool,
+    log: Optional['DecisionLog'] = None,
+    initial: Optional[NDArray] = None,
+    stats: Optional['RunStats'] = None,
+    state: Optional[tuple[NDArray, Optional[NDArray]]] = None,
+    frames: bool = True,
+    policy: Optional[RestartPolicy] = None
+) -> Generator[Optional[NDArray], None, tuple[bool, NDArray]]:
+    """
+    Wave function collapse on a grid of cells created by `_make_grid`. In order
+    to work properly, the tileset of the grid should contain square tiles with
+    the same shape.
 
     This function is actually a generator that yields the state of the grid after
     propogation is done, the state is given as a numpy.NDArray that represents an
@@ -112,9 +856,9 @@ def _wfc(
     See the example below for usage of this function:
     ```python
     >>> from wfc.cell_image import TileImage
-    >>> from wfc._algos import _wfc
+    >>> from wfc._algos import _make_grid, _wfc
     >>> patterns = [TileImage(...) for tile in tileset] # load patterns
-    >>> for grid_as_img in _wfc(patterns, (5, 5), False):
+    >>> for grid_as_img in _wfc(_make_grid(patterns, (5, 5)), False):
     ...     f'Draw image or something {grid_as_img}'
     >>> # This however won't give you the return value.
     >>> # There a few ways to do it. The easiest is creating a class wrapper and use yield from.
@@ -123,7 +867,7 @@ def _wfc(
     ...         self.gen = generator
     ...     def __iter__(self):
     ...         self.result = yield from self.gen
-    ... inner_gen = _wfc(patterns, (5, 5), False)
+    ... inner_gen = _wfc(_make_grid(patterns, (5, 5)), False)
     ... gen = CustomGen(inner_gen)
     ... # If we don't want the intermediate results, just do nothing during iterating.
     ... for _ in gen:
@@ -133,36 +877,133 @@ def _wfc(
     (tuple, 2)
     ```
 
-    :param list[TileImage] patterns: The tileset to perform WFC on.
-    :param tuple[int, int] output_dimension: The dimension of the output grid.
+    :param _CellGrid | _WaveGrid grid: The grid to perform WFC on.
     :param bool repeat_until_success: Whether or not to reset the grid if one 
         of the cell become invalid.
+    :param DecisionLog, optional log: Log to record every collapse decision in.
+        This is `None` by default.
+    :param numpy.NDArray, optional initial: Domains of shape `(n_cells, n_patterns)`
+        to start every attempt from instead of full superposition. Constraints of the
+        cells that are already collapsed are propogated before any other collapse. If
+        these constraints cannot be satisfied, the algorithm stops without retrying.
+        If no cell is collapsed, a random cell is collapsed first like on a full grid.
+        This is `None` by default.
+    :param RunStats, optional stats: Statistics to update while running.
+        This is `None` by default.
+    :param tuple[numpy.NDArray, numpy.NDArray | None], optional state: Domains of shape
+        `(n_cells, n_patterns)` and queue entries of the grid saved in the middle of an
+        attempt. The algorithm continues that attempt instead of starting a new one,
+        without giving the image of the saved state again, and later attempts start
+        as usual. This is `None` by default.
+    :param bool, optional frames: Whether or not to yield the image of the grid after
+        every step. If this is False, `None` is yielded instead, which saves rendering
+        the whole grid every step. This is `True` by default.
+    :param RestartPolicy, optional policy: Policy limiting the attempts and the time of
+        the run, and biasing the cells picked in every new attempt. Its `begin()` should be
+        called before running, with the attempts made before `state` was saved if given.
+        The time the generator is paused at a step is not counted. This is `None` by default.
     """
-    intermediate_result = lambda: concat_grid(matrix, patterns[0].image.shape, output_dimension)
     success = False
-    
+    pinned = np.empty(0, dtype=int) if initial is None else np.flatnonzero(initial.sum(axis=1) == 1)
+    if not policy is None: policy.resume()
+
     while not success:
-        matrix = [Cell(patterns) for _ in range(output_dimension[0] * output_dimension[1])]
-        min_index = rand.randint(0, output_dimension[0] * output_dimension[1] - 1)
-        matrix[min_index].collapse()
-        
-        non_collapsed = PriorityQueue((
-            _CellDataContainer(i, cell)
-            for i, cell in enumerate(matrix) if not cell.is_collapsed
-        ))
-        _propogate(min_index, output_dimension, matrix, non_collapsed)
+        if not state is None:
+            # the image of the saved state was given before saving
+            grid.load(*state)
+            valid = bool(state[0].any(axis=1).all())
+            state = None
+        else:
+            if not policy is None: policy.start_attempt()
+            if not log is None: log.new_attempt()
+            if not stats is None: stats.attempts += 1
+            if initial is None: grid.reset()
+            else: grid.load(initial)
+            if not policy is None: grid.set_bias(policy.cell_bias())
 
-        yield intermediate_result()
+            if not pinned.size:
+                min_index = grid.random_cell(None if policy is None else policy.first_cell_weights())
+                tile = grid.collapse(min_index)
+                if not log is None: log.record(min_index, tile)
+                if not stats is None: stats.collapses += 1
+                if not policy is None: policy.record_collapse()
+                valid = _propagate_with_stats(grid, min_index, stats)
+            elif not (valid := _propagate_with_stats(grid, pinned, stats)):
+                if not policy is None: policy.end_attempt(False, grid.contradictions())
+                break
 
-        while not (success := all(cell.is_collapsed for cell in matrix)):
-            temp = non_collapsed.pop()
-            min_index, cell = temp.index, temp.cell
+            if not policy is None: policy.pause()
+            yield grid.render() if frames else None
+            if not policy is None: policy.resume()
 
-            cell.collapse()
-            if not _propogate(min_index, output_dimension, matrix, non_collapsed): break
+        while valid and not (success := grid.is_collapsed):
+            if not policy is None and policy.expired: break
+            min_index = grid.pop()
+            tile = grid.collapse(min_index)
+            if not log is None: log.record(min_index, tile)
+            if not stats is None: stats.collapses += 1
+            if not policy is None: policy.record_collapse()
+            if not (valid := _propagate_with_stats(grid, min_index, stats)): break
+
+            if not policy is None: policy.pause()
+            yield grid.render() if frames else None
+            if not policy is None: policy.resume()
+
+        if not policy is None:
+            policy.end_attempt(success, np.empty(0, dtype=int) if valid else grid.contradictions())
+        if not repeat_until_success or not (policy is None or policy.allows_restart()): break
+    return success, grid.render()
+
+def _solve_region(
+    patterns: list[TileImage],
+    tiles: NDArray,
+    region: NDArray,
+    propagation: Literal['stack', 'batched'],
+    adjacency: Optional[_Adjacency],
+    repeat_until_success: bool,
+    seed: int,
+    max_attempts: Optional[int] = None
+) -> tuple[bool, NDArray]:
+    """
+    Solve the cells of a region of a grid of pattern indices. Collapsed cells
+    outside of the region constrain it, uncollapsed ones (-1) are left free.
+    Only the bounding box of the region and the cells around it are solved.
+    This is a module-level function so that it can run in other processes.
+
+    :param list[TileImage] patterns: The tileset.
+    :param numpy.NDArray tiles: Pattern indices of the grid.
+    :param numpy.NDArray region: Boolean mask of the cells to solve.
+    :param int, optional max_attempts: The maximum number of attempts when
+        `repeat_until_success` is True. This is `None` by default, which means no limit.
+    :return: A tuple of bool and numpy.NDArray. The bool represents whether or not
+        all cells of the region have been collapsed. The numpy.NDArray is a copy of
+        `tiles` with the cells of the region replaced, -1 for those not collapsed.
+    :rtype: tuple[bool, numpy.NDArray]
+    """
+    tiles = tiles.copy()
+    if not region.any(): return True, tiles
 
-            yield intermediate_result()
+    rows, cols = np.nonzero(region)
+    top, left = max(rows.min() - 1, 0), max(cols.min() - 1, 0)
+    bottom, right = min(rows.max() + 2, tiles.shape[0]), min(cols.max() + 2, tiles.shape[1])
+    sub_tiles, sub_region = tiles[top:bottom, left:right], region[top:bottom, left:right]
 
+    free = (sub_region | (sub_tiles < 0)).ravel()
+    initial = np.zeros((sub_tiles.size, len(patterns)), dtype=bool)
+    initial[free] = True
+    pinned = np.flatnonzero(~free)
+    initial[pinned, sub_tiles.ravel()[pinned]] = True
 
-        if not repeat_until_success: break
-    return success, intermediate_result()
\ No newline at end of file
+    grid = _make_grid(patterns, sub_tiles.shape, propagation, adjacency, rand.Random(seed))
+    policy = None
+    if not max_attempts is None:
+        policy = RestartPolicy(max_attempts)
+        policy.begin(sub_tiles.shape)
+    generator = _wfc(grid, repeat_until_success, initial=initial, frames=False, policy=policy)
+    while True:
+        try: next(generator)
+        except StopIteration as exc:
+            success = exc.value[0]
+            break
+    sub_tiles[sub_region] = grid.tiles()[sub_region]
+    return success, tiles
@@ -0,0 +1,183 @@
+import os
+import queue
+import threading
+
+import numpy as np
+
+from PIL import Image
+
+
+from numpy.typing import NDArray
+from typing import Optional
+
+
+# Marks the end of the frames in the queue of the encoder.
+_END = None
+
+class AnimationWriter:
+    """
+    Encode frames into an animated image file without a display. Frames are
+    converted and the file is written in a background thread fed through a
+    bounded queue, so the producer only waits when the encoder falls `queue_size`
+    frames behind, and `close()` only waits for the file to be written.
+    The format is chosen from the extension of the file, any animated format
+    supported by Pillow works, such as `.gif`, `.png` (APNG) or `.webp`.
+    ```python
+    >>> with AnimationWriter('run.gif', max_frames=200) as writer:
+    ...     for image in wfc:
+    ...         writer.add(image)
+    ```
+
+    To keep files small, only every `every`-th frame is kept. With `max_frames`,
+    every other kept frame is dropped and the interval is doubled whenever more
+    than `max_frames` frames are kept, so that long runs of unknown length end up
+    with between half of `max_frames` and `max_frames` evenly spaced frames, and
+    no more than that are held in memory. The last frame added is always kept.
+    Pillow writes animations in one go, so without `max_frames` every kept frame
+    is held in memory until the file is written.
+    """
+    __slots__ = (
+        '_added',
+        '_error',
+        '_filepath',
+        '_frames',
+        '_kept',
+        '_kwargs',
+        '_last',
+        '_max_frames',
+        '_queue',
+        '_scale',
+        '_stride',
+        '_thread'
+    )
+    def __init__(self,
+        filepath: str, *,
+        every: int = 1,
+        max_frames: Optional[int] = None,
+        duration: int = 50,
+        loop: int = 0,
+        scale: int = 1,
+        queue_size: int = 32
+    ):
+        """
+        :param str filepath: The file to write to.
+        :param int, optional every: Keep one frame out of `every`. This is `1` by default.
+        :param int, optional max_frames: The maximum number of frames in the file. This
+            is `None` by default, which means no limit.
+        :param int, optional duration: Time in milliseconds each frame is shown.
+            This is `50` by default.
+        :param int, optional loop: Number of times the animation is repeated, `0` means
+            forever. This is `0` by default.
+        :param int, optional scale: Factor to enlarge the frames by, without smoothing.
+            This is `1` by default.
+        :param int, optional queue_size: The maximum number of frames waiting to be encoded.
+            This is `32` by default.
+        """
+        for name, value in (('every', every), ('scale', scale), ('queue_size', queue_size)):
+            if not isinstance(value, int): raise TypeError(f'{name} must be a positive integer')
+            elif value < 1: raise ValueError(f'{name} must be a positive integer')
+        if not max_frames is None:
+            if not isinstance(max_frames, int): raise TypeError('max_frames must be an integer larger than 1')
+            elif max_frames < 2: raise ValueError('max_frames must be an integer larger than 1')
+
+        self._filepath = filepath
+        self._max_frames = max_frames
+        self._scale = scale
+        self._kwargs = {'duration': duration, 'loop': loop}
+        # only the producer reads or changes these, see `add()`
+        self._stride = every
+        self._added = 0
+        self._kept = 0
+        self._last = None
+        self._frames: list[Image.Image] = []
+        self._error = None
+
+        self._queue = queue.Queue(queue_size)
+        self._thread = threading.Thread(target=self._encode, daemon=True)
+        self._thread.start()
+
+    def _convert(self, frame: NDArray) -> Image.Image:
+        image = Image.fromarray(np.ascontiguousarray(frame, dtype='uint8'))
+        if self._scale > 1:
+            image = image.resize((image.width * self._scale, image.height * self._scale),
+                                 Image.Resampling.NEAREST)
+        if os.path.splitext(self._filepath)[1].lower() == '.gif':
+            image = image.quantize(256)
+        return image
+
+    def _encode(self):
+        """
+        Convert frames from the queue until the end marker, then write the file.
+        Frames are dropped the same way as the producer doubles its interval in `add()`.
+        """
+        newest = None
+        while (frame := self._queue.get()) is not _END:
+            if not self._error is None: continue
+            try:
+                newest = self._convert(frame)
+            except Exception as exc:
+                self._error = exc
+                continue
+            self._frames.append(newest)
+            if not self._max_frames is None and len(self._frames) > self._max_frames:
+                del self._frames[1::2]
+        if not self._error is None: return
+
+        frames, self._frames = self._frames, []
+        # the last frame may have been dropped above, it replaces the one before it
+        if not newest is None and frames[-1] is not newest:
+            frames.append(newest)
+            if not self._max_frames is None and len(frames) > self._max_frames: del frames[-2]
+        try:
+            if not frames: raise ValueError('No frame to write')
+            frames[0].save(self._filepath, save_all=True, append_images=frames[1:], **self._kwargs)
+        except Exception as exc:
+            self._error = exc
+
+    def _put(self, frame: NDArray):
+        if not self._error is None: raise self._error
+        self._queue.put(frame)
+
+    def add(self, frame: NDArray):
+        """
+        Add the next frame of the animation. The frame should not be modified afterward.
+
+        :param numpy.NDArray frame: An RGB image as a numpy array.
+        """
+        if self._added % self._stride == 0:
+            self._put(frame)
+            self._last = None
+            self._kept += 1
+            # the encoder drops every other frame at the same point
+            if not self._max_frames is None and self._kept > self._max_frames:
+                self._kept -= self._kept // 2
+                self._stride *= 2
+        else:
+            self._last = frame
+        self._added += 1
+
+    def close(self):
+        """
+        Encode the remaining frames and wait for the file to be written.
+        The writer cannot be used afterward.
+
+        :raise ValueError: If no frame has been added.
+        """
+        if not self._last is None: self._put(self._last)
+        self._queue.put(_END)
+        self._thread.join()
+        if not self._error is None: raise self._error
+
+    def discard(self):
+        """
+        Stop encoding without writing the file.
+        """
+        self._error = self._error or RuntimeError('Writer was discarded')
+        self._queue.put(_END)
+        self._thread.join()
+
+    def __enter__(self) -> 'AnimationWriter': return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None: self.close()
+        else: self.discard()
@@ -46,6 +46,12 @@ class TileImage:
         Image representation of the tile.
         """
         return self._pattern
+
+    def _fingerprint_data(self) -> tuple[NDArray, ...]:
+        """
+        The arrays identifying the tile in `wfc.metrics.tileset_fingerprint`.
+        """
+        return self.image,
     
     def is_adjacent_to(self, tile: 'TileImage', direction: Direction) -> bool:
         """
@@ -69,14 +75,17 @@ class TileImage:
         :return: Whether or not the current cell can be adjacent to the given cell.
         :rtype: bool
         """
+        # images are read through the property, so that subclasses storing
+        # their pixels differently can be compared with this one
+        this, other = self.image, tile.image
         if direction == Direction.UP:
-            result = (self._pattern[-1] == tile._pattern[0]).all()
+            result = (this[-1] == other[0]).all()
         elif direction == Direction.DOWN:
-            result = (self._pattern[0] == tile._pattern[-1]).all()
+            result = (this[0] == other[-1]).all()
         elif direction == Direction.LEFT:
-            result = (self._pattern[:, -1] == tile._pattern[:, 0]).all()
+            result = (this[:, -1] == other[:, 0]).all()
         elif direction == Direction.RIGHT:
-            result = (self._pattern[:, 0] == tile._pattern[:, -1]).all()
+            result = (this[:, 0] == other[:, -1]).all()
         else:
             raise ValueError("Weird direction passed")
         return result
@@ -86,8 +95,12 @@ class Cell:
     """
     An uncollapse cell within a grid. A cell comprises of
     multiple states from a list of predefined `TileImage`.
+
+    The list of options is never modified in place, narrowing a cell always
+    gives it a new list. Cells made with `copy()` can therefore share the options
+    of another cell until they are narrowed.
     """
-    __slots__ = '_collapsed', '_options'
+    __slots__ = '_collapsed', '_entropy', '_options'
     def __init__(self, patterns: Iterable[TileImage]):
         """
         Initialize an uncollapse cells from a list of `TileImage`.
@@ -104,6 +117,24 @@ class Cell:
             raise ValueError('patterns is empty...')
         
         self._collapsed = False
+        self._entropy = None
+
+    def copy(self) -> 'Cell':
+        """
+        A cell with the same state, sharing the options of this cell.
+        """
+        cell = Cell.__new__(Cell)
+        cell.assign(self)
+        return cell
+
+    def assign(self, cell: 'Cell'):
+        """
+        Replace the state of this cell with the state of the given cell,
+        sharing its options.
+        """
+        self._options = cell._options
+        self._collapsed = cell._collapsed
+        self._entropy = cell._entropy
 
     @property
     def entropy(self) -> float:
@@ -123,17 +154,20 @@ class Cell:
         where :math:`n` is the number of possible states for a cell and
         :math:`\text{freq}_i` is the frequency of the *i*-th state.
 
+        The value is computed once and kept until the options change.
+
         :return: The entropy duh.
         :rtype: float
         """
         if self._collapsed: return 0
         elif not len(self._options): return np.inf
-
-        total = sum(tile.frequency for tile in self._options)
-        return (
-            np.log2(total) -
-            sum(tile.frequency * np.log2(tile.frequency) for tile in self._options) / total
-        )
+        elif self._entropy is None:
+            total = sum(tile.frequency for tile in self._options)
+            self._entropy = (
+                np.log2(total) -
+                sum(tile.frequency * np.log2(tile.frequency) for tile in self._options) / total
+            )
+        return self._entropy
     
     @property
     def image(self) -> Optional[NDArray]:
@@ -156,6 +190,13 @@ class Cell:
     
     @property
     def is_collapsed(self) -> bool: return self._collapsed
+
+    @property
+    def options(self) -> tuple[TileImage, ...]:
+        """
+        The tiles this cell can still collapse to.
+        """
+        return tuple(self._options)
     
     @property
     def is_valid(self) -> bool:
@@ -190,15 +231,37 @@ class Cell:
                     break
 
         updated = len(new_options) != len(self._options)
+        if updated: self._entropy = None
         self._options = new_options
-        if len(self._options) == 1: self.collapse()
+        if len(self._options) == 1 and not self._collapsed: self.collapse()
         return updated
 
-    def collapse(self):
+    def collapse(self,
+        tile: Optional[TileImage] = None,
+        rng: Optional[rand.Random] = None
+    ) -> TileImage:
         """
         Collapse the current cell. This will randomly pick an option
         from the available options.
+
+        :param TileImage, optional tile: The option to collapse to. This is `None`
+            by default, in which case an option is picked randomly.
+        :param random.Random, optional rng: The random generator to pick with. This is
+            `None` by default, which uses the module-level functions of `random`.
+        :return TileImage: The tile the cell has collapsed to.
+        """
+        if tile is None:
+            counts = [tile.frequency for tile in self._options]
+            self._options = (rand if rng is None else rng).sample(self._options, 1, counts=counts)
+        else:
+            self._options = [tile]
+        self._collapsed = True
+        self._entropy = None
+        return self._options[0]
+
+    def clear(self):
+        """
+        Remove every option, leaving the cell invalid as after a contradiction.
         """
-        counts = [tile.frequency for tile in self._options]
-        self._options = rand.sample(self._options, 1, counts=counts)
-        self._collapsed = True
\ No newline at end of file
+        self._options = []
+        self._entropy = None
\ No newline at end of file
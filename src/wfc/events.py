@@ -0,0 +1,154 @@
+import numpy as np
+
+from dataclasses import dataclass
+
+from ._algos import _mean_colours
+
+
+from numpy.typing import NDArray
+from typing import Optional
+
+
+@dataclass
+class GridDelta:
+    """
+    The cells of a grid changed by one step of the wave function collapse,
+    as given by `WFC.deltas()`. Collapsed cells are sent as the index of their
+    pattern, the other changed cells as a bitmask of their options packed with
+    `numpy.packbits`, so the size of a delta depends on the number of changed
+    cells rather than on the size of the grid.
+
+    :param bool reset: Whether or not every cell was given all options again before
+        the changes, as at the start of an attempt. Cells that are not in the delta
+        then have all options.
+    :param numpy.NDArray collapsed_cells: The indices (in the flattened grid) of the
+        changed cells left with one option.
+    :param numpy.NDArray collapsed_tiles: The index of the pattern of every cell
+        in `collapsed_cells`.
+    :param numpy.NDArray domain_cells: The indices of the other changed cells.
+    :param numpy.NDArray domains: The packed options of every cell in `domain_cells`,
+        a uint8 array of shape `(len(domain_cells), ceil(n_patterns / 8))`. Cells
+        without options, which end a failed attempt, have no bit set.
+    """
+    reset: bool
+    collapsed_cells: NDArray
+    collapsed_tiles: NDArray
+    domain_cells: NDArray
+    domains: NDArray
+
+    @classmethod
+    def from_domains(cls, reset: bool, cells: NDArray, domains: NDArray) -> 'GridDelta':
+        """
+        Create a delta from the changed cells and their options as a boolean
+        array of shape `(len(cells), n_patterns)`.
+        """
+        single = domains.sum(axis=1) == 1
+        return cls(
+            reset,
+            cells[single], domains[single].argmax(axis=1),
+            cells[~single], np.packbits(domains[~single], axis=1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.collapsed_cells) + len(self.domain_cells)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The number of bytes of the arrays of the delta.
+        """
+        return (self.collapsed_cells.nbytes + self.collapsed_tiles.nbytes
+                + self.domain_cells.nbytes + self.domains.nbytes)
+
+class DeltaBuffer:
+    """
+    Copy of the state of a grid kept up to date from `GridDelta`s, such as on the
+    client side of a remote visualiser. Applying a delta only touches the cells
+    in it.
+    ```python
+    >>> colours = np.array([tile.image.mean(axis=(0, 1)) for tile in wfc.patterns])
+    >>> buffer = DeltaBuffer(wfc.output_dimension, wfc.n_patterns, colours)
+    >>> for delta in wfc.deltas():
+    ...     changed = buffer.apply(delta)
+    ...     f'Redraw the cells at {changed} from {buffer.image}'
+    >>> buffer.tiles
+    ```
+
+    If `colours` is given, `image` holds the average colour of the options of
+    every cell, as `WFC.view(lod='cell')` does.
+    """
+    __slots__ = '_colours', '_full', '_masks', '_n_patterns', '_output_dim', '_tiles', 'image'
+    def __init__(self,
+        output_dimension: tuple[int, int],
+        n_patterns: int,
+        colours: Optional[NDArray] = None
+    ):
+        """
+        :param tuple[int, int] output_dimension: The dimension of the grid.
+        :param int n_patterns: The number of patterns of the tileset.
+        :param numpy.NDArray, optional colours: The colour of every pattern as an
+            array of shape `(n_patterns, 3)`, such as the average colour of its image.
+            This is `None` by default, in which case no image is kept.
+        """
+        if not colours is None and np.shape(colours) != (n_patterns, 3):
+            raise ValueError(f'colours must have shape ({n_patterns}, 3): {np.shape(colours)}')
+        n_cells = output_dimension[0] * output_dimension[1]
+        self._output_dim = output_dimension
+        self._n_patterns = n_patterns
+        self._full = np.packbits(np.ones(n_patterns, dtype=bool))
+        self._masks = np.empty((n_cells, len(self._full)), dtype='uint8')
+        self._tiles = np.empty(n_cells, dtype=int)
+        self._colours = None if colours is None else np.asarray(colours, dtype=float)
+        self.image = None if colours is None else np.empty((*output_dimension, 3), dtype='uint8')
+        self.clear()
+
+    @property
+    def tiles(self) -> NDArray:
+        """
+        The pattern index of every cell with one option as an array of shape
+        `output_dimension`. The other cells are given -1.
+        """
+        return self._tiles.reshape(self._output_dim)
+
+    def domains(self, indices: Optional[NDArray] = None) -> NDArray:
+        """
+        The options of every cell, or of the cells at `indices`, as a boolean
+        array of shape `(n_cells, n_patterns)`.
+        """
+        masks = self._masks if indices is None else self._masks[indices]
+        return np.unpackbits(masks, axis=1, count=self._n_patterns).astype(bool)
+
+    def clear(self):
+        """
+        Give every cell all options.
+        """
+        self._masks[:] = self._full
+        self._tiles.fill(0 if self._n_patterns == 1 else -1)
+        if not self.image is None:
+            self.image[:] = _mean_colours(np.ones((1, self._n_patterns), dtype=bool),
+                                          np.array([self._n_patterns]), self._colours)
+
+    def apply(self, delta: GridDelta) -> NDArray:
+        """
+        Update the buffer with a delta.
+
+        :param GridDelta delta: The delta, deltas should be applied in the order they were given.
+        :return numpy.NDArray: The indices of the cells changed by the delta, or of every
+            cell if the delta resets the grid.
+        """
+        if delta.reset: self.clear()
+        cells, tiles = delta.collapsed_cells, delta.collapsed_tiles
+        self._tiles[cells] = tiles
+        self._masks[cells] = 0
+        self._masks[cells, tiles // 8] = 0x80 >> (tiles % 8)
+
+        self._tiles[delta.domain_cells] = -1
+        self._masks[delta.domain_cells] = delta.domains
+
+        if not self.image is None:
+            pixels = self.image.reshape(-1, 3)
+            pixels[cells] = self._colours[tiles].astype('uint8')
+            domains = self.domains(delta.domain_cells)
+            pixels[delta.domain_cells] = _mean_colours(domains, domains.sum(axis=1), self._colours)
+        if delta.reset: return np.arange(len(self._tiles))
+        return np.concatenate((cells, delta.domain_cells))
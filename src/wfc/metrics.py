@@ -0,0 +1,317 @@
+import hashlib
+import math
+import threading
+
+import numpy as np
+
+from abc import (
+    ABC,
+    abstractmethod
+)
+from dataclasses import dataclass
+
+from .cell_image import TileImage
+
+
+from typing import (
+    Iterable,
+    Optional
+)
+
+
+# Default upper bounds of histogram buckets, in seconds.
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1., 5., 10., 30., 60., 300.)
+
+# Upper bounds of the buckets for the number of attempts of a run.
+ATTEMPT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+@dataclass
+class RunStats:
+    """
+    Statistics of a single wave function collapse run, filled in by the algorithm.
+
+    :param int attempts: The number of attempts, every restart begins a new attempt.
+    :param int contradictions: The number of attempts that ended with
+        a cell that has no option left.
+    :param int collapses: The number of collapsed cells over all attempts.
+    :param int propagations: The number of times state updates were propogated.
+    :param float propagation_seconds: The time spent propogating.
+    :param float seconds: The time spent running, pauses between steps excluded.
+    """
+    attempts: int = 0
+    contradictions: int = 0
+    collapses: int = 0
+    propagations: int = 0
+    propagation_seconds: float = 0.
+    seconds: float = 0.
+
+def _format_value(value: float) -> str:
+    if math.isinf(value): return '+Inf' if value > 0 else '-Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names: return ''
+    escaped = (
+        value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        for value in values
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+class _Metric(ABC):
+    """
+    Base of the metrics kept in a `MetricsRegistry`.
+    """
+    __slots__ = '_lock', '_samples', 'help', 'label_names', 'name'
+    kind = 'untyped'
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...], lock: threading.Lock):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._lock = lock
+        self._samples = {}
+
+    def _key(self, labels: dict[str, object]) -> tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Expected labels {self.label_names} for {self.name}: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abstractmethod
+    def _lines(self) -> Iterable[str]:
+        """
+        The samples of the metric in Prometheus text exposition format, one line each.
+        """
+
+    def export(self) -> str:
+        """
+        The metric in Prometheus text exposition format.
+        """
+        with self._lock:
+            lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+            lines.extend(self._lines())
+        return '\n'.join(lines) + '\n'
+
+class Counter(_Metric):
+    """
+    Value that only goes up, one per combination of labels.
+    ```python
+    >>> runs = registry.counter('runs_total', 'Number of runs', ('result',))
+    >>> runs.inc(result='success')
+    ```
+    """
+    __slots__ = ()
+    kind = 'counter'
+    def inc(self, amount: float = 1, **labels):
+        """
+        Increase the value of the given labels by `amount`.
+
+        :raise ValueError: If `amount` is negative or the labels do not match `label_names`.
+        """
+        if amount < 0: raise ValueError(f"Counters can only increase: {amount}")
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """
+        The value of the given labels, 0 if it has never been increased.
+        """
+        key = self._key(labels)
+        with self._lock:
+            return self._samples.get(key, 0)
+
+    def _lines(self) -> Iterable[str]:
+        for key, value in self._samples.items():
+            yield f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets, one per combination of labels.
+    ```python
+    >>> durations = registry.histogram('duration_seconds', 'Run time', ('tileset',))
+    >>> durations.observe(0.3, tileset='circuit')
+    ```
+    """
+    __slots__ = 'buckets',
+    kind = 'histogram'
+    def __init__(self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...],
+        lock: threading.Lock,
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, label_names, lock)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        """
+        Add a value to the distribution of the given labels.
+
+        :raise ValueError: If the labels do not match `label_names`.
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._samples.get(key, ([0] * len(self.buckets), 0.))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: counts[i] += 1
+            self._samples[key] = counts, total + value
+
+    def count(self, **labels) -> int:
+        """
+        The number of values observed for the given labels.
+        """
+        key = self._key(labels)
+        with self._lock:
+            return self._samples[key][0][-1] if key in self._samples else 0
+
+    def sum(self, **labels) -> float:
+        """
+        The sum of the values observed for the given labels.
+        """
+        key = self._key(labels)
+        with self._lock:
+            return self._samples[key][1] if key in self._samples else 0.
+
+    def _lines(self) -> Iterable[str]:
+        bucket_names = self.label_names + ('le',)
+        for key, (counts, total) in self._samples.items():
+            for bound, count in zip(self.buckets, counts):
+                labels = _format_labels(bucket_names, key + (_format_value(bound),))
+                yield f'{self.name}_bucket{labels} {count}'
+            labels = _format_labels(self.label_names, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {counts[-1]}'
+
+class MetricsRegistry:
+    """
+    Thread-safe collection of counters and histograms that can be exported in the
+    Prometheus text exposition format, for a scraper or a plain file dump.
+    ```python
+    >>> wfc = WFC((50, 50), patterns, metrics=REGISTRY)
+    >>> wfc.run()
+    >>> print(REGISTRY.export())
+    # HELP wfc_runs_total Number of finished runs.
+    # TYPE wfc_runs_total counter
+    wfc_runs_total{tileset="3f2a0c9d41be",dimension="50x50",result="success"} 1
+    ...
+    ```
+    """
+    __slots__ = '_lock', '_metrics'
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _get(self, cls: type, name: str, help: str, label_names: Iterable[str], **kwargs) -> _Metric:
+        label_names = tuple(label_names)
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, label_names, self._lock, **kwargs)
+        if type(metric) is not cls or metric.label_names != label_names:
+            raise ValueError(f"Metric {name} is already registered with another type or labels")
+        return metric
+
+    def counter(self, name: str, help: str, label_names: Iterable[str] = ()) -> Counter:
+        """
+        Get the counter with the given name, creating it if needed.
+
+        :raise ValueError: If a metric of another type or with other labels has that name.
+        """
+        return self._get(Counter, name, help, label_names)
+
+    def histogram(self,
+        name: str,
+        help: str,
+        label_names: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """
+        Get the histogram with the given name, creating it if needed. `buckets` is
+        only used when creating it.
+
+        :raise ValueError: If a metric of another type or with other labels has that name.
+        """
+        return self._get(Histogram, name, help, label_names, buckets=buckets)
+
+    def export(self) -> str:
+        """
+        All metrics in Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return ''.join(metric.export() for metric in metrics)
+
+    def write(self, filepath: str):
+        """
+        Write `export()` to a file, replacing its content.
+        """
+        with open(filepath, 'w', encoding='utf-8') as file:
+            file.write(self.export())
+
+    def clear(self):
+        """
+        Remove all metrics.
+        """
+        with self._lock:
+            self._metrics.clear()
+
+# Registry shared by the process, WFC only updates it when given as `metrics`.
+REGISTRY = MetricsRegistry()
+
+
+def tileset_fingerprint(patterns: Iterable[TileImage]) -> str:
+    """
+    Short hash identifying a tileset by the type, image and frequency of its tiles.
+    Loading the same tileset again gives the same fingerprint. Tiles loaded lazily
+    by `wfc.utils.load_tiles` are identified by their file name and edges instead
+    of their image, so that they are not decoded.
+    """
+    digest = hashlib.sha1()
+    for tile in patterns:
+        digest.update(repr((type(tile).__qualname__, tile.frequency)).encode())
+        for array in tile._fingerprint_data():
+            digest.update(repr((array.shape, array.dtype.str)).encode())
+            digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()[:12]
+
+def record_run(
+    stats: RunStats,
+    success: bool,
+    fingerprint: str,
+    output_dimension: tuple[int, int],
+    registry: Optional[MetricsRegistry] = None
+):
+    """
+    Update the metrics of wave function collapse runs with a finished run.
+
+    :param RunStats stats: The statistics of the run.
+    :param bool success: Whether or not all cells have been collapsed.
+    :param str fingerprint: The fingerprint of the tileset. See `tileset_fingerprint`.
+    :param tuple[int, int] output_dimension: The dimension of the grid.
+    :param MetricsRegistry, optional registry: The registry to update. This is `None`
+        by default, which uses `REGISTRY`.
+    """
+    if registry is None: registry = REGISTRY
+    names = 'tileset', 'dimension'
+    labels = {'tileset': fingerprint, 'dimension': f'{output_dimension[0]}x{output_dimension[1]}'}
+
+    registry.counter('wfc_runs_total', 'Number of finished runs.', names + ('result',))\
+            .inc(result='success' if success else 'failure', **labels)
+    registry.counter('wfc_attempts_total', 'Number of attempts, including restarts.', names)\
+            .inc(stats.attempts, **labels)
+    registry.counter('wfc_contradictions_total', 'Number of attempts ended by a contradiction.', names)\
+            .inc(stats.contradictions, **labels)
+    registry.counter('wfc_collapses_total', 'Number of collapsed cells.', names)\
+            .inc(stats.collapses, **labels)
+    registry.counter('wfc_propagations_total', 'Number of propagations of state updates.', names)\
+            .inc(stats.propagations, **labels)
+    registry.counter('wfc_propagation_seconds_total', 'Time spent propagating.', names)\
+            .inc(stats.propagation_seconds, **labels)
+    if success:
+        registry.counter('wfc_cells_total', 'Number of cells in successful results.', names)\
+                .inc(output_dimension[0] * output_dimension[1], **labels)
+    registry.histogram('wfc_run_seconds', 'Time to result of finished runs.', names)\
+            .observe(stats.seconds, **labels)
+    registry.histogram('wfc_run_attempts', 'Attempts per finished run.', names, ATTEMPT_BUCKETS)\
+            .observe(stats.attempts, **labels)
@@ -14,11 +14,11 @@ T = TypeVar('T')
 # item = [item, count, is_removed]
 # count used for FIFO structuring when priority is equal
 
-def _counter() -> Iterator[int]:
+def _counter(start: int = 0) -> Iterator[int]:
     """
-    Generator for infinite counting. Value starts from 1.
+    Generator for infinite counting. Value starts from `start + 1`.
     """
-    num = 0
+    num = start
     while (num := num + 1): yield num
 
 class PriorityQueue(Generic[T]):
@@ -85,6 +85,32 @@ class PriorityQueue(Generic[T]):
             if not is_removed: return item
             else: hq.heappop(self._min_heap)
 
+    def entries(self) -> list[tuple[T, int, bool]]:
+        """
+        The entries of the underlying heap as tuples of (item, count, is_removed),
+        in the order they are stored. Rebuilding a queue from these with
+        `from_entries()` gives a queue that pops items in the exact same order.
+
+        :return list[tuple[T, int, bool]]: The entries.
+        """
+        return [tuple(entry) for entry in self._min_heap]
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[tuple[T, int, bool]]) -> 'PriorityQueue[T]':
+        """
+        Rebuild a queue from the entries given by `entries()`.
+
+        :param Iterable[tuple[T, int, bool]] entries: The entries, in the order they were stored.
+        :return PriorityQueue[T]: The queue.
+        """
+        queue = cls()
+        for item, count, is_removed in entries:
+            entry = [item, count, is_removed]
+            queue._min_heap.append(entry)
+            if not is_removed: queue._items_list[item] = entry
+        queue._counter = _counter(max((entry[1] for entry in queue._min_heap), default=0))
+        return queue
+
     def clear(self) -> None:
         """
         Clear the queue.
@@ -0,0 +1,205 @@
+import bisect
+
+import numpy as np
+
+from array import array
+
+from ._algos import _Adjacency, _make_grid
+from .cell_image import TileImage
+
+
+from numpy.typing import NDArray
+from typing import (
+    Literal,
+    Mapping,
+    Optional
+)
+
+
+class DecisionLog:
+    """
+    Compact record of the collapse decisions made during a wave function collapse.
+    Each decision is the cell that was collapsed and the index of the pattern it
+    collapsed to. Since propogation is deterministic, replaying the decisions
+    of an attempt rebuilds the exact state of the grid at every step.
+
+    Steps are numbered across all attempts, in the order the decisions were
+    made. A decision whose propogation leaves a cell without options ends its
+    attempt, and no image is produced for it while running, so steps and
+    images only line up within attempts that succeed.
+    """
+    __slots__ = '_cells', '_starts', '_tiles', 'output_dimension', 'seed'
+    def __init__(self, seed: Optional[int], output_dimension: tuple[int, int]):
+        """
+        :param int | None seed: The seed of the random generator of the run.
+        :param tuple[int, int] output_dimension: The dimension of the grid.
+        """
+        self.seed = seed
+        self.output_dimension = output_dimension
+        self._cells = array('L')
+        self._tiles = array('L')
+        self._starts = array('L')
+
+    @property
+    def attempts(self) -> int:
+        """
+        The number of attempts recorded. Every reset of the grid starts a new attempt.
+        """
+        return len(self._starts)
+
+    def new_attempt(self):
+        """
+        Mark the start of a new attempt on an empty grid.
+        """
+        self._starts.append(len(self._cells))
+
+    def record(self, index: int, tile: int):
+        """
+        Record that the cell at `index` (in the flattened grid) collapsed
+        to the pattern at position `tile`.
+        """
+        self._cells.append(index)
+        self._tiles.append(tile)
+
+    def attempt_start(self, step: int) -> int:
+        """
+        The first step of the attempt the given step belongs to.
+        """
+        if not -1 < step < len(self): raise IndexError(f"Step out of range: {step}")
+        return self._starts[bisect.bisect_right(self._starts, step) - 1]
+
+    def save(self, filepath: str):
+        """
+        Save the log to a `.npz` file.
+        """
+        np.savez_compressed(filepath, **self._arrays())
+
+    @classmethod
+    def load(cls, filepath: str) -> 'DecisionLog':
+        """
+        Load a log saved with `save()`.
+        """
+        with np.load(filepath) as data:
+            return cls._from_arrays(data)
+
+    def _arrays(self, prefix: str = '') -> dict[str, NDArray]:
+        """
+        The content of the log as numpy arrays, with names starting with `prefix`.
+        """
+        return {
+            f'{prefix}cells': np.array(self._cells), f'{prefix}tiles': np.array(self._tiles),
+            f'{prefix}starts': np.array(self._starts),
+            f'{prefix}output_dimension': np.array(self.output_dimension),
+            f'{prefix}seed': np.array(-1 if self.seed is None else self.seed)
+        }
+
+    @classmethod
+    def _from_arrays(cls, data: Mapping[str, NDArray], prefix: str = '') -> 'DecisionLog':
+        """
+        Rebuild a log from the arrays given by `_arrays()`.
+        """
+        seed = int(data[f'{prefix}seed'])
+        log = cls(None if seed == -1 else seed, tuple(int(i) for i in data[f'{prefix}output_dimension']))
+        log._cells.extend(int(i) for i in data[f'{prefix}cells'])
+        log._tiles.extend(int(i) for i in data[f'{prefix}tiles'])
+        log._starts.extend(int(i) for i in data[f'{prefix}starts'])
+        return log
+
+    def __len__(self) -> int: return len(self._cells)
+
+    def __getitem__(self, step: int) -> tuple[int, int]:
+        """
+        The decision at the given step as a tuple of (cell index, pattern index).
+        """
+        return self._cells[step], self._tiles[step]
+
+
+class Replay:
+    """
+    Rebuild the images of a recorded run at any step, for scrubbing back and
+    forth through the run. Only the state of every `keyframe_interval`-th
+    step is kept in memory, other steps are rebuilt from the closest earlier
+    keyframe by replaying the decisions.
+    ```python
+    >>> wfc = WFC((50, 50), patterns, record=True)
+    >>> wfc.run()
+    >>> replay = wfc.replay()
+    >>> plt.imshow(replay.frame(len(replay) // 2))
+    ```
+    """
+    __slots__ = '_grid', '_initial', '_interval', '_keyframes', '_keysteps', '_log', '_n_patterns', '_position'
+    def __init__(self,
+        log: DecisionLog,
+        patterns: list[TileImage],
+        *,
+        propagation: Literal['stack', 'batched'] = 'stack',
+        adjacency: Optional[_Adjacency] = None,
+        initial: Optional[NDArray] = None,
+        keyframe_interval: int = 100
+    ):
+        """
+        :param DecisionLog log: The decisions of the run.
+        :param list[TileImage] patterns: The tileset the run was done with.
+        :param Literal['stack', 'batched'] propagation: The propagation mode the run
+            was done with. This is `'stack'` by default.
+        :param _Adjacency, optional adjacency: Compiled adjacency tables for
+            batched propagation. This is `None` by default.
+        :param numpy.NDArray, optional initial: The domains every attempt of the run
+            started from, such as the result of presolving. This is `None` by default,
+            which starts from full superposition.
+        :param int, optional keyframe_interval: Number of steps between two kept states.
+            This is `100` by default.
+        """
+        if not isinstance(keyframe_interval, int):
+            raise TypeError('keyframe_interval must be a positive integer')
+        elif keyframe_interval < 1:
+            raise ValueError('keyframe_interval must be a positive integer')
+
+        self._log = log
+        self._interval = keyframe_interval
+        self._initial = initial
+        self._n_patterns = len(patterns)
+        self._grid = _make_grid(patterns, log.output_dimension, propagation, adjacency)
+        self._keyframes: dict[int, NDArray] = {}
+        self._keysteps: list[int] = []
+        self._position = None
+
+    def frame(self, step: int) -> NDArray:
+        """
+        The image of the grid right after the decision at the given step.
+
+        :param int step: The step to rebuild. Negative values count from the end.
+        :return numpy.NDArray: An RGB image as a numpy array.
+        """
+        if step < 0: step += len(self._log)
+        start = self._log.attempt_start(step)
+
+        key = bisect.bisect_right(self._keysteps, step) - 1
+        key = self._keysteps[key] if key > -1 and self._keysteps[key] >= start else start - 1
+        # continue from the current state when it is in the same attempt and
+        # closer than any keyframe, the state at start - 1 is the end of the
+        # previous attempt rather than the empty grid
+        if self._position is None or not (max(key, start) <= self._position <= step):
+            if key < start and self._initial is None:
+                self._grid.reset()
+            elif key < start:
+                self._grid.load(self._initial)
+            else:
+                packed = self._keyframes[key]
+                self._grid.load(np.unpackbits(packed, axis=1, count=self._n_patterns).astype(bool))
+            self._position = key
+
+        while self._position < step:
+            self._position += 1
+            index, tile = self._log[self._position]
+            self._grid.collapse(index, tile)
+            if (
+                self._grid.propagate(index) and
+                (self._position - start + 1) % self._interval == 0 and
+                not self._position in self._keyframes
+            ):
+                self._keyframes[self._position] = np.packbits(self._grid.domains(), axis=1)
+                bisect.insort(self._keysteps, self._position)
+        return self._grid.render()
+
+    def __len__(self) -> int: return len(self._log)
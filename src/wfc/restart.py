@@ -0,0 +1,265 @@
+import time
+
+import numpy as np
+
+from dataclasses import dataclass
+
+
+from numpy.typing import NDArray
+from typing import Optional
+
+
+@dataclass
+class AttemptStats:
+    """
+    Statistics of a single attempt of a run, recorded by `RestartPolicy`.
+
+    :param int attempt: The number of the attempt in the run, starting from 1.
+    :param int collapses: The number of cells collapsed during the attempt.
+    :param float seconds: The time spent in the attempt, not counting the time the
+        run was paused between steps.
+    :param bool success: Whether or not the attempt collapsed all cells.
+    :param tuple[tuple[int, int], ...] contradictions: The (row, col) of the cells
+        left without options when the attempt failed. This is empty if the
+        attempt succeeded or was stopped by the policy.
+    """
+    attempt: int
+    collapses: int
+    seconds: float
+    success: bool
+    contradictions: tuple[tuple[int, int], ...] = ()
+
+class RestartPolicy:
+    """
+    Decide when a run restarts after a contradiction and where new attempts begin.
+    ```python
+    >>> policy = RestartPolicy(max_attempts=20, time_budget=5.)
+    >>> wfc = WFC((50, 50), patterns, restart_policy=policy)
+    >>> success, image = wfc.run()
+    >>> len(policy.history), policy.hotspots(3)
+    (4, [(12, 40), (13, 40), (30, 2)])
+    ```
+
+    The run gives up, as if `repeat_until_success` was False, after `max_attempts`
+    attempts or once it has spent `time_budget` seconds stepping. Time the run
+    is paused between steps, as in the GUI, is not counted. The budget is checked
+    after every step, so a run takes at most one step longer than the budget.
+
+    The cells left without options are remembered in a heat map that fades by
+    `decay` every attempt and is kept across runs of the same dimension. Every
+    cell is then picked as if its entropy was up to `hotspot_bias` bits lower,
+    in proportion to its heat, so the regions that usually fail are filled while
+    their neighbours still have options. The first cell of an attempt is picked
+    with a weight of `2 ** bias` for the same reason.
+    """
+    __slots__ = (
+        '_attempt_start',
+        '_collapses',
+        '_decay',
+        '_elapsed',
+        '_heat',
+        '_history',
+        '_hotspot_bias',
+        '_max_attempts',
+        '_output_dim',
+        '_previous',
+        '_resumed',
+        '_time_budget'
+    )
+    def __init__(self,
+        max_attempts: Optional[int] = None,
+        time_budget: Optional[float] = None, *,
+        hotspot_bias: float = 1.0,
+        decay: float = 0.9
+    ):
+        """
+        :param int, optional max_attempts: The maximum number of attempts of a run.
+            This is `None` by default, which means no limit.
+        :param float, optional time_budget: The maximum time in seconds of a run.
+            This is `None` by default, which means no limit.
+        :param float, optional hotspot_bias: The entropy in bits taken off the
+            hottest cell when picking cells to collapse. This is `1.0` by default.
+        :param float, optional decay: The factor the heat of every cell is multiplied
+            by at the end of every attempt. This is `0.9` by default.
+        """
+        self.max_attempts = max_attempts
+        self.time_budget = time_budget
+        self.hotspot_bias = hotspot_bias
+        self.decay = decay
+
+        self._output_dim = None
+        self._heat = None
+        self._history: list[AttemptStats] = []
+        self._previous = 0
+        self._elapsed = self._attempt_start = 0.
+        self._resumed = None
+        self._collapses = 0
+
+    @property
+    def max_attempts(self) -> Optional[int]:
+        """
+        The maximum number of attempts of a run, `None` means no limit.
+        """
+        return self._max_attempts
+    @max_attempts.setter
+    def max_attempts(self, value: Optional[int]):
+        if not value is None:
+            if not isinstance(value, int): raise TypeError('max_attempts must be a positive integer')
+            elif value < 1: raise ValueError('max_attempts must be a positive integer')
+        self._max_attempts = value
+
+    @property
+    def time_budget(self) -> Optional[float]:
+        """
+        The maximum time in seconds of a run, `None` means no limit.
+        """
+        return self._time_budget
+    @time_budget.setter
+    def time_budget(self, value: Optional[float]):
+        if not value is None:
+            if not isinstance(value, (int, float)): raise TypeError('time_budget must be a positive number')
+            elif value <= 0: raise ValueError('time_budget must be a positive number')
+        self._time_budget = value
+
+    @property
+    def hotspot_bias(self) -> float:
+        """
+        The entropy in bits taken off the hottest cell when picking cells to collapse,
+        other cells are lowered in proportion to their heat.
+        """
+        return self._hotspot_bias
+    @hotspot_bias.setter
+    def hotspot_bias(self, value: float):
+        if not isinstance(value, (int, float)): raise TypeError('hotspot_bias must be a non-negative number')
+        elif value < 0: raise ValueError('hotspot_bias must be a non-negative number')
+        self._hotspot_bias = float(value)
+
+    @property
+    def decay(self) -> float:
+        """
+        The factor the heat of every cell is multiplied by at the end of every attempt.
+        """
+        return self._decay
+    @decay.setter
+    def decay(self, value: float):
+        if not isinstance(value, (int, float)): raise TypeError('decay must be a number')
+        elif not 0 <= value <= 1: raise ValueError('decay must be between 0 and 1')
+        self._decay = float(value)
+
+    @property
+    def history(self) -> list[AttemptStats]:
+        """
+        The statistics of every attempt of the current or last run. For a run
+        continued from a checkpoint, this starts with the continued attempt.
+        """
+        return list(self._history)
+
+    @property
+    def heat(self) -> Optional[NDArray]:
+        """
+        The heat of every cell as a float array of the shape of the grid,
+        `None` before the first run.
+        """
+        return None if self._heat is None else self._heat.reshape(self._output_dim).copy()
+
+    def hotspots(self, count: int = 10) -> list[tuple[int, int]]:
+        """
+        The (row, col) of the hottest cells, hottest first. Cells that have never
+        been left without options are not included.
+        """
+        if self._heat is None: return []
+        order = np.argsort(-self._heat, kind='stable')[:count]
+        return [divmod(int(i), self._output_dim[1]) for i in order if self._heat[i] > 0]
+
+    def clear(self):
+        """
+        Forget the heat map and the history.
+        """
+        self._heat = None
+        self._history.clear()
+
+
+    def begin(self, output_dimension: tuple[int, int], attempts: int = 0):
+        """
+        Start a new run, or continue a run saved in the middle of an attempt after
+        `attempts` earlier attempts. The heat map is kept if the dimension has not
+        changed. The continued attempt counts as one attempt.
+
+        The run is paused until `resume()` is called.
+        """
+        if self._heat is None or self._output_dim != output_dimension:
+            self._output_dim = output_dimension
+            self._heat = np.zeros(output_dimension[0] * output_dimension[1])
+        self._history.clear()
+        self._previous = attempts
+        self._elapsed = 0.
+        self._resumed = None
+        self.start_attempt()
+
+    def resume(self):
+        """
+        Start counting time towards the budget, when the run steps again.
+        """
+        self._resumed = time.perf_counter()
+
+    def pause(self):
+        """
+        Stop counting time towards the budget, when the run yields a step.
+        """
+        if not self._resumed is None: self._elapsed += time.perf_counter() - self._resumed
+        self._resumed = None
+
+    def _spent(self) -> float:
+        """
+        The time spent stepping in the current run.
+        """
+        return self._elapsed + (0 if self._resumed is None else time.perf_counter() - self._resumed)
+
+    def start_attempt(self):
+        self._attempt_start = self._spent()
+        self._collapses = 0
+
+    def record_collapse(self):
+        self._collapses += 1
+
+    def end_attempt(self, success: bool, contradictions: NDArray):
+        """
+        Record the end of the current attempt and the cells left without options.
+        """
+        self._heat *= self._decay
+        self._heat[contradictions] += 1
+        self._history.append(AttemptStats(
+            self._previous + len(self._history) + 1, self._collapses, self._spent() - self._attempt_start,
+            success, tuple(divmod(int(i), self._output_dim[1]) for i in contradictions)
+        ))
+
+    @property
+    def expired(self) -> bool:
+        """
+        Whether or not the time budget of the current run has been used up.
+        """
+        return not self._time_budget is None and self._spent() > self._time_budget
+
+    def allows_restart(self) -> bool:
+        """
+        Whether or not another attempt can be made in the current run.
+        """
+        return (
+            (self._max_attempts is None or self._previous + len(self._history) < self._max_attempts)
+            and not self.expired
+        )
+
+    def cell_bias(self) -> Optional[NDArray]:
+        """
+        The entropy in bits taken off every cell when picking the next cell to
+        collapse, `hotspot_bias` for the hottest cell. This is `None` for no bias.
+        """
+        if not self._hotspot_bias or not self._heat.any(): return None
+        return self._hotspot_bias * self._heat / self._heat.max()
+
+    def first_cell_weights(self) -> Optional[NDArray]:
+        """
+        The weights to pick the first cell of an attempt with, `2 ** bias` for the
+        bias of `cell_bias()`. This is `None` for a uniform pick.
+        """
+        return None if (bias := self.cell_bias()) is None else np.exp2(bias)
@@ -1,11 +1,20 @@
+import itertools
 import os
 
 import numpy as np
 import matplotlib.pyplot as plt
 
 from PIL import Image
+from collections import deque
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed
+)
 from matplotlib.axes import Axes
 from scipy.ndimage import rotate
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import connected_components
 
 from .cell_image import (
     Direction,
@@ -15,27 +24,39 @@ from .cell_image import (
 
 from numpy.typing import NDArray
 from typing import (
+    Callable,
     Iterable,
     Literal,
-    Optional
+    Optional,
+    Sequence,
+    TypeAlias
 )
 
+# The top, bottom, left and right rows of pixels of a tile.
+_Edges: TypeAlias = tuple[NDArray, NDArray, NDArray, NDArray]
 
-def _augment_by_rotation(patterns: list[NDArray]) -> list[NDArray]:
-    rotated_patterns = []
-    for pattern in patterns:
-        ninety = rotate(pattern, 90)
-        if (ninety == pattern).all(): continue
 
-        eighty = rotate(pattern, 180)
-        twensev = rotate(pattern, 270)
+def _rotations(pattern: NDArray) -> list[tuple[int, NDArray]]:
+    """
+    The rotations of a pattern kept when augmenting by rotation, as pairs
+    of the angle and the rotated pattern. Rotations that repeat the pattern
+    or another rotation are left out.
+    """
+    ninety = rotate(pattern, 90)
+    if (ninety == pattern).all(): return []
+
+    eighty = rotate(pattern, 180)
+    twensev = rotate(pattern, 270)
 
-        rotated_patterns.append(ninety)
-        if not (eighty == pattern).all():
-            rotated_patterns.append(eighty)
-        if not (ninety == twensev).all():
-            rotated_patterns.append(twensev)
-    return rotated_patterns
+    rotations = [(90, ninety)]
+    if not (eighty == pattern).all():
+        rotations.append((180, eighty))
+    if not (ninety == twensev).all():
+        rotations.append((270, twensev))
+    return rotations
+
+def _augment_by_rotation(patterns: list[NDArray]) -> list[NDArray]:
+    return [rotated for pattern in patterns for _, rotated in _rotations(pattern)]
 
 def concat_grid(
     tiles_grid: list[Cell],
@@ -62,21 +83,35 @@ def concat_grid(
         row_pixels.append(temp)
     return np.concatenate(row_pixels)
 
-def show_tiles(
-    images: Iterable[NDArray], *,
-    ax: Optional[Axes] = None
-) -> Axes:
+def render_tiles(
+    tiles: NDArray,
+    images: Sequence[NDArray]
+) -> NDArray:
     """
-    Show a list of tiles in a grid pattern.
+    Create the image of a grid of pattern indices.
 
-    :param Iterable[NDArray] images: List of tiles as RGB images.
-    :param matplotlib.axes.Axes, optional ax: Axes to draw on. This is
-        `None` by default, which will draw on the default Axes instead.
-    :return matplotlib.axes.Axes: The axes that was drawn on.
+    :param NDArray tiles: Int array of shape (rows, cols), each cell holds the
+        index of its pattern. Cells with a negative index are filled with black.
+    :param Sequence[NDArray] images: The image of every pattern, all with the same shape.
+    :return `numpy.NDArray`: An RGB image as a numpy array.
+    """
+    images = np.concatenate([np.stack(images), np.zeros((1, *images[0].shape), dtype='uint8')])
+    # negative indices point to the black image at the end
+    frame = images[np.where(tiles < 0, -1, tiles)]
+    rows, cols, tile_h, tile_w = frame.shape[:4]
+    return frame.transpose(0, 2, 1, 3, 4).reshape(rows * tile_h, cols * tile_w, 3)
+
+def tile_grid(images: Sequence[NDArray]) -> NDArray:
+    """
+    Arrange a list of tiles into a single image in a grid pattern.
+    Tiles are separated by white lines.
+
+    :param Sequence[NDArray] images: List of tiles as RGB images.
+    :return `numpy.NDArray`: An RGB image as a numpy array.
     """
     rows = int(np.sqrt(len(images)))
     cols = int(np.ceil(len(images) / rows))
-    n_pix = list(images)[0].shape[0]
+    n_pix = images[0].shape[0]
 
     grid = 255 * np.ones((n_pix * rows + rows - 1, n_pix * cols + cols - 1, 3), dtype='uint8')
     
@@ -85,89 +120,535 @@ def show_tiles(
         row = (i - col) // cols
         row, col = row * (n_pix + 1), col * (n_pix + 1)
         grid[row:(row + n_pix), col:(col + n_pix)] = image
+    return grid
 
+def show_tiles(
+    images: Iterable[NDArray], *,
+    ax: Optional[Axes] = None
+) -> Axes:
+    """
+    Show a list of tiles in a grid pattern.
+
+    :param Iterable[NDArray] images: List of tiles as RGB images.
+    :param matplotlib.axes.Axes, optional ax: Axes to draw on. This is
+        `None` by default, which will draw on the default Axes instead.
+    :return matplotlib.axes.Axes: The axes that was drawn on.
+    """
     if ax is None: ax = plt.gca()
-    ax.imshow(grid)
+    ax.imshow(tile_grid(list(images)))
     ax.axis('off')
     return ax
 
 
 def load_patterns(
     directory: str,
-    rotate: bool = True
+    rotate: bool = True, *,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None
 ) -> list[NDArray]:
     """
     Load a list of numpy.NDArray representing the tiles and its rotated version.
-    A directory containing the png images of the tile should be given.
+    A directory containing the images of the tile should be given, every file
+    Pillow can open is loaded, in the order of their names. Images are decoded
+    concurrently in a pool of threads. See `load_tiles` to get the tiles directly.
 
     :param str directory: Path to directory containing the images of the tiles.
     :param bool, optional rotate: Where or not to augment the images by rotation.
         This is `True` by default.
+    :param int, optional workers: The number of threads decoding images. This is `None`
+        by default, which lets `ThreadPoolExecutor` decide. If this is `0`, images are
+        decoded in the calling thread.
+    :param Callable[[int, int], None], optional progress: Called with the number of
+        files processed and the total number of files after each file. Raising an
+        exception inside the callback aborts loading. This is `None` by default.
     :return list[NDArray]: A list of images.
     """
-    patterns = []
-    for path in os.listdir(directory):
-        if path[-3:] == 'png':
-            patterns.append(np.array(
-                Image.open(os.path.join(directory, path))
-                     .convert('RGB')
-            ))
+    patterns = _read_files(_image_files(directory), _read_image, workers, progress)
     if rotate: patterns.extend(_augment_by_rotation(patterns))
     return patterns
 
+def load_tiles(
+    directory: str,
+    rotate: bool = True, *,
+    lazy: bool = False,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> list[TileImage]:
+    """
+    Load the tiles of a directory as a list of TileImage with frequency 1, in
+    the same order as `load_patterns`.
+
+    With `lazy`, only the shape and the edges of every tile are kept while loading,
+    which is all adjacency rules need. The pixels of a tile are decoded again from
+    its file the first time its image is used, such as when rendering, and kept
+    from then on. Files still have to be read in full once to find the bottom
+    and right edges, so this saves memory and defers building the images of
+    tiles that are never drawn, rather than saving reads. A run with `frames`
+    set to False only decodes the tiles that appear in its result, while drawing a
+    cell that is not collapsed decodes every tile, as it shows the average of its options.
+    ```python
+    >>> tiles = load_tiles('images/tilesets/Circuit', lazy=True)
+    >>> tiles[0].is_adjacent_to(tiles[1], Direction.UP)   # no image is decoded
+    >>> tiles[0].image                                   # decoded here
+    ```
+
+    :param str directory: Path to directory containing the images of the tiles.
+    :param bool, optional rotate: Where or not to augment the tiles by rotation.
+        This is `True` by default.
+    :param bool, optional lazy: Whether or not to decode images only when they are
+        needed. This is `False` by default.
+    :param int, optional workers: See `load_patterns`.
+    :param Callable[[int, int], None], optional progress: See `load_patterns`.
+    :return list[TileImage]: A list of tiles.
+    """
+    paths = _image_files(directory)
+    if not lazy:
+        return [TileImage(pattern, 1) for pattern in load_patterns(directory, rotate,
+                                                                   workers=workers, progress=progress)]
+
+    def _read(path: str) -> list[tuple[int, tuple[int, ...], _Edges]]:
+        return _read_edges(path, rotate)
+    tiles = []
+    rotated = []
+    for path, rotations in zip(paths, _read_files(paths, _read, workers, progress)):
+        (_, shape, edges), *rotations = rotations
+        tiles.append(_LazyTileImage(path, 0, shape, edges))
+        rotated.extend(_LazyTileImage(path, angle, shape, edges) for angle, shape, edges in rotations)
+    return tiles + rotated
+
+def _read_image(path: str) -> NDArray:
+    with Image.open(path) as image:
+        return np.array(image.convert('RGB'))
+
+def _edges(pattern: NDArray) -> _Edges:
+    return pattern[0].copy(), pattern[-1].copy(), pattern[:, 0].copy(), pattern[:, -1].copy()
+
+def _read_edges(path: str, rotate: bool) -> list[tuple[int, tuple[int, ...], _Edges]]:
+    """
+    The angle, shape and edges of an image and of its rotations kept by `_rotations`.
+    """
+    pattern = _read_image(path)
+    rotations = [(0, pattern)] + (_rotations(pattern) if rotate else [])
+    return [(angle, rotated.shape, _edges(rotated)) for angle, rotated in rotations]
+
+def _read_files(
+    paths: list[str],
+    read: Callable[[str], object],
+    workers: Optional[int],
+    progress: Optional[Callable[[int, int], None]]
+) -> list:
+    """
+    Call `read` on every path in a pool of `workers` threads, or in the calling
+    thread if `workers` is `0`. Results are in the order of `paths`, `progress` is
+    called in the calling thread as files finish.
+    """
+    if workers == 0:
+        results = []
+        for i, path in enumerate(paths):
+            results.append(read(path))
+            if progress: progress(i + 1, len(paths))
+        return results
+
+    results = [None] * len(paths)
+    with ThreadPoolExecutor(workers) as executor:
+        futures = {executor.submit(read, path): i for i, path in enumerate(paths)}
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress: progress(done, len(paths))
+        except BaseException:
+            for future in futures: future.cancel()
+            raise
+    return results
+
+def _pack_windows(windows: NDArray, n_colours: int) -> NDArray:
+    """
+    Pack palette-indexed windows into one key per window, so that windows can
+    be compared and counted as a 1D array. Windows are packed into a single
+    integer when they fit in 63 bits, otherwise each window becomes a raw byte string.
+
+    :param NDArray windows: Array of shape (..., n, m) of palette indices.
+    :param int n_colours: The number of colours in the palette.
+    :return NDArray: Array of shape (...) of keys.
+    """
+    flat = windows.reshape(*windows.shape[:-2], -1)
+    if n_colours ** flat.shape[-1] < 2**63:
+        powers = n_colours ** np.arange(flat.shape[-1], dtype=np.int64)
+        return flat.astype(np.int64) @ powers
+    flat = np.ascontiguousarray(flat)
+    return flat.view(np.dtype((np.void, flat.shape[-1] * flat.itemsize)))[..., 0]
+
+def _image_windows(
+    image_filepath: str,
+    n_pixels: int,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> tuple[NDArray, NDArray, NDArray]:
+    """
+    Count the windows of an image for the overlapping model. Every window wraps
+    around the borders of the image.
+
+    :return: A tuple of the palette of the image, the unique windows as palette indices
+        in the order they first appear and how many times each of them appears.
+    :rtype: tuple[NDArray, NDArray, NDArray]
+    """
+    image = np.array(Image.open(image_filepath).convert('RGB'))
+    palette, indexed = np.unique(image.reshape(-1, 3), axis=0, return_inverse=True)
+    indexed = indexed.reshape(image.shape[:2]).astype(np.min_scalar_type(len(palette) - 1))
+
+    padded = np.pad(indexed, ((0, n_pixels - 1), (0, n_pixels - 1)), mode='wrap')
+    windows = np.lib.stride_tricks.sliding_window_view(padded, (n_pixels, n_pixels))
+    keys = []
+    for i in range(image.shape[0]):
+        keys.append(_pack_windows(windows[i, :image.shape[1]], len(palette)))
+        if progress: progress(i + 1, image.shape[0])
+
+    _, first, counts = np.unique(np.concatenate(keys), return_index=True, return_counts=True)
+    order = np.argsort(first)
+    rows, cols = np.divmod(first[order], image.shape[1])
+    return palette, windows[rows, cols], counts[order]
+
+def _image_rgb_windows(image_filepath: str, n_pixels: int) -> tuple[NDArray, NDArray]:
+    """
+    Count the windows of an image as RGB arrays, so that counts of images with
+    different palettes can be merged. Run in worker processes by `generate_corpus_patterns`.
+    """
+    palette, windows, counts = _image_windows(image_filepath, n_pixels)
+    return palette[windows], counts
+
+def _overlapping_tiles(
+    windows: NDArray,
+    counts: NDArray,
+    palette: NDArray,
+    rotate: bool
+) -> list[TileImage]:
+    """
+    Create the tiles of the overlapping model from unique windows of palette
+    indices and their counts.
+    """
+    unique_patterns = {
+        key.tobytes(): [window, int(count)]
+        for key, window, count in zip(_pack_windows(windows, len(palette)), windows, counts)
+    }
+
+    if rotate: 
+        rotated_patterns = _augment_by_rotation([value[0] for value in unique_patterns.values()])
+        for rotated_pattern in rotated_patterns:
+            temp_key = _pack_windows(rotated_pattern, len(palette)).tobytes()
+            unique_patterns[temp_key] = [rotated_pattern, 1]
+    return [_OverlappingModel_TileImage(*value, palette) for value in unique_patterns.values()]
+
 def generate_patterns(
     image_filepath: str,
     n_pixels: int = 3,
-    rotate: bool = False
+    rotate: bool = False, *,
+    progress: Optional[Callable[[int, int], None]] = None
 ) -> list[TileImage]:
     """
     Generate a list of tiles from a given image based on the overlapping model.
 
+    The colours of the image are gathered in a palette shared by all tiles,
+    and each tile stores its pixels as indices to this palette.
+
     :param str image_filepath: Path to image.
     :param int, optional n_pixels: Dimension of tiles in pixels. This is `3` by
         default.
     :param bool, optional rotate: Whether or not to augment the tiles by rotation.
         This is `False` by default.
+    :param Callable[[int, int], None], optional progress: Called with the number of
+        rows processed and the total number of rows after each row of the image.
+        Raising an exception inside the callback aborts the generation.
+        This is `None` by default.
     
     :return list[TileImage]: The generated tiles.
     """
-    image = np.array(Image.open(image_filepath).convert('RGB'))
+    palette, windows, counts = _image_windows(image_filepath, n_pixels, progress)
+    return _overlapping_tiles(windows, counts, palette, rotate)
 
-    unique_patterns = {}
-    for i in range(image.shape[0]):
-        for j in range(image.shape[1]):
-            row_indices = [[(i + offset) % image.shape[0]] for offset in range(n_pixels)]
-            col_indices = [(j + offset) % image.shape[1] for offset in range(n_pixels)]
-            
-            sub_image = image[row_indices, col_indices]
-            temp_key = tuple(sub_image.flatten())
-            if temp_key in unique_patterns: unique_patterns[temp_key][1] += 1
-            else: unique_patterns[temp_key] = [sub_image, 1]
+def _image_files(directory: str) -> list[str]:
+    """
+    The paths of the files in a directory that Pillow can open, sorted by name.
+    """
+    extensions = Image.registered_extensions()
+    return [
+        os.path.join(directory, name) for name in sorted(os.listdir(directory))
+        if os.path.splitext(name)[1].lower() in extensions and
+           os.path.isfile(os.path.join(directory, name))
+    ]
 
-    if rotate: 
-        for rotated_pattern in _augment_by_rotation([value[0] for value in unique_patterns.values()]):
-            temp_key = tuple(rotated_pattern.flatten())
-            unique_patterns[temp_key] = [rotated_pattern, 1]
-    return [_OverlappingModel_TileImage(*value) for value in unique_patterns.values()]
+def generate_corpus_patterns(
+    images: str | Iterable[str],
+    n_pixels: int = 3,
+    rotate: bool = False, *,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> list[TileImage]:
+    """
+    Generate a list of tiles from many example images based on the overlapping model,
+    as if all windows came from one image. The frequency of a tile is the number of
+    times it appears over all images.
+
+    Images are read and counted in worker processes, only a few at a time, and their
+    counts are merged into one table as they finish. Memory thus depends on the number
+    of unique tiles rather than the size of the corpus. The palette is gathered from the
+    merged tiles at the end. With a single image, the result is the same as `generate_patterns`.
+
+    :param str | Iterable[str] images: Path to a directory of images, or paths to images.
+    :param int, optional n_pixels: Dimension of tiles in pixels. This is `3` by
+        default.
+    :param bool, optional rotate: Whether or not to augment the tiles by rotation.
+        This is `False` by default.
+    :param int, optional workers: The number of worker processes. This is `None` by
+        default, which uses the number of processors. If this is `0`, images are
+        counted in the current process.
+    :param Callable[[int, int], None], optional progress: Called with the number of
+        images processed and the total number of images after each image. Raising
+        an exception inside the callback aborts the generation. This is `None` by default.
+    
+    :return list[TileImage]: The generated tiles.
+    :raise ValueError: If there is no image.
+    """
+    paths = _image_files(images) if isinstance(images, str) else list(images)
+    if not paths: raise ValueError('There is no image to generate patterns from')
+
+    # tiles in the order they first appear, keyed by their RGB pixels
+    table: dict[bytes, int] = {}
+    def _merge(done: int, windows: NDArray, counts: NDArray):
+        for window, count in zip(windows, counts):
+            key = window.tobytes()
+            table[key] = table.get(key, 0) + int(count)
+        if progress: progress(done, len(paths))
+
+    if workers == 0:
+        for i, path in enumerate(paths): _merge(i + 1, *_image_rgb_windows(path, n_pixels))
+    else:
+        if workers is None: workers = os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as executor:
+            # a few images ahead of the merge, results are merged in order
+            pending = deque()
+            path_iter = iter(paths)
+            for path in itertools.islice(path_iter, 2 * workers):
+                pending.append(executor.submit(_image_rgb_windows, path, n_pixels))
+            done = 0
+            try:
+                while pending:
+                    windows, counts = pending.popleft().result()
+                    if (path := next(path_iter, None)) is not None:
+                        pending.append(executor.submit(_image_rgb_windows, path, n_pixels))
+                    done += 1
+                    _merge(done, windows, counts)
+            except BaseException:
+                for future in pending: future.cancel()
+                raise
+
+    rgb_windows = np.frombuffer(b''.join(table), dtype=np.uint8).reshape(-1, n_pixels, n_pixels, 3)
+    palette, windows = np.unique(rgb_windows.reshape(-1, 3), axis=0, return_inverse=True)
+    windows = windows.reshape(-1, n_pixels, n_pixels).astype(np.min_scalar_type(len(palette) - 1))
+    return _overlapping_tiles(windows, np.fromiter(table.values(), dtype=int), palette, rotate)
+
+def prune_patterns(
+    patterns: Sequence[TileImage],
+    max_patterns: Optional[int] = None,
+    min_frequency: Optional[int] = None
+) -> tuple[list[TileImage], float]:
+    """
+    Reduce a tileset to its most frequent tiles, trading fidelity to the source
+    for speed. The least frequent tiles are removed first. Whenever a tile is left
+    without a compatible tile in some direction, it could only lead to contradictions
+    and is removed as well. At the end, only the connected group of tiles with the
+    highest total frequency is kept, so the tileset stays solvable as one model.
+
+    ```python
+    >>> patterns = generate_patterns('image.png', 4, True)
+    >>> patterns, kept = prune_patterns(patterns, max_patterns=200)
+    >>> print(f'{len(patterns)} patterns cover {kept:.0%} of the source')
+    ```
+
+    :param Sequence[TileImage] patterns: The tileset to prune.
+    :param int, optional max_patterns: The maximum number of tiles to keep. This
+        is `None` by default, which means no limit.
+    :param int, optional min_frequency: The minimum frequency of the tiles to keep.
+        This is `None` by default, which means no limit.
+    :return: A tuple of the tiles kept, in their original order, and the fraction of
+        the total frequency of the tileset they account for.
+    :rtype: tuple[list[TileImage], float]
+    :raise ValueError: If no compatible set of tiles meets the limits.
+    """
+    # imported here since wfc._algos depends on this module
+    from ._algos import _compile_adjacency
+    if not max_patterns is None and max_patterns < 1:
+        raise ValueError(f'max_patterns must be a positive integer: {max_patterns}')
+
+    patterns = list(patterns)
+    frequencies = np.array([tile.frequency for tile in patterns])
+    tables = [csr_array(table) for table in _compile_adjacency(patterns)]
+    # column k of a table as row k of its transpose
+    columns = [table.T.tocsr() for table in tables]
+
+    kept = frequencies >= (0 if min_frequency is None else min_frequency)
+    support = np.stack([table[:, kept].sum(axis=1) for table in tables])
+
+    def _remove(removed: list[int]):
+        while removed:
+            i = removed.pop()
+            if not kept[i]: continue
+            kept[i] = False
+            for d, column in enumerate(columns):
+                neighbours = column.indices[column.indptr[i]:column.indptr[i + 1]]
+                support[d, neighbours] -= 1
+                removed.extend(neighbours[kept[neighbours] & (support[d, neighbours] == 0)].tolist())
+
+    _remove(np.flatnonzero(kept & (support == 0).any(axis=0)).tolist())
+    if not max_patterns is None:
+        for i in np.argsort(frequencies, kind='stable'):
+            if np.count_nonzero(kept) <= max_patterns: break
+            _remove([int(i)])
+
+    indices = np.flatnonzero(kept)
+    if not indices.size:
+        raise ValueError('No compatible set of patterns meets the given limits')
+    connected = sum(tables) + sum(columns)
+    _, labels = connected_components(connected[indices][:, indices], directed=False)
+    masses = np.bincount(labels, weights=frequencies[indices])
+    kept[indices[labels != masses.argmax()]] = False
+
+    return (
+        [tile for tile, keep in zip(patterns, kept) if keep],
+        float(frequencies[kept].sum() / frequencies.sum())
+    )
+
+def _overlapping_adjacency(patterns: list['_OverlappingModel_TileImage']) -> list[csr_array]:
+    """
+    Compile the adjacency tables of overlapping model tiles sharing the same
+    palette as sparse matrices, in the order of `wfc._algos._DIRECTIONS`. Instead of
+    comparing every pair of tiles, the overlapping part of every tile is packed
+    into a key and tiles are adjacent when their keys are equal. The cost
+    follows the number of adjacent pairs rather than the number of pairs.
+    """
+    stacked = np.stack([tile._pattern for tile in patterns])
+    n_colours = len(patterns[0]._palette)
+
+    def _matches(first: NDArray, second: NDArray) -> csr_array:
+        _, labels = np.unique(
+            np.concatenate((_pack_windows(first, n_colours), _pack_windows(second, n_colours))),
+            return_inverse=True
+        )
+        # one-hot encode the keys, tiles with the same key meet in the product
+        rows, n_labels = np.arange(len(patterns)), labels.max() + 1
+        ones = np.ones(len(patterns), dtype=np.float32)
+        first_keys = csr_array((ones, (rows, labels[:len(patterns)])), shape=(len(patterns), n_labels))
+        second_keys = csr_array((ones, (rows, labels[len(patterns):])), shape=(len(patterns), n_labels))
+        return (first_keys @ second_keys.T).astype(bool).tocsr()
+
+    vertical = _matches(stacked[:, 1:], stacked[:, :-1])
+    horizontal = _matches(stacked[:, :, 1:], stacked[:, :, :-1])
+    return [vertical, vertical.T.tocsr(), horizontal, horizontal.T.tocsr()]
 
 
 class _OverlappingModel_TileImage(TileImage):
+    __slots__ = '_image', '_palette'
+    def __init__(self, pattern: NDArray, frequency: int, palette: NDArray):
+        """
+        :param NDArray pattern: The window of the tile as indices to `palette`.
+        :param int frequency: The number of times the tile appears.
+        :param NDArray palette: Array of shape (n_colours, 3) of RGB colours.
+        """
+        super().__init__(pattern, frequency)
+        self._palette = palette
+        # the top-left pixel, looked up once as it is read for every cell of every frame
+        self._image = palette[pattern[:1, :1]]
+
     @TileImage.image.getter
     def image(self) -> NDArray:
-        image = np.ndarray((1, 1, 3), dtype='uint8')
-        image[0, 0] = self._pattern[0, 0]
-        return image
+        return self._image
+
+    @property
+    def palette(self) -> NDArray:
+        """
+        The colours the pixels of the tile are indices to.
+        """
+        return self._palette
+
+    @property
+    def pixels(self) -> NDArray:
+        """
+        The full RGB window of the tile sampled from the image.
+        """
+        return self._palette[self._pattern]
+
+    def _fingerprint_data(self) -> tuple[NDArray, ...]:
+        # the image is only the top-left pixel, the whole window tells tiles apart
+        return self.pixels,
     
     def is_adjacent_to(self, tile: '_OverlappingModel_TileImage', direction: Direction) -> bool:
+        this, other = self._pattern, tile._pattern
+        if not self._palette is tile._palette:
+            this, other = self.pixels, tile.pixels
+        match direction:
+            case Direction.UP:
+                result = (this[1:] == other[0:-1]).all()
+            case Direction.DOWN:
+                result = (this[0:-1] == other[1:]).all()
+            case Direction.LEFT:
+                result = (this[:, 1:] == other[:, 0:-1]).all()
+            case Direction.RIGHT:
+                result = (this[:, 0:-1] == other[:, 1:]).all()
+            case _:
+                raise ValueError("Weird direction passed")
+        return result
+
+class _LazyTileImage(TileImage):
+    """
+    Tile loaded by `load_tiles` with `lazy`, whose image is decoded from its
+    file the first time it is needed. Adjacency is checked on the edges.
+    """
+    __slots__ = '_angle', '_edges', '_path', '_shape'
+    def __init__(self, path: str, angle: int, shape: tuple[int, ...], edges: _Edges, frequency: int = 1):
+        """
+        :param str path: The image file of the tile.
+        :param int angle: The angle the image is rotated by.
+        :param tuple[int, ...] shape: The shape of the rotated image.
+        :param _Edges edges: The edges of the rotated image.
+        :param int, optional frequency: The number of times the tile appears. This is `1` by default.
+        """
+        super().__init__(None, frequency)
+        self._path = path
+        self._angle = angle
+        self._shape = shape
+        self._edges = edges
+
+    @TileImage.image.getter
+    def image(self) -> NDArray:
+        if self._pattern is None:
+            pattern = _read_image(self._path)
+            self._pattern = rotate(pattern, self._angle) if self._angle else pattern
+        return self._pattern
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        """
+        The shape of the image, known without decoding it.
+        """
+        return self._shape
+
+    def _fingerprint_data(self) -> tuple[NDArray, ...]:
+        # the file name and the edges identify the tile without decoding it
+        name = np.frombuffer(os.path.basename(self._path).encode(), dtype='uint8')
+        return (name, np.array([self._angle, *self._shape]), *self._edges)
+
+    def is_adjacent_to(self, tile: TileImage, direction: Direction) -> bool:
+        top, bottom, left, right = self._edges
+        other_top, other_bottom, other_left, other_right = (
+            tile._edges if isinstance(tile, _LazyTileImage) else _edges(tile.image)
+        )
         match direction:
             case Direction.UP:
-                result = (self._pattern[1:] == tile._pattern[0:-1]).all()
+                result = (bottom == other_top).all()
             case Direction.DOWN:
-                result = (self._pattern[0:-1] == tile._pattern[1:]).all()
+                result = (top == other_bottom).all()
             case Direction.LEFT:
-                result = (self._pattern[:, 1:] == tile._pattern[:, 0:-1]).all()
+                result = (right == other_left).all()
             case Direction.RIGHT:
-                result = (self._pattern[:, 0:-1] == tile._pattern[:, 1:]).all()
+                result = (left == other_right).all()
             case _:
                 raise ValueError("Weird direction passed")
-        return result
\ No newline at end of file
+        return result
@@ -1,14 +1,46 @@
+import asyncio
+import dataclasses
+import os
+import random as rand
+import threading
+import time
+
 import numpy as np
 
+from dataclasses import dataclass
 
-from ._algos import _wfc
+from ._algos import (
+    _compile_adjacency,
+    _make_grid,
+    _presolve,
+    _solve_region,
+    _wfc
+)
+from .animation import AnimationWriter
 from .cell_image import TileImage
+from .events import GridDelta
+from .metrics import (
+    MetricsRegistry,
+    RunStats,
+    record_run,
+    tileset_fingerprint
+)
+from .utils import render_tiles
+from .replay import (
+    DecisionLog,
+    Replay
+)
+from .restart import RestartPolicy
 
 
+from concurrent.futures import Executor
 from numpy.typing import NDArray
 from typing import (
+    AsyncGenerator,
     Generator,
-    Iterable
+    Iterable,
+    Literal,
+    Optional
 )
 
 
@@ -17,30 +49,116 @@ class CollapsedError(Exception):
     Exception thrown when WFC has already collapsed for the current configuration
     """
 
+class UnsatisfiableError(Exception):
+    """
+    Exception thrown when presolving shows that the tileset cannot fill the output grid
+    """
+
+class CancelledError(Exception):
+    """
+    Exception thrown when WFC is cancelled through a CancellationToken
+    """
+
+class CancellationToken:
+    """
+    Thread-safe flag for cooperatively cancelling a running wave function
+    collapse. The token can be cancelled from any thread, the algorithm then
+    stops before its next step.
+    """
+    __slots__ = '_event',
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def is_cancelled(self) -> bool: return self._event.is_set()
+
+    def cancel(self):
+        """
+        Request cancellation.
+        """
+        self._event.set()
+
+@dataclass
+class StepProgress:
+    """
+    Progress made by a call to `WFC.step()`.
+
+    :param int steps: The number of steps advanced.
+    :param NDArray | None image: The image of the grid after the last step.
+        This is `None` if no step was advanced or `WFC.frames` is False.
+    :param bool finished: Whether or not the algorithm has finished, in which
+        case, the result is found in `WFC.wfc_result`.
+    """
+    steps: int
+    image: Optional[NDArray]
+    finished: bool
+
 class WFC:
     __slots__ = (
+        '_adjacency',
+        '_checkpoint',
+        '_checkpoint_interval',
+        '_fingerprint',
+        '_frames',
         '_generator',
+        '_grid',
+        '_initial',
+        '_last_checkpoint',
+        '_log',
+        '_metrics',
         '_need_update',
         '_output_dim',
         '_patterns',
+        '_presolve',
+        '_presolved',
+        '_propagation',
+        '_record',
+        '_region_rng',
         '_repeat_til_success',
         '_rerun',
-        '_return_val'
+        '_restart_policy',
+        '_return_val',
+        '_seed',
+        '_stats',
+        '_tiles'
     )
     def __init__(self,
         output_dimension: tuple[int, int],
         patterns: Iterable[TileImage],
         *,
         repeat_until_success: bool = True,
-        rerun: bool = True
+        rerun: bool = True,
+        propagation: Literal['stack', 'batched'] = 'stack',
+        seed: Optional[int] = None,
+        record: bool = False,
+        presolve: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+        checkpoint: Optional[str] = None,
+        checkpoint_interval: float = 60.,
+        frames: bool = True,
+        restart_policy: Optional[RestartPolicy] = None
     ):
         self._need_update = True
+        self._grid = None
         self._return_val = None
+        self._tiles = None
+        self._log = None
+        self._initial = None
+        self._stats = None
 
         self.output_dimension = output_dimension
         self.patterns = patterns
         self.repeat_until_success = repeat_until_success
         self.rerun = rerun
+        self.propagation = propagation
+        self.seed = seed
+        self.record = record
+        self.presolve = presolve
+        self.metrics = metrics
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.frames = frames
+        self.restart_policy = restart_policy
 
     @property
     def output_dimension(self) -> tuple[int, int]:
@@ -62,6 +180,8 @@ class WFC:
         elif any((dim < 1) for dim in new_dim):
             raise ValueError("Dimension must be larger than 0")
         self._output_dim = new_dim
+        self._grid = None
+        self._presolved = None
         self._need_update = True
 
     @property
@@ -72,9 +192,41 @@ class WFC:
         return iter(self._patterns)
     @patterns.setter
     def patterns(self, new_patterns: Iterable[TileImage]):
+        new_patterns = list(new_patterns)
         if any((not isinstance(tile, TileImage) for tile in new_patterns)):
             raise TypeError("Expected an Iterable of TileImage")
-        self._patterns = list(new_patterns)
+        elif not new_patterns:
+            raise ValueError("Expected at least one TileImage")
+        self._patterns = new_patterns
+        self._adjacency = None
+        self._fingerprint = None
+        self._grid = None
+        self._presolved = None
+        self._need_update = True
+
+    @property
+    def n_patterns(self) -> int:
+        """
+        The number of tiles in `patterns`.
+        """
+        return len(self._patterns)
+
+    @property
+    def propagation(self) -> Literal['stack', 'batched']:
+        """
+        How state updates are propogated after a cell collapses.
+        With `'stack'`, neighbouring cells are updated one at a time.
+        With `'batched'`, the adjacency rules of the tileset are compiled
+        once and the whole frontier of changed cells is updated at the same time,
+        which is much faster on large grids and tilesets.
+        """
+        return self._propagation
+    @propagation.setter
+    def propagation(self, value: Literal['stack', 'batched']):
+        if not value in ('stack', 'batched'):
+            raise ValueError(f"propagation must be either 'stack' or 'batched': {value}")
+        self._propagation = value
+        self._grid = None
         self._need_update = True
 
     @property
@@ -112,6 +264,166 @@ class WFC:
         if not self._return_val is None:
             self._need_update = True
 
+    @property
+    def seed(self) -> Optional[int]:
+        """
+        The seed of the random generator. If this is `None`, every run draws a new
+        seed from the `random` module. Otherwise, every run with the same
+        configuration gives the same result.
+        """
+        return self._seed
+    @seed.setter
+    def seed(self, value: Optional[int]):
+        if not (value is None or isinstance(value, int)):
+            raise TypeError('seed must be an int or None')
+        self._seed = value
+        self._region_rng = None
+        self._need_update = True
+
+    @property
+    def record(self) -> bool:
+        """
+        Whether or not to record the decisions of each run in a `DecisionLog`.
+        The log can be used to rebuild the image of any step of the run. See `replay()`.
+        """
+        return self._record
+    @record.setter
+    def record(self, value: bool):
+        if not isinstance(value, bool):
+            raise TypeError('record must be a bool')
+        self._record = value
+        self._need_update = True
+
+    @property
+    def presolve(self) -> bool:
+        """
+        Whether or not to presolve the configuration before running. Presolving
+        removes every option that cannot be part of a result, such as patterns
+        that have no compatible neighbour, from all cells before the first collapse.
+        Configurations that cannot be filled raise an `UnsatisfiableError` right away
+        and every attempt starts from the presolved grid, which is computed once
+        per tileset and output dimension.
+        """
+        return self._presolve
+    @presolve.setter
+    def presolve(self, value: bool):
+        if not isinstance(value, bool):
+            raise TypeError('presolve must be a bool')
+        self._presolve = value
+        self._need_update = True
+
+    @property
+    def dead_patterns(self) -> list[int]:
+        """
+        Positions in `patterns` of the tiles that cannot be placed anywhere in the
+        output grid, which is every tile if the grid cannot be filled at all. The
+        configuration is presolved if it has not been already.
+        """
+        return np.flatnonzero(~self._presolved_domains().any(axis=0)).tolist()
+
+    @property
+    def metrics(self) -> Optional[MetricsRegistry]:
+        """
+        The registry updated with the statistics of every finished run, labelled by
+        the fingerprint of the tileset and the output dimension. This is `None` by
+        default, in which case no metrics are kept. Pass `wfc.metrics.REGISTRY` to
+        share one registry across the process.
+        """
+        return self._metrics
+    @metrics.setter
+    def metrics(self, value: Optional[MetricsRegistry]):
+        if not (value is None or isinstance(value, MetricsRegistry)):
+            raise TypeError('metrics must be a MetricsRegistry or None')
+        self._metrics = value
+
+    @property
+    def restart_policy(self) -> Optional[RestartPolicy]:
+        """
+        The policy limiting the number of attempts and the time of every run, and
+        biasing where attempts begin toward the cells that made previous attempts
+        fail. Runs that the policy stops end unsuccessfully, like with
+        `repeat_until_success = False`. If this is `None`, runs restart until
+        they succeed.
+        """
+        return self._restart_policy
+    @restart_policy.setter
+    def restart_policy(self, value: Optional[RestartPolicy]):
+        if not (value is None or isinstance(value, RestartPolicy)):
+            raise TypeError('restart_policy must be a RestartPolicy or None')
+        self._restart_policy = value
+        self._need_update = True
+
+    @property
+    def checkpoint(self) -> Optional[str]:
+        """
+        The file the state of a run in progress is saved to every `checkpoint_interval`
+        seconds, so that it can be resumed with `load_checkpoint()` if the process dies.
+        If this is `None`, no checkpoint is saved.
+        """
+        return self._checkpoint
+    @checkpoint.setter
+    def checkpoint(self, value: Optional[str]):
+        if not (value is None or isinstance(value, str)):
+            raise TypeError('checkpoint must be a file path or None')
+        self._checkpoint = value
+        self._last_checkpoint = time.perf_counter()
+
+    @property
+    def checkpoint_interval(self) -> float:
+        """
+        The time in seconds between two checkpoints. See `checkpoint`.
+        """
+        return self._checkpoint_interval
+    @checkpoint_interval.setter
+    def checkpoint_interval(self, value: float):
+        if not isinstance(value, (int, float)):
+            raise TypeError('checkpoint_interval must be a positive number')
+        elif value <= 0:
+            raise ValueError('checkpoint_interval must be a positive number')
+        self._checkpoint_interval = value
+
+    @property
+    def frames(self) -> bool:
+        """
+        Whether or not iterating over the current object gives the image of the whole
+        grid after every step. If this is False, `None` is given instead, which saves
+        rendering the whole grid every step. Parts of the grid can then be
+        rendered when needed with `view()`.
+        """
+        return self._frames
+    @frames.setter
+    def frames(self, value: bool):
+        if not isinstance(value, bool):
+            raise TypeError('frames must be a bool')
+        self._frames = value
+        self._need_update = True
+
+    @property
+    def run_stats(self) -> Optional[RunStats]:
+        """
+        The statistics of the current or last run. This is `None` if
+        the algorithm has not been run yet.
+        """
+        return self._stats
+
+    @property
+    def decision_log(self) -> Optional[DecisionLog]:
+        """
+        The decisions of the current or last run. This is `None` if `record`
+        was False for that run.
+        """
+        return self._log
+
+    @property
+    def wfc_tiles(self) -> Optional[NDArray]:
+        """
+        The result of the wave function collapse as pattern indices. This is an
+        int array of shape `output_dimension` where each cell holds the position
+        of its tile in `patterns`, or -1 if the cell has not been collapsed. This
+        is `None` if there is no result yet.
+        """
+        return self._tiles
+
     @property
     def wfc_result(self) -> tuple[bool, NDArray]:
         """
@@ -133,20 +445,364 @@ class WFC:
             return self._return_val
 
 
-    def _init_gen(self):
+    def _init_gen(self,
+        state: Optional[tuple[NDArray, Optional[NDArray]]] = None,
+        log: Optional[DecisionLog] = None,
+        stats: Optional[RunStats] = None
+    ):
         """
-        Initialize a wave function collapse generator.
+        Initialize a wave function collapse generator, or one continuing from
+        the state, log and stats of a checkpoint.
         """
+        self._initial = None
+        if self._presolve:
+            self._initial = self._presolved_domains()
+            if not self._initial.any(axis=1).all():
+                raise UnsatisfiableError(
+                    f"The patterns cannot fill a grid of dimension {self._output_dim}, "
+                    f"some cells have no possible pattern after presolving"
+                )
+
+        if not log is None: seed = log.seed
+        else: seed = rand.getrandbits(32) if self._seed is None else self._seed
+        if log is None and self._record: log = DecisionLog(seed, self._output_dim)
+        self._log = log
+        self._stats = RunStats() if stats is None else stats
+        # the grid is reset in place by the algorithm, only the generator is reseeded
+        if self._grid is None: self._grid = self._make_grid(self._output_dim, seed)
+        else: self._grid.seed(seed)
+        if not self._restart_policy is None:
+            # the attempt in progress when a checkpoint was saved is continued, not started again
+            self._restart_policy.begin(self._output_dim, 0 if state is None else self._stats.attempts - 1)
         self._generator = _wfc(
-            self._patterns,
-            self._output_dim,
-            self._repeat_til_success
+            self._grid, self._repeat_til_success, self._log,
+            self._initial, self._stats, state, self._frames, self._restart_policy
         )
         self._return_val = None
+        self._tiles = None
         self._need_update = False
 
+    def _make_grid(self, dimension: tuple[int, int], seed: int):
+        """
+        Create a grid for the current tileset and propagation mode.
+        """
+        return _make_grid(self._patterns, dimension, self._propagation,
+                          self._compiled_adjacency(), rand.Random(seed))
 
-    def run(self) -> tuple[bool, NDArray]:
+    def _render_tiles(self, tiles: NDArray) -> NDArray:
+        """
+        The image of a grid of pattern indices. Only the images of the patterns
+        in use are read, so that lazily loaded tiles are decoded when drawn.
+        """
+        used = np.unique(tiles[tiles > -1]) if (tiles > -1).any() else np.zeros(1, dtype=int)
+        lookup = np.full(len(self._patterns), -1)
+        lookup[used] = np.arange(len(used))
+        return render_tiles(np.where(tiles > -1, lookup[tiles], -1), [self._patterns[k].image for k in used])
+
+    def _compiled_adjacency(self, force: bool = False):
+        """
+        The compiled adjacency rules of the tileset, compiled once per tileset.
+        This is `None` with stack propagation, unless `force` is True.
+        """
+        if self._adjacency is None and (force or self._propagation == 'batched'):
+            self._adjacency = _compile_adjacency(self._patterns)
+        return self._adjacency
+
+    def _tileset_fingerprint(self) -> str:
+        """
+        The fingerprint of the current tileset, computed once per tileset.
+        """
+        if self._fingerprint is None: self._fingerprint = tileset_fingerprint(self._patterns)
+        return self._fingerprint
+
+    def _presolved_domains(self) -> NDArray:
+        """
+        The domains of the presolved grid, computed once per configuration.
+        """
+        if self._presolved is None:
+            self._presolved = _presolve(self._patterns, self._output_dim, self._compiled_adjacency(True))
+        return self._presolved
+
+
+    def save_checkpoint(self, filepath: str):
+        """
+        Save the state of the run in progress to a compressed `.npz` file: the options
+        of every cell, the queue of cells to collapse, the state of the random generator,
+        the statistics of the run and its decisions if `record` is True. The file is replaced atomically, so
+        a process killed while saving leaves the previous checkpoint intact.
+
+        :param str filepath: The file to write to.
+        :raise ValueError: If there is no run in progress.
+        """
+        if self._need_update or self._stats is None or not self._stats.attempts:
+            raise ValueError('There is no run in progress to save')
+
+        version, internal, gauss = self._grid.rng_state
+        arrays = {
+            'version': np.array(1),
+            'fingerprint': np.array(self._tileset_fingerprint()),
+            'output_dimension': np.array(self._output_dim),
+            'n_patterns': np.array(len(self._patterns)),
+            'domains': np.packbits(self._grid.domains(), axis=1),
+            'rng_version': np.array(version),
+            'rng_state': np.array(internal, dtype=np.uint32),
+            'rng_gauss': np.array(np.nan if gauss is None else gauss),
+            'stats': np.array(dataclasses.astuple(self._stats), dtype=float)
+        }
+        if not (queue := self._grid.queue_entries()) is None: arrays['queue'] = queue
+        if not self._log is None: arrays.update(self._log._arrays('log_'))
+
+        temp_path = f'{filepath}.tmp'
+        with open(temp_path, 'wb') as file:
+            np.savez_compressed(file, **arrays)
+        os.replace(temp_path, filepath)
+
+    def load_checkpoint(self, filepath: str):
+        """
+        Continue a run from a file saved with `save_checkpoint()`. The current
+        configuration must have the same patterns and output dimension as when the
+        checkpoint was saved. The next call to `run()`, `step()` or `next()`
+        continues the saved run, with its restarts and statistics.
+
+        :param str filepath: The file to read.
+        :raise ValueError: If the checkpoint does not match the current configuration.
+        """
+        with np.load(filepath) as data:
+            if int(data['version']) != 1:
+                raise ValueError(f"Unsupported checkpoint version: {int(data['version'])}")
+            elif tuple(int(i) for i in data['output_dimension']) != self._output_dim:
+                raise ValueError("The checkpoint was saved with another output dimension")
+            elif str(data['fingerprint']) != self._tileset_fingerprint():
+                raise ValueError("The checkpoint was saved with other patterns")
+            elif self._record and not 'log_cells' in data:
+                raise ValueError("The checkpoint has no decisions, set record = False to load it")
+
+            state = (
+                np.unpackbits(data['domains'], axis=1, count=len(self._patterns)).astype(bool),
+                data['queue'] if 'queue' in data else None
+            )
+            log = DecisionLog._from_arrays(data, 'log_') if self._record else None
+            stats = RunStats(*(
+                type(field.default)(value)
+                for field, value in zip(dataclasses.fields(RunStats), data['stats'].tolist())
+            ))
+            gauss = float(data['rng_gauss'])
+            rng_state = (
+                int(data['rng_version']),
+                tuple(int(i) for i in data['rng_state']),
+                None if np.isnan(gauss) else gauss
+            )
+
+        self._init_gen(state, log, stats)
+        self._grid.rng_state = rng_state
+
+    def regenerate(self,
+        region: NDArray,
+        tiles: Optional[NDArray] = None
+    ) -> tuple[bool, NDArray]:
+        """
+        Run the wave function collapse again on a region of an existing result.
+        Every cell outside of `region` keeps its tile and constrains the cells
+        inside of it. Only the bounding box of the region (and the cells around it)
+        is solved, so the time taken depends on the size of the region rather than
+        the size of the grid.
+
+        The new result replaces `wfc_result` and `wfc_tiles`, and the next call to
+        `run()` or `next()` starts a new run. Every call draws new tiles for the region,
+        and with `seed` set, the sequence of results is reproducible.
+
+        :param numpy.NDArray region: Boolean mask of the cells to generate again.
+        :param numpy.NDArray, optional tiles: The result to start from, given as pattern
+            indices like `wfc_tiles`. Cells outside of the region must be collapsed.
+            This is `None` by default, which uses `wfc_tiles`.
+        :return: A tuple of bool and numpy.NDArray. The bool represents whether
+            or not all cells have been collapsed. The numpy.NDArray is the image
+            representation of the whole grid.
+        :rtype: tuple[bool, numpy.NDArray]
+        :raise ValueError: If there is no result to start from, the shapes of `region`
+            and `tiles` do not match or a cell outside of the region is not collapsed.
+        """
+        if tiles is None:
+            if self._tiles is None:
+                raise ValueError("There is no result to regenerate, run the algorithm first or give 'tiles'")
+            tiles = self._tiles
+        tiles, region = np.asarray(tiles), np.asarray(region, dtype=bool)
+        if tiles.ndim != 2 or tiles.shape != region.shape:
+            raise ValueError(f"Expected region and tiles of the same 2D shape: {region.shape}, {tiles.shape}")
+        elif (tiles[~region] < 0).any() or (tiles >= len(self._patterns)).any():
+            raise ValueError("Cells outside of region must be collapsed to one of the patterns")
+
+        # seeded once, so that calls on the same region give different results
+        if self._region_rng is None:
+            self._region_rng = rand.Random(rand.getrandbits(32) if self._seed is None else self._seed)
+        success, tiles = _solve_region(
+            self._patterns, tiles, region, self._propagation,
+            self._compiled_adjacency(), self._repeat_til_success, self._region_rng.getrandbits(32)
+        )
+
+        self._tiles = tiles
+        self._return_val = success, self._render_tiles(tiles)
+        self._need_update = True
+        return self._return_val
+
+    def run_chunked(self,
+        chunk_size: tuple[int, int] = (32, 32), *,
+        max_retries: int = 2,
+        max_attempts: int = 10,
+        executor: Optional[Executor] = None
+    ) -> tuple[bool, NDArray]:
+        """
+        Run the wave function collapse on the output grid one chunk at a time,
+        for outputs too large to solve at once. The grid is split into chunks of
+        `chunk_size` cells that are solved one diagonal at a time, from the top left
+        corner. Each chunk is constrained by the chunks above and to the left of it,
+        and chunks of the same diagonal never share a side, so they can be solved
+        independently.
+
+        Propogation never travels further than a chunk, and a contradiction only
+        restarts its chunk, up to `max_attempts` attempts. If a chunk cannot be solved
+        against its neighbours, it is solved again along with a margin of half a chunk
+        around it, up to `max_retries` times with a wider margin every time. Cells of
+        a retry that fails are left as they were.
+
+        The result replaces `wfc_result` and `wfc_tiles`, and the next call to
+        `run()` or `next()` starts a new run. Chunks are not recorded in `decision_log`.
+
+        :param tuple[int, int], optional chunk_size: The dimension of the chunks in
+            tiles. This is `(32, 32)` by default.
+        :param int, optional max_retries: The number of times a chunk that cannot be
+            solved is solved again with a wider margin. This is `2` by default.
+        :param int, optional max_attempts: The number of attempts at a chunk, or at a chunk
+            with its margin, before giving up on it. Only one attempt is made if
+            `repeat_until_success` is False. This is `10` by default.
+        :param concurrent.futures.Executor, optional executor: The executor to solve the
+            chunks of each diagonal in. With a `ProcessPoolExecutor`, the tileset is sent with
+            every chunk. This is `None` by default, which solves them one after the other.
+        :return: A tuple of bool and numpy.NDArray. The bool represents whether
+            or not all cells have been collapsed. The numpy.NDArray is the image
+            representation of the grid.
+        :rtype: tuple[bool, numpy.NDArray]
+        """
+        if (
+            not isinstance(chunk_size, tuple) or
+            len(chunk_size) != 2 or
+            any((not isinstance(i, int)) for i in chunk_size)
+        ):
+            raise TypeError(f"Expected a tuple of two int: {chunk_size}")
+        elif any((dim < 1) for dim in chunk_size):
+            raise ValueError("Chunk size must be larger than 0")
+        elif not isinstance(max_attempts, int) or max_attempts < 1:
+            raise ValueError(f"max_attempts must be a positive integer: {max_attempts}")
+
+        rng = rand.Random(rand.getrandbits(32) if self._seed is None else self._seed)
+        adjacency = self._compiled_adjacency()
+        tiles = np.full(self._output_dim, -1)
+        n_rows, n_cols = (-(-dim // size) for dim, size in zip(self._output_dim, chunk_size))
+
+        def _solve(chunks: list[tuple[int, int]], margin: int) -> list[tuple[int, int]]:
+            """
+            Solve the given chunks together with a margin around them and
+            return those that could not be solved.
+            """
+            jobs = []
+            for row, col in chunks:
+                region = np.zeros(self._output_dim, dtype=bool)
+                region[
+                    max(row * chunk_size[0] - margin, 0):(row + 1) * chunk_size[0] + margin,
+                    max(col * chunk_size[1] - margin, 0):(col + 1) * chunk_size[1] + margin
+                ] = True
+                # only the bounding box of the region and its border are sent
+                rows, cols = np.nonzero(region)
+                box = (
+                    slice(max(rows.min() - 1, 0), rows.max() + 2),
+                    slice(max(cols.min() - 1, 0), cols.max() + 2)
+                )
+                args = (self._patterns, tiles[box], region[box], self._propagation,
+                        adjacency, self._repeat_til_success, rng.getrandbits(32), max_attempts)
+                jobs.append((box, region[box], executor.submit(_solve_region, *args)
+                                               if executor else _solve_region(*args)))
+
+            failed = []
+            for (box, region, result), chunk in zip(jobs, chunks):
+                success, solved = result.result() if executor else result
+                if success: tiles[box][region] = solved[region]
+                else: failed.append(chunk)
+            return failed
+
+        success = True
+        for diagonal in range(n_rows + n_cols - 1):
+            failed = _solve([
+                (row, diagonal - row)
+                for row in range(max(diagonal - n_cols + 1, 0), min(diagonal, n_rows - 1) + 1)
+            ], 0)
+            # widened chunks may overlap, so they are solved one at a time
+            for chunk in failed:
+                for retry in range(1, max_retries + 1):
+                    if not _solve([chunk], retry * max(chunk_size) // 2): break
+                else:
+                    success = False
+
+        self._tiles = tiles
+        self._return_val = success, self._render_tiles(tiles)
+        self._need_update = True
+        return self._return_val
+
+    def view(self,
+        rows: slice = slice(None),
+        cols: slice = slice(None),
+        lod: Literal['tile', 'cell'] = 'tile'
+    ) -> NDArray:
+        """
+        Render part of the grid of the current or last run. The cost depends on
+        the number of cells in view rather than on the size of the grid.
+        ```python
+        >>> wfc = WFC((2000, 2000), patterns, frames=False)
+        >>> wfc.step(1000)
+        >>> wfc.view(slice(0, 100), slice(0, 100))          # every tile of a corner
+        >>> wfc.view(slice(None, None, 4), slice(None, None, 4), lod='cell')   # an overview
+        ```
+
+        :param slice, optional rows: The rows of cells to render. This is all rows by default.
+        :param slice, optional cols: The columns of cells to render. This is all columns by default.
+        :param Literal['tile', 'cell'] lod: The level of detail. With `'tile'`, every cell is
+            drawn with its tile. With `'cell'`, every cell is a single pixel of the average
+            colour of its options. This is `'tile'` by default.
+        :return numpy.NDArray: An RGB image as a numpy array.
+        :raise ValueError: If the algorithm has not been run yet.
+        """
+        if not lod in ('tile', 'cell'):
+            raise ValueError(f"lod must be either 'tile' or 'cell': {lod}")
+        elif self._grid is None:
+            raise ValueError('There is no grid to view, run the algorithm first')
+        window = rows, cols
+        return self._grid.render(window) if lod == 'tile' else self._grid.colours(window)
+
+    def replay(self, keyframe_interval: int = 100) -> Replay:
+        """
+        Create a `Replay` of the current or last run, which rebuilds the image
+        of the grid at any step. This requires `record` to be True for that run
+        and the patterns to be unchanged since.
+
+        :param int, optional keyframe_interval: Number of steps between two states
+            kept in memory. This is `100` by default.
+        :return Replay: The replay.
+        :raise ValueError: If the decisions of the run were not recorded.
+        """
+        if self._log is None:
+            raise ValueError('Decisions were not recorded, set record = True before running')
+        return Replay(
+            self._log, self._patterns,
+            propagation=self._propagation,
+            adjacency=self._adjacency,
+            initial=self._initial,
+            keyframe_interval=keyframe_interval
+        )
+
+
+    def run(self,
+        timeout: Optional[float] = None, *,
+        token: Optional[CancellationToken] = None
+    ) -> tuple[bool, NDArray]:
         """
         Run the wave function collapse algorithm on the current configuration.
         Internally, this will just iterate over the current object to get the final
@@ -155,15 +811,36 @@ class WFC:
         If `rerun` is False and all cells have been collapsed. This will raise a
         CollapsedError to avoid overwriting the current result.
 
+        If the run is stopped by `timeout` or `token`, the progress is kept and
+        calling `run()` again continues from where it stopped.
+
+        :param float, optional timeout: The maximum time in seconds to run. This
+            is `None` by default, which means no limit.
+        :param CancellationToken, optional token: Token to cancel the run from
+            another thread. This is `None` by default.
         :return: A tuple of bool and numpy.NDArray. The bool represents whether
             or not all cells have been collapsed. The numpy.NDArray is the image
             representation of the grid.
         :rtype: tuple[bool, numpy.NDArray]
+        :raise UnsatisfiableError: If `presolve` is True and the configuration cannot be filled.
+        :raise TimeoutError: If the algorithm has not finished after `timeout` seconds.
+        :raise CancelledError: If the run is cancelled through `token`.
         """
         if self._need_update: self._init_gen()
         prev_result = self._return_val
-        for _ in self: pass
+        if not self.step(max_seconds=timeout, token=token).finished:
+            if not token is None and token.is_cancelled:
+                raise CancelledError('Wave Function Collapse was cancelled')
+            raise TimeoutError(f'Wave Function Collapse did not finish within {timeout} seconds')
         
+        self._check_result(prev_result)
+        return self._return_val
+
+    def _check_result(self, prev_result: Optional[tuple[bool, NDArray]]):
+        """
+        Restore the previous result and raise a CollapsedError if iterating
+        did not produce a new result.
+        """
         if self._return_val is None:
             self._return_val = prev_result
             err_msg = (
@@ -173,6 +850,193 @@ class WFC:
                 " attribute instead."
             )
             raise CollapsedError(err_msg)
+
+
+    def export_animation(self,
+        filepath: str, *,
+        every: int = 1,
+        max_frames: Optional[int] = None,
+        duration: int = 50,
+        scale: int = 1
+    ) -> tuple[bool, NDArray]:
+        """
+        Run the wave function collapse algorithm and write every step to an
+        animated image file, such as a `.gif`, without a display. Frames are encoded
+        and the file is written in a background thread while the algorithm runs.
+        The final result is always the last frame. See `wfc.animation.AnimationWriter`
+        for more details on the parameters.
+
+        If `rerun` is False and all cells have been collapsed. This will raise a
+        CollapsedError to avoid overwriting the current result.
+
+        :param str filepath: The file to write to.
+        :param int, optional every: Keep one frame out of `every`. This is `1` by default.
+        :param int, optional max_frames: The maximum number of frames in the file. This
+            is `None` by default, which means no limit.
+        :param int, optional duration: Time in milliseconds each frame is shown.
+            This is `50` by default.
+        :param int, optional scale: Factor to enlarge the frames by. This is `1` by default.
+        :return: A tuple of bool and numpy.NDArray. The bool represents whether
+            or not all cells have been collapsed. The numpy.NDArray is the image
+            representation of the grid.
+        :rtype: tuple[bool, numpy.NDArray]
+        :raise ValueError: If `frames` is False.
+        """
+        if not self._frames:
+            raise ValueError('There are no frames to export, set frames = True')
+        if self._need_update: self._init_gen()
+        prev_result = self._return_val
+        with AnimationWriter(
+            filepath, every=every, max_frames=max_frames, duration=duration, scale=scale
+        ) as writer:
+            image = None
+            for image in self: writer.add(image)
+            self._check_result(prev_result)
+            # a failed attempt ends without yielding its last state
+            if image is None or not np.array_equal(image, self._return_val[1]):
+                writer.add(self._return_val[1])
+        return self._return_val
+
+
+    def step(self,
+        max_steps: Optional[int] = None,
+        max_seconds: Optional[float] = None, *,
+        token: Optional[CancellationToken] = None
+    ) -> StepProgress:
+        """
+        Advance the wave function collapse algorithm by as many steps as the
+        budget allows. A step is a collapse followed by its propogation. The
+        time budget is checked after every step, so a single step may overshoot it.
+        Calling this again continues from where the previous call stopped.
+
+        :param int, optional max_steps: The maximum number of steps to advance.
+            This is `None` by default, which means no limit.
+        :param float, optional max_seconds: The maximum time in seconds to run.
+            This is `None` by default, which means no limit.
+        :param CancellationToken, optional token: Token to stop advancing early.
+            This is `None` by default.
+        :return StepProgress: The progress made.
+        """
+        if not max_steps is None:
+            if not isinstance(max_steps, int):
+                raise TypeError('max_steps must be a positive integer')
+            elif max_steps < 1:
+                raise ValueError('max_steps must be a positive integer')
+        deadline = None if max_seconds is None else time.perf_counter() + max_seconds
+
+        steps, image = 0, None
+        while max_steps is None or steps < max_steps:
+            if not token is None and token.is_cancelled: break
+            try: image = next(self)
+            except StopIteration: return StepProgress(steps, image, True)
+            steps += 1
+            if not deadline is None and time.perf_counter() > deadline: break
+        return StepProgress(steps, image, False)
+
+    def deltas(self) -> Generator[GridDelta, None, None]:
+        """
+        Iterate over the current object, giving the cells changed by every step
+        instead of the image of the grid. This is meant for visualisers that
+        keep their own copy of the grid, see `wfc.events.DeltaBuffer`.
+        ```python
+        >>> wfc.frames = False
+        >>> buffer = DeltaBuffer(wfc.output_dimension, wfc.n_patterns)
+        >>> for delta in wfc.deltas():
+        ...     buffer.apply(delta)
+        >>> (buffer.tiles == wfc.wfc_tiles).all()
+        True
+        ```
+
+        If the run was already started, the first delta resets the grid and holds
+        every cell that does not have all options. The changes of the step that ends a
+        failed attempt are given as well. Set `frames` to False beforehand, otherwise
+        the whole grid is still rendered every step.
+        """
+        if self._need_update: self._init_gen()
+        grid = self._grid
+        grid.track_changes(True)
+        try:
+            while True:
+                try: next(self)
+                except StopIteration: break
+                reset, cells = grid.changes()
+                yield GridDelta.from_domains(reset, cells, grid.domains(cells))
+            reset, cells = grid.changes()
+            if reset or cells.size:
+                yield GridDelta.from_domains(reset, cells, grid.domains(cells))
+        finally:
+            grid.track_changes(False)
+
+    async def astream(self,
+        steps: int = 1,
+        seconds: Optional[float] = None, *,
+        executor: Optional[Executor] = None
+    ) -> AsyncGenerator[NDArray, None]:
+        """
+        Asynchronous version of iterating over the current object. The algorithm
+        runs in a worker thread of `executor` and control is given back to the
+        event loop every `steps` collapses or every `seconds` seconds, whichever
+        comes first. Only the latest image of each batch of steps is yielded.
+        ```python
+        >>> async for image in wfc.astream(steps=50):
+        ...     f'Send image somewhere {image}'
+        >>> wfc.wfc_result
+        ```
+
+        Cancelling the task consuming this generator stops the worker thread
+        at the next step. The same object should not be iterated over by
+        anything else while streaming.
+
+        :param int, optional steps: The maximum number of steps to run before
+            giving back control. This is `1` by default.
+        :param float, optional seconds: The maximum time in seconds to run before
+            giving back control. This is `None` by default, which means no time limit.
+        :param concurrent.futures.Executor, optional executor: The executor to run the
+            algorithm in. This is `None` by default, which uses the default executor
+            of the running event loop.
+        """
+        if not isinstance(steps, int):
+            raise TypeError('steps must be a positive integer')
+        elif steps < 1:
+            raise ValueError('steps must be a positive integer')
+
+        loop = asyncio.get_running_loop()
+        token = CancellationToken()
+        progress = StepProgress(0, None, False)
+        while not progress.finished:
+            try:
+                progress = await loop.run_in_executor(
+                    executor, lambda: self.step(steps, seconds, token=token)
+                )
+            except asyncio.CancelledError:
+                token.cancel()
+                raise
+            if not progress.image is None: yield progress.image
+
+    async def arun(self,
+        steps: int = 1000,
+        seconds: Optional[float] = 0.05, *,
+        executor: Optional[Executor] = None
+    ) -> tuple[bool, NDArray]:
+        """
+        Asynchronous version of `run()`. The algorithm runs in a worker thread
+        and control is given back to the event loop every `steps` collapses or
+        every `seconds` seconds, so that many generations can be served by
+        the same event loop. See `astream()` for more details on the parameters.
+
+        If `rerun` is False and all cells have been collapsed. This will raise a
+        CollapsedError to avoid overwriting the current result.
+
+        :return: A tuple of bool and numpy.NDArray. The bool represents whether
+            or not all cells have been collapsed. The numpy.NDArray is the image
+            representation of the grid.
+        :rtype: tuple[bool, numpy.NDArray]
+        """
+        if self._need_update: self._init_gen()
+        prev_result = self._return_val
+        async for _ in self.astream(steps, seconds, executor=executor): pass
+
+        self._check_result(prev_result)
         return self._return_val
 
 
@@ -180,11 +1044,32 @@ class WFC:
     ) -> Generator[NDArray, None, tuple[bool, NDArray]]:
         return self
     
-    def __next__(self) -> NDArray:
+    def __next__(self) -> Optional[NDArray]:
         if self._need_update: self._init_gen()
+        start = time.perf_counter()
         try:
-            return next(self._generator)
+            image = next(self._generator)
         except StopIteration as exc:
+            self._stats.seconds += time.perf_counter() - start
             self._return_val = exc.value
+            if not exc.value is None:
+                self._tiles = self._grid.tiles()
+                self._record_metrics()
             if self._rerun: self._need_update = True
-            raise exc
\ No newline at end of file
+            raise exc
+        self._stats.seconds += time.perf_counter() - start
+        if (
+            not self._checkpoint is None and
+            time.perf_counter() - self._last_checkpoint > self._checkpoint_interval
+        ):
+            self.save_checkpoint(self._checkpoint)
+            self._last_checkpoint = time.perf_counter()
+        return image
+
+    def _record_metrics(self):
+        """
+        Update the metrics registry with the run that just finished.
+        """
+        if self._metrics is None: return
+        record_run(self._stats, self._return_val[0], self._tileset_fingerprint(),
+                   self._output_dim, self._metrics)
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from wfc._algos import _compile_adjacency
+from wfc.cell_image import TileImage
+from wfc.utils import (
+    generate_patterns,
+    load_tiles
+)
+
+
+CIRCUIT = os.path.join(ROOT, 'images', 'tilesets', 'Circuit')
+FLOWERS = os.path.join(ROOT, 'images', 'tileset_generator', 'Flowers.png')
+
+
+@pytest.fixture(scope='session')
+def circuit():
+    return load_tiles(CIRCUIT, True)
+
+@pytest.fixture(scope='session')
+def flowers():
+    return generate_patterns(FLOWERS, 3, False)
+
+@pytest.fixture(scope='session')
+def trap():
+    """
+    A tileset of a tile that fits next to itself and a more frequent tile
+    that fits next to nothing, so most attempts fail on their first collapse.
+    """
+    blank = np.zeros((3, 3, 3), dtype='uint8')
+    lone = np.full((3, 3, 3), 100, dtype='uint8')
+    lone[0], lone[-1] = 1, 2
+    lone[1, 0], lone[1, -1] = 3, 4
+    return [TileImage(blank, 1), TileImage(lone, 3)]
+
+
+def valid_tiling(tiles, patterns) -> bool:
+    """
+    Whether or not every pair of neighbouring cells of a grid of pattern
+    indices follows the adjacency rules of the patterns.
+    """
+    tables = [
+        table.toarray() if hasattr(table, 'toarray') else table
+        for table in _compile_adjacency(patterns)
+    ]
+    # tables[0][i, j]: i can be above j, tables[2][i, j]: i can be left of j
+    return bool(
+        (tiles > -1).all() and
+        tables[0][tiles[:-1], tiles[1:]].all() and
+        tables[2][tiles[:, :-1], tiles[:, 1:]].all()
+    )
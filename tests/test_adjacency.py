@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from scipy.sparse import sparray
+
+import wfc._algos as algos
+
+from wfc.wfc import WFC
+
+from conftest import valid_tiling
+
+
+@pytest.fixture
+def sparse(monkeypatch):
+    monkeypatch.setattr(algos, '_SPARSE_MIN_PATTERNS', 0)
+    monkeypatch.setattr(algos, '_SPARSE_MAX_DENSITY', 1)
+
+@pytest.mark.parametrize('tileset', ['circuit', 'flowers', 'trap'])
+def test_sparse_tables(request, tileset):
+    patterns = request.getfixturevalue(tileset)
+    dense = algos._compile_adjacency(patterns)
+    assert isinstance(dense, np.ndarray)
+    assert dense.shape == (len(algos._DIRECTIONS), len(patterns), len(patterns))
+
+    request.getfixturevalue('sparse')
+    tables = algos._compile_adjacency(patterns)
+    assert all(isinstance(table, sparray) for table in tables)
+    assert (np.stack([table.toarray() for table in tables]) == dense).all()
+
+@pytest.mark.parametrize('tileset, size', [('circuit', 8), ('flowers', 6)])
+def test_sparse_run(request, tileset, size):
+    patterns = request.getfixturevalue(tileset)
+    dense = WFC((size, size), patterns, propagation='batched', seed=3, metrics=None)
+    dense_success, dense_image = dense.run()
+
+    request.getfixturevalue('sparse')
+    sparse = WFC((size, size), patterns, propagation='batched', seed=3, metrics=None)
+    assert not isinstance(sparse._adjacency, np.ndarray)
+    success, image = sparse.run()
+    assert success == dense_success
+    assert (sparse.wfc_tiles == dense.wfc_tiles).all()
+    assert (image == dense_image).all()
+    if success: assert valid_tiling(sparse.wfc_tiles, patterns)
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+import pytest
+
+from PIL import Image, ImageSequence
+
+from wfc import wfc as wfc_module
+from wfc.animation import AnimationWriter
+from wfc.wfc import WFC
+
+
+def _frame(value: int):
+    return np.full((4, 4, 3), value, dtype='uint8')
+
+def _read(path):
+    with Image.open(path) as image:
+        return [np.array(frame.convert('RGB')) for frame in ImageSequence.Iterator(image)]
+
+@pytest.mark.parametrize('count', [1, 7, 50, 201])
+def test_max_frames_keeps_last(tmp_path, count):
+    path = tmp_path / 'run.png'
+    with AnimationWriter(str(path), max_frames=10) as writer:
+        for i in range(count): writer.add(_frame(i))
+        assert len(writer._frames) <= 10
+    frames = _read(path)
+    assert 0 < len(frames) <= 10
+    assert frames[0][0, 0, 0] == 0 and frames[-1][0, 0, 0] == count - 1
+
+@pytest.mark.parametrize('slow', [False, True])
+def test_max_frames_evenly_spaced(tmp_path, monkeypatch, slow):
+    if slow:
+        # an encoder far behind the producer must not change which frames are kept
+        convert = AnimationWriter._convert
+        monkeypatch.setattr(AnimationWriter, '_convert',
+                            lambda self, frame: time.sleep(0.002) or convert(self, frame))
+    path = tmp_path / 'run.png'
+    with AnimationWriter(str(path), max_frames=8, queue_size=256) as writer:
+        for i in range(150): writer.add(_frame(i))
+    values = [int(frame[0, 0, 0]) for frame in _read(path)]
+    assert values[-1] == 149
+    assert len(set(np.diff(values[:-1]))) == 1
+
+def test_every(tmp_path):
+    path = tmp_path / 'run.png'
+    with AnimationWriter(str(path), every=3) as writer:
+        for i in range(10): writer.add(_frame(i))
+    assert [frame[0, 0, 0] for frame in _read(path)] == [0, 3, 6, 9]
+
+def test_no_frame(tmp_path):
+    with pytest.raises(ValueError):
+        AnimationWriter(str(tmp_path / 'run.gif')).close()
+    assert not (tmp_path / 'run.gif').exists()
+
+def test_export_does_not_repeat_result(tmp_path, circuit, monkeypatch):
+    added = []
+    class Recording(AnimationWriter):
+        __slots__ = ()
+        def add(self, frame):
+            added.append(frame)
+            super().add(frame)
+    monkeypatch.setattr(wfc_module, 'AnimationWriter', Recording)
+
+    wfc = WFC((5, 5), circuit, seed=1, metrics=None)
+    success, image = wfc.export_animation(str(tmp_path / 'run.png'))
+    assert success and (added[-1] == image).all()
+    assert len(added) == len(list(WFC((5, 5), circuit, seed=1, metrics=None)))
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from wfc.wfc import WFC
+
+
+def test_arun_matches_run(circuit):
+    expected = WFC((8, 8), circuit, seed=9, metrics=None).run()
+    wfc = WFC((8, 8), circuit, seed=9, metrics=None)
+    success, image = asyncio.run(wfc.arun(steps=5, seconds=None))
+    assert success == expected[0] and (image == expected[1]).all()
+
+def test_astream_batches(circuit):
+    steps = len(list(WFC((6, 6), circuit, seed=2, metrics=None)))
+    async def _collect():
+        wfc = WFC((6, 6), circuit, seed=2, metrics=None)
+        return [image async for image in wfc.astream(steps=4)]
+    images = asyncio.run(_collect())
+    assert len(images) == -(-steps // 4)
+
+def test_cancel_stops_worker(circuit):
+    wfc = WFC((12, 12), circuit, seed=1, metrics=None, frames=False, propagation='batched')
+    async def _cancel():
+        task = asyncio.create_task(wfc.arun(steps=1, seconds=None))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError): await task
+    asyncio.run(_cancel())
+    # the run is kept and can be finished afterward
+    assert wfc.run()[0]
+
+def test_bad_steps(circuit):
+    wfc = WFC((4, 4), circuit, metrics=None)
+    with pytest.raises(ValueError): asyncio.run(wfc.arun(steps=0))
@@ -0,0 +1,62 @@
+import pytest
+
+from wfc.restart import RestartPolicy
+from wfc.wfc import WFC
+
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+@pytest.mark.parametrize('steps', [1, 10])
+def test_round_trip(tmp_path, circuit, propagation, steps):
+    path = str(tmp_path / 'run.npz')
+    wfc = WFC((8, 8), circuit, propagation=propagation, seed=3, record=True, metrics=None)
+    wfc.step(steps)
+    wfc.save_checkpoint(path)
+    rest = list(wfc)
+
+    resumed = WFC((8, 8), circuit, propagation=propagation, record=True, metrics=None)
+    resumed.load_checkpoint(path)
+    # the saved state is not given again
+    images = list(resumed)
+    assert len(images) == len(rest)
+    assert all((a == b).all() for a, b in zip(images, rest))
+    assert (resumed.wfc_tiles == wfc.wfc_tiles).all()
+    assert resumed.run_stats.collapses == wfc.run_stats.collapses
+    log, other = resumed.decision_log, wfc.decision_log
+    assert [log[i] for i in range(len(log))] == [other[i] for i in range(len(other))]
+
+def _failed_attempt(patterns, propagation, attempt=1):
+    """
+    A run stopped right after the given attempt failed on its first collapse.
+    """
+    for seed in range(100):
+        wfc = WFC((4, 4), patterns, propagation=propagation, seed=seed, metrics=None)
+        for _ in wfc:
+            if wfc.run_stats.attempts == attempt and wfc._grid.contradictions().size: return wfc
+            elif wfc.run_stats.attempts >= attempt: break
+    pytest.fail(f'No seed fails on the first collapse of attempt {attempt}')
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_invalid_state(tmp_path, trap, propagation):
+    path = str(tmp_path / 'run.npz')
+    wfc = _failed_attempt(trap, propagation)
+    wfc.save_checkpoint(path)
+    wfc.run()
+
+    resumed = WFC((4, 4), trap, propagation=propagation, metrics=None)
+    resumed.load_checkpoint(path)
+    assert resumed.run()[0] and (resumed.wfc_tiles == 0).all()
+    assert resumed.run_stats.attempts == wfc.run_stats.attempts > 1
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_resume_counts_attempts(tmp_path, trap, propagation):
+    path = str(tmp_path / 'run.npz')
+    wfc = _failed_attempt(trap, propagation, 2)
+    wfc.save_checkpoint(path)
+
+    policy = RestartPolicy(max_attempts=2)
+    resumed = WFC((4, 4), trap, propagation=propagation, metrics=None, restart_policy=policy)
+    resumed.load_checkpoint(path)
+    success, _ = resumed.run()
+    # the failed attempt saved in the checkpoint was the last one allowed
+    assert not success and resumed.run_stats.attempts == 2
+    assert [stats.attempt for stats in policy.history] == [2]
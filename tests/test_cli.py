@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from PIL import Image
+
+from wfc.__main__ import main
+from wfc.wfc import WFC
+
+from conftest import CIRCUIT, FLOWERS, valid_tiling
+
+
+def test_png(tmp_path, capsys):
+    output = tmp_path / 'maps'
+    assert main([FLOWERS, '--size', '6', '7', '--count', '3', '--seed', '0',
+                 '--workers', '0', '-o', str(output)]) == 0
+    assert sorted(path.name for path in output.iterdir()) == ['map_0.png', 'map_1.png', 'map_2.png']
+    assert Image.open(output / 'map_0.png').size == (7, 6)
+    assert '3 maps in' in capsys.readouterr().out
+
+@pytest.mark.parametrize('workers', ['0', '2'])
+def test_tiles(tmp_path, circuit, workers):
+    assert main([CIRCUIT, '--rotate', '--size', '5', '5', '--count', '2', '--seed', '4', '--format', 'tiles',
+                 '--prefix', 'grid_', '--workers', workers, '-o', str(tmp_path)]) == 0
+    for i in range(2):
+        tiles = np.load(tmp_path / f'grid_{i}.npy')
+        wfc = WFC((5, 5), circuit, propagation='batched', seed=4 + i, metrics=None)
+        wfc.run()
+        assert (tiles == wfc.wfc_tiles).all() and valid_tiling(tiles, circuit)
+
+@pytest.mark.parametrize('argv', [
+    ['missing.png'],
+    [FLOWERS, '--count', '0'],
+    [FLOWERS, '--size', '0', '4'],
+    [FLOWERS, '--max-attempts', '0'],
+    [FLOWERS, '--time-budget', '0'],
+    [FLOWERS, '--format', 'gif']
+])
+def test_errors(tmp_path, argv):
+    with pytest.raises(SystemExit):
+        main([*argv, '-o', str(tmp_path)])
+
+def test_unsatisfiable(tmp_path, capsys):
+    tiles = tmp_path / 'tiles'
+    tiles.mkdir()
+    # a tile that fits next to nothing, not even itself
+    tile = np.full((3, 3, 3), 100, dtype='uint8')
+    tile[0], tile[-1] = 1, 2
+    tile[1, 0], tile[1, -1] = 3, 4
+    Image.fromarray(tile).save(tiles / 'lone.png')
+    output = tmp_path / 'maps'
+    assert main([str(tiles), '--size', '3', '3', '--count', '2', '--presolve',
+                 '--workers', '1', '-o', str(output)]) == 1
+    assert not any(output.iterdir())
+    assert capsys.readouterr().out.startswith('2 maps in')
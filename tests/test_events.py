@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from wfc._algos import _colour_table
+from wfc.events import DeltaBuffer, GridDelta
+from wfc.wfc import WFC
+
+
+def _stream(wfc, colours=None):
+    """
+    Apply every delta of a run to a buffer, checking it against the grid after every step.
+    """
+    buffer = DeltaBuffer(wfc.output_dimension, wfc.n_patterns, colours)
+    resets = 0
+    for delta in wfc.deltas():
+        changed = buffer.apply(delta)
+        resets += delta.reset
+        assert len(changed) == (wfc.output_dimension[0] * wfc.output_dimension[1] if delta.reset else len(delta))
+        assert (buffer.domains() == wfc._grid.domains()).all()
+        assert (buffer.tiles == wfc._grid.tiles()).all()
+        if not colours is None: assert (buffer.image == wfc._grid.colours()).all()
+    return buffer, resets
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_reconstruction(circuit, propagation):
+    wfc = WFC((7, 7), circuit, propagation=propagation, seed=4, frames=False, metrics=None)
+    buffer, resets = _stream(wfc, _colour_table(circuit))
+    assert resets == wfc.run_stats.attempts
+    assert (buffer.tiles == wfc.wfc_tiles).all()
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+@pytest.mark.parametrize('retry', [True, False])
+def test_contradictions(trap, propagation, retry):
+    for seed in range(20):
+        wfc = WFC((4, 4), trap, propagation=propagation, seed=seed, frames=False,
+                  repeat_until_success=retry, metrics=None)
+        buffer, resets = _stream(wfc)
+        assert resets == wfc.run_stats.attempts
+        if not retry and not wfc.wfc_result[0]:
+            # the failed step is given although no image is produced for it
+            assert not buffer.domains().any(axis=1).all()
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_presolved_and_started(flowers, propagation):
+    wfc = WFC((8, 8), flowers, propagation=propagation, seed=1, frames=False, presolve=True, metrics=None)
+    wfc.step(5)
+    buffer, resets = _stream(wfc)
+    assert resets >= 1 and (buffer.tiles == wfc.wfc_tiles).all()
+
+def test_delta_size():
+    domains = np.zeros((3, 10), dtype=bool)
+    domains[0, 4] = True
+    domains[1, [1, 9]] = True
+    delta = GridDelta.from_domains(False, np.array([2, 5, 7]), domains)
+    assert delta.collapsed_cells.tolist() == [2] and delta.collapsed_tiles.tolist() == [4]
+    assert delta.domain_cells.tolist() == [5, 7] and delta.domains.shape == (2, 2)
+    assert len(delta) == 3 and delta.nbytes < domains.nbytes + 3 * 8 * 2
+
+def test_wrong_colours():
+    with pytest.raises(ValueError):
+        DeltaBuffer((2, 2), 3, np.zeros((2, 3)))
@@ -0,0 +1,56 @@
+import threading
+
+import numpy as np
+import pytest
+
+from wfc.metrics import (
+    MetricsRegistry,
+    REGISTRY,
+    RunStats,
+    _Metric,
+    record_run,
+    tileset_fingerprint
+)
+from wfc.utils import _OverlappingModel_TileImage
+from wfc.wfc import WFC
+
+
+def test_fingerprint_overlapping_windows(flowers):
+    assert tileset_fingerprint(flowers) == tileset_fingerprint(list(flowers))
+    palette = flowers[0].palette
+    # same top-left pixel and frequency, different windows
+    first = np.zeros((3, 3), dtype=int)
+    second = first.copy()
+    second[2, 2] = 1
+    assert (
+        tileset_fingerprint([_OverlappingModel_TileImage(first, 1, palette)]) !=
+        tileset_fingerprint([_OverlappingModel_TileImage(second, 1, palette)])
+    )
+
+def test_fingerprint_order_and_frequency(circuit):
+    assert tileset_fingerprint(circuit) != tileset_fingerprint(circuit[::-1])
+    assert tileset_fingerprint(circuit[:1]) != tileset_fingerprint(
+        [type(circuit[0])(circuit[0].image, 2)]
+    )
+
+def test_record_run_export():
+    registry = MetricsRegistry()
+    record_run(RunStats(attempts=2, contradictions=1, collapses=10, seconds=0.2), True, 'abc', (4, 5), registry)
+    record_run(RunStats(attempts=1, collapses=20, seconds=0.3), False, 'abc', (4, 5), registry)
+    text = registry.export()
+    assert 'abc' in text and text.endswith('\n')
+
+def test_metrics_opt_in(circuit):
+    before = REGISTRY.export()
+    wfc = WFC((4, 4), circuit, seed=0)
+    assert wfc.metrics is None
+    wfc.run()
+    assert REGISTRY.export() == before
+
+    registry = MetricsRegistry()
+    WFC((4, 4), circuit, seed=0, metrics=registry).run()
+    assert f'tileset="{tileset_fingerprint(circuit)}"' in registry.export()
+
+def test_metric_base_is_abstract():
+    with pytest.raises(TypeError):
+        _Metric('name', 'help', (), threading.Lock())
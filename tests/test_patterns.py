@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+import shutil
+
+from PIL import Image
+
+from wfc._algos import _DIRECTIONS, _compile_adjacency
+from wfc.utils import (
+    _overlapping_adjacency,
+    generate_corpus_patterns,
+    generate_patterns,
+    prune_patterns
+)
+from wfc.wfc import WFC
+
+from conftest import FLOWERS, valid_tiling
+
+
+def _windows(image: np.ndarray, n_pixels: int) -> set[bytes]:
+    """
+    Every window of an image wrapping around its borders, as bytes.
+    """
+    height, width = image.shape[:2]
+    tiled = np.concatenate([image, image[:n_pixels - 1]])
+    tiled = np.concatenate([tiled, tiled[:, :n_pixels - 1]], axis=1)
+    return {
+        tiled[row:row + n_pixels, col:col + n_pixels].tobytes()
+        for row in range(height) for col in range(width)
+    }
+
+def test_palette_windows(flowers):
+    image = np.array(Image.open(FLOWERS).convert('RGB'))
+    assert all(tile.palette is flowers[0].palette for tile in flowers)
+    assert {tile.pixels.tobytes() for tile in flowers} == _windows(image, 3)
+    assert sum(tile.frequency for tile in flowers) == image.shape[0] * image.shape[1]
+    assert all((tile.image == tile.pixels[:1, :1]).all() for tile in flowers)
+
+def test_rotations(flowers):
+    rotated = generate_patterns(FLOWERS, 3, True)
+    windows = {tile.pixels.tobytes() for tile in rotated}
+    assert {tile.pixels.tobytes() for tile in flowers} <= windows
+    assert all(np.rot90(tile.pixels).tobytes() in windows for tile in flowers)
+
+@pytest.mark.parametrize('n_pixels', [2, 3])
+def test_overlapping_adjacency(n_pixels):
+    patterns = generate_patterns(FLOWERS, n_pixels)[::3]
+    tables = _overlapping_adjacency(patterns)
+    for d, direction in enumerate(_DIRECTIONS):
+        expected = np.array([[tile.is_adjacent_to(other, direction) for other in patterns] for tile in patterns])
+        assert (tables[d].toarray() == expected).all()
+
+def _counts(patterns) -> dict[bytes, int]:
+    return {tile.pixels.tobytes(): tile.frequency for tile in patterns}
+
+def test_corpus_single_image(flowers):
+    corpus = generate_corpus_patterns([FLOWERS], 3, workers=0)
+    assert _counts(corpus) == _counts(flowers)
+    assert all(tile.palette is corpus[0].palette for tile in corpus)
+
+def test_corpus_directory(tmp_path, flowers):
+    for name in ('a.png', 'b.png'): shutil.copy(FLOWERS, tmp_path / name)
+    (tmp_path / 'notes.txt').write_text('not an image')
+    progress = []
+    corpus = generate_corpus_patterns(str(tmp_path), 3, workers=0,
+                                      progress=lambda done, total: progress.append((done, total)))
+    assert progress == [(1, 2), (2, 2)]
+    assert _counts(corpus) == {key: 2 * count for key, count in _counts(flowers).items()}
+    assert _counts(generate_corpus_patterns(str(tmp_path), 3, workers=2)) == _counts(corpus)
+
+def test_corpus_errors(tmp_path):
+    with pytest.raises(ValueError):
+        generate_corpus_patterns(str(tmp_path))
+
+@pytest.mark.parametrize('max_patterns, min_frequency', [(60, None), (None, 10), (40, 5)])
+def test_prune(flowers, max_patterns, min_frequency):
+    pruned, kept = prune_patterns(flowers, max_patterns, min_frequency)
+    assert pruned and (max_patterns is None or len(pruned) <= max_patterns)
+    assert min_frequency is None or min(tile.frequency for tile in pruned) >= min_frequency
+    assert [tile for tile in flowers if tile in pruned] == pruned
+    total = sum(tile.frequency for tile in flowers)
+    assert kept == pytest.approx(sum(tile.frequency for tile in pruned) / total)
+    # every tile kept still has a neighbour in every direction
+    assert _compile_adjacency(pruned).any(axis=2).all()
+
+    wfc = WFC((5, 5), pruned, seed=0, metrics=None)
+    success, _ = wfc.run()
+    assert success and valid_tiling(wfc.wfc_tiles, pruned)
+
+def test_prune_unlimited(flowers):
+    pruned, kept = prune_patterns(flowers)
+    assert len(pruned) <= len(flowers) and 0 < kept <= 1
+
+def test_prune_errors(flowers):
+    with pytest.raises(ValueError):
+        prune_patterns(flowers, max_patterns=0)
+    with pytest.raises(ValueError):
+        prune_patterns(flowers, min_frequency=10**6)
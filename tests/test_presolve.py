@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from wfc._algos import _make_grid, _presolve
+from wfc.cell_image import Direction, TileImage
+from wfc.wfc import WFC, UnsatisfiableError
+
+
+class Link(TileImage):
+    """
+    Tile `index` of a chain, which only fits with the next tile on its right.
+    """
+    __slots__ = 'index',
+    def __init__(self, index: int):
+        super().__init__(np.full((2, 2, 3), index, dtype='uint8'), 1)
+        self.index = index
+
+    def is_adjacent_to(self, tile, direction):
+        if direction == Direction.LEFT: return tile.index == self.index + 1
+        elif direction == Direction.RIGHT: return tile.index == self.index - 1
+        return True
+
+def test_fixpoint(circuit):
+    domains = _presolve(circuit, (5, 7))
+    assert domains.any(axis=1).all()
+    grid = _make_grid(circuit, (5, 7), 'batched')
+    grid.load(domains)
+    assert grid.propagate(np.arange(35))
+    assert (grid.domains() == domains).all()
+
+def test_dead_patterns(trap):
+    wfc = WFC((4, 4), trap, presolve=True, metrics=None)
+    # the second tile fits next to nothing
+    assert wfc.dead_patterns == [1]
+    assert wfc.run()[0] and (wfc.wfc_tiles == 0).all()
+
+@pytest.mark.parametrize('dimension', [(1, 2), (3, 3), (6, 4)])
+def test_unsatisfiable(trap, dimension):
+    wfc = WFC(dimension, trap[1:], presolve=True, metrics=None)
+    assert wfc.dead_patterns == [0]
+    with pytest.raises(UnsatisfiableError): wfc.run()
+
+def test_unsatisfiable_chain():
+    # a chain of 4 tiles cannot fill a row of 9 cells, cells run out of options
+    # while the rest of the row is still being pruned
+    wfc = WFC((1, 9), [Link(i) for i in range(4)], presolve=True, metrics=None)
+    assert wfc.dead_patterns == [0, 1, 2, 3]
+    with pytest.raises(UnsatisfiableError): wfc.run()
+    assert WFC((1, 4), [Link(i) for i in range(4)], presolve=True, metrics=None).dead_patterns == []
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from wfc._algos import _make_grid
+from wfc.wfc import WFC
+
+from conftest import valid_tiling
+
+
+@pytest.mark.parametrize('tileset', ['circuit', 'flowers'])
+def test_batched_matches_stack(request, tileset):
+    patterns = request.getfixturevalue(tileset)
+    rng = np.random.default_rng(0)
+    stack, batched = (_make_grid(patterns, (6, 6), mode) for mode in ('stack', 'batched'))
+    stack.reset()
+    batched.reset()
+    for _ in range(12):
+        domains = stack.domains()
+        open_cells = np.flatnonzero(domains.sum(axis=1) > 1)
+        if not open_cells.size: break
+        index = int(rng.choice(open_cells))
+        tile = int(rng.choice(np.flatnonzero(domains[index])))
+        stack.collapse(index, tile)
+        batched.collapse(index, tile)
+        valid = stack.propagate(index)
+        assert batched.propagate(index) == valid
+        if not valid: break
+        assert (stack.domains() == batched.domains()).all()
+        assert (stack.tiles() == batched.tiles()).all()
+        assert stack.is_collapsed == batched.is_collapsed
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+@pytest.mark.parametrize('tileset, size', [('circuit', 9), ('flowers', 5)])
+def test_valid_result(request, tileset, size, propagation):
+    patterns = request.getfixturevalue(tileset)
+    wfc = WFC((size, size), patterns, propagation=propagation, seed=6, metrics=None)
+    success, image = wfc.run()
+    assert success and valid_tiling(wfc.wfc_tiles, patterns)
+    tile_h, tile_w = patterns[0].image.shape[:2]
+    assert image.shape == (size * tile_h, size * tile_w, 3)
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+@pytest.mark.parametrize('tileset', ['circuit', 'trap'])
+def test_rerun_reuses_grid(request, tileset, propagation):
+    patterns = request.getfixturevalue(tileset)
+    wfc = WFC((6, 6), patterns, propagation=propagation, seed=8, metrics=None)
+    first = wfc.run()
+    grid = wfc._grid
+    second = wfc.run()
+    assert wfc._grid is grid
+    fresh = WFC((6, 6), patterns, propagation=propagation, seed=8, metrics=None)
+    expected = fresh.run()
+    for result in (first, second):
+        assert result[0] == expected[0] and (result[1] == expected[1]).all()
+    assert (wfc.wfc_tiles == fresh.wfc_tiles).all()
+    assert wfc.run_stats.attempts == fresh.run_stats.attempts
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_reset_restores_domains(circuit, propagation):
+    grid = _make_grid(circuit, (5, 5), propagation)
+    grid.reset()
+    full = grid.domains()
+    grid.collapse(12, 3)
+    grid.propagate(12)
+    assert not (grid.domains() == full).all()
+    grid.reset()
+    assert (grid.domains() == full).all() and full.all()
+    assert (grid.tiles() == -1).all() and not grid.is_collapsed
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_worklist_bookkeeping(circuit, propagation):
+    rng = np.random.default_rng(4)
+    grid = _make_grid(circuit, (6, 6), propagation)
+    grid.reset()
+    while not grid.is_collapsed:
+        domains = grid.domains()
+        index = int(rng.choice(np.flatnonzero(domains.sum(axis=1) > 1)))
+        grid.collapse(index, int(rng.choice(np.flatnonzero(domains[index]))))
+        valid = grid.propagate(index)
+        if propagation == 'stack': assert not any(grid._pending)
+        assert grid._remaining == np.count_nonzero(grid.domains().sum(axis=1) > 1)
+        if not valid: break
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_worklist_contradiction(trap, propagation):
+    grid = _make_grid(trap, (4, 4), propagation)
+    grid.reset()
+    grid.collapse(5, 1)
+    assert not grid.propagate(5)
+    assert grid.contradictions().size
+    if propagation == 'stack': assert not any(grid._pending)
+
+    grid.reset()
+    grid.collapse(5, 0)
+    assert grid.propagate(5)
+    assert not grid.contradictions().size
+    assert grid._remaining == np.count_nonzero(grid.domains().sum(axis=1) > 1)
+
+def test_load_reuses_cells(circuit):
+    grid = _make_grid(circuit, (4, 4), 'stack')
+    grid.reset()
+    cells = list(grid._cells)
+    domains = np.ones((16, len(circuit)), dtype=bool)
+    domains[:4, 5:] = False
+    domains[5] = False
+    domains[6, 1:] = False
+    for _ in range(2):
+        grid.load(domains)
+        assert all(cell is before for cell, before in zip(grid._cells, cells))
+        assert (grid.domains() == domains).all()
+        assert grid._cells[0]._options is grid._cells[3]._options
+        assert not grid._cells[5].is_valid and grid._cells[6].is_collapsed
+        assert grid._remaining == 15
+        grid.collapse(10, 2)
+        grid.propagate(10)
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from concurrent.futures import ThreadPoolExecutor
+
+import wfc.wfc as wfc_module
+
+from wfc.cell_image import TileImage
+from wfc.utils import render_tiles
+from wfc.wfc import WFC
+
+from conftest import valid_tiling
+
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_regenerate_keeps_outside(circuit, propagation):
+    wfc = WFC((10, 10), circuit, propagation=propagation, seed=3, metrics=None)
+    wfc.run()
+    before = wfc.wfc_tiles.copy()
+    region = np.zeros((10, 10), dtype=bool)
+    region[3:7, 2:8] = True
+    success, image = wfc.regenerate(region)
+    assert success and valid_tiling(wfc.wfc_tiles, circuit)
+    assert (wfc.wfc_tiles[~region] == before[~region]).all()
+    assert (image == render_tiles(wfc.wfc_tiles, [tile.image for tile in circuit])).all()
+
+def test_regenerate_given_tiles(circuit):
+    wfc = WFC((6, 6), circuit, seed=1, metrics=None)
+    wfc.run()
+    tiles = wfc.wfc_tiles.copy()
+    region = tiles == tiles[0, 0]
+    tiles[region] = -1
+    other = WFC((6, 6), circuit, seed=2, metrics=None)
+    assert other.regenerate(region, tiles)[0] and valid_tiling(other.wfc_tiles, circuit)
+
+def test_regenerate_rerolls(circuit):
+    region = np.zeros((8, 8), dtype=bool)
+    region[2:6, 2:7] = True
+    def _rolls() -> list[np.ndarray]:
+        wfc = WFC((8, 8), circuit, propagation='batched', seed=5, metrics=None)
+        wfc.run()
+        rolls = []
+        for _ in range(3):
+            wfc.regenerate(region)
+            rolls.append(wfc.wfc_tiles.copy())
+        return rolls
+    rolls = _rolls()
+    assert not (rolls[0] == rolls[1]).all() and not (rolls[1] == rolls[2]).all()
+    assert all((roll == again).all() for roll, again in zip(rolls, _rolls()))
+
+def test_regenerate_errors(circuit):
+    wfc = WFC((4, 4), circuit, metrics=None)
+    region = np.zeros((4, 4), dtype=bool)
+    with pytest.raises(ValueError): wfc.regenerate(region)
+    tiles = np.zeros((4, 4), dtype=int)
+    with pytest.raises(ValueError): wfc.regenerate(region[:3], tiles)
+    tiles[0, 0] = -1
+    with pytest.raises(ValueError): wfc.regenerate(region, tiles)
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_run_chunked(circuit, propagation):
+    wfc = WFC((9, 10), circuit, propagation=propagation, seed=2, metrics=None)
+    success, image = wfc.run_chunked((3, 4))
+    assert success and valid_tiling(wfc.wfc_tiles, circuit)
+    assert (image == render_tiles(wfc.wfc_tiles, [tile.image for tile in circuit])).all()
+
+    again = WFC((9, 10), circuit, propagation=propagation, seed=2, metrics=None)
+    with ThreadPoolExecutor(2) as executor:
+        again.run_chunked((3, 4), executor=executor)
+    assert (again.wfc_tiles == wfc.wfc_tiles).all()
+
+    success, _ = wfc.run()
+    assert success and valid_tiling(wfc.wfc_tiles, circuit)
+
+def test_run_chunked_errors(circuit):
+    wfc = WFC((6, 6), circuit, metrics=None)
+    with pytest.raises(TypeError):
+        wfc.run_chunked([4, 4])
+    with pytest.raises(TypeError):
+        wfc.run_chunked((4, 4.0))
+    with pytest.raises(ValueError):
+        wfc.run_chunked((0, 4))
+
+def test_run_chunked_unsolvable():
+    # tiles that fit next to nothing, every attempt fails
+    tiles = []
+    for value in (50, 100):
+        image = np.full((3, 3, 3), value, dtype='uint8')
+        image[0], image[-1] = 1, 2
+        image[1, 0], image[1, -1] = 3, 4
+        tiles.append(TileImage(image, 1))
+    wfc = WFC((4, 4), tiles, seed=0, metrics=None)
+    success, _ = wfc.run_chunked((2, 2), max_attempts=3)
+    assert not success and (wfc.wfc_tiles == -1).all()
+
+def test_run_chunked_failed_retry(circuit, monkeypatch):
+    calls = []
+    solve_region = wfc_module._solve_region
+    def _solve_region(patterns, tiles, region, *args):
+        calls.append(region.sum())
+        # the last chunk and its retries fail
+        if len(calls) < 4: return solve_region(patterns, tiles, region, *args)
+        tiles = tiles.copy()
+        tiles[region] = -1
+        return False, tiles
+    monkeypatch.setattr(wfc_module, '_solve_region', _solve_region)
+
+    wfc = WFC((6, 6), circuit, seed=0, metrics=None)
+    success, _ = wfc.run_chunked((3, 3), max_retries=2)
+    assert not success and len(calls) == 6 and calls[-1] > calls[3]
+    assert (wfc.wfc_tiles[3:, 3:] == -1).all()
+    solved = wfc.wfc_tiles.copy()
+    solved[3:, 3:] = 0
+    assert (solved >= 0).all()
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from wfc.replay import DecisionLog, Replay
+from wfc.wfc import WFC
+
+
+def _decisions(patterns, seed, count):
+    wfc = WFC((6, 6), patterns, seed=seed, record=True, metrics=None, frames=False)
+    wfc.run()
+    return [wfc.decision_log[i] for i in range(min(count, len(wfc.decision_log)))]
+
+@pytest.fixture(scope='module')
+def two_attempts(circuit):
+    """
+    A log of two attempts whose decisions come from two different runs.
+    """
+    log = DecisionLog(None, (6, 6))
+    for seed in (1, 2):
+        log.new_attempt()
+        for index, tile in _decisions(circuit, seed, 8): log.record(index, tile)
+    return log
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_scrub_across_attempts(circuit, two_attempts, propagation):
+    second = two_attempts.attempt_start(len(two_attempts) - 1)
+    replay = Replay(two_attempts, circuit, propagation=propagation, keyframe_interval=3)
+    for step in [*range(len(two_attempts)), *range(len(two_attempts) - 1, -1, -1), second - 1, second]:
+        fresh = Replay(two_attempts, circuit, propagation=propagation)
+        assert (replay.frame(step) == fresh.frame(step)).all(), step
+
+def test_frames_match_run(circuit):
+    wfc = WFC((6, 6), circuit, seed=5, record=True, metrics=None)
+    images = list(wfc)
+    assert wfc.decision_log.attempts == 1
+    replay = wfc.replay(keyframe_interval=4)
+    assert len(replay) == len(images)
+    for step in (0, 5, len(images) - 1, 3):
+        assert (replay.frame(step) == images[step]).all()
+
+def test_log_round_trip(tmp_path, two_attempts):
+    path = tmp_path / 'log.npz'
+    two_attempts.save(path)
+    log = DecisionLog.load(path)
+    assert len(log) == len(two_attempts) and log.attempts == 2
+    assert [log[i] for i in range(len(log))] == [two_attempts[i] for i in range(len(log))]
@@ -0,0 +1,100 @@
+import random as rand
+
+import numpy as np
+import pytest
+
+import wfc.restart as restart
+
+from types import SimpleNamespace
+
+from wfc._algos import _CellGrid, _WaveGrid, _compile_adjacency
+from wfc.restart import RestartPolicy
+from wfc.wfc import WFC
+
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_max_attempts(trap, propagation):
+    policy = RestartPolicy(max_attempts=3)
+    wfc = WFC((5, 5), trap, propagation=propagation, seed=0, metrics=None, restart_policy=policy)
+    success, _ = wfc.run()
+    history = policy.history
+    assert not success and wfc.run_stats.attempts == 3
+    assert [stats.attempt for stats in history] == [1, 2, 3]
+    assert not any(stats.success for stats in history)
+    assert all(stats.contradictions and stats.collapses >= 1 for stats in history)
+
+    contradictions = {cell for stats in history for cell in stats.contradictions}
+    hotspots = policy.hotspots(100)
+    assert hotspots and set(hotspots) == contradictions
+    heat = policy.heat
+    assert heat.shape == (5, 5) and heat[hotspots[0]] == heat.max()
+
+def test_heat_across_runs(trap):
+    policy = RestartPolicy(max_attempts=2, decay=0.)
+    wfc = WFC((5, 5), trap, seed=1, metrics=None, restart_policy=policy)
+    wfc.run()
+    # without decay, only the cells of the last attempt are hot
+    last = set(policy.history[-1].contradictions)
+    assert set(zip(*np.nonzero(policy.heat))) == last
+
+    wfc.output_dimension = (4, 6)
+    wfc.run()
+    assert policy.heat.shape == (4, 6)
+    policy.clear()
+    assert policy.heat is None and policy.history == [] and policy.hotspots() == []
+
+def test_time_budget(trap):
+    policy = RestartPolicy(time_budget=1e-9)
+    wfc = WFC((5, 5), trap, seed=0, metrics=None, restart_policy=policy)
+    success, _ = wfc.run()
+    assert not success and len(policy.history) == 1 and policy.expired
+
+def test_time_budget_ignores_pauses(circuit, monkeypatch):
+    clock = [0.]
+    monkeypatch.setattr(restart, 'time', SimpleNamespace(perf_counter=lambda: clock[0]))
+    policy = RestartPolicy(time_budget=1.)
+    wfc = WFC((6, 6), circuit, seed=0, metrics=None, restart_policy=policy)
+    wfc.step(1)
+    # paused between steps, as in the GUI
+    clock[0] += 10.
+    assert not policy.expired
+    assert wfc.step().finished
+    assert policy.history[-1].success and policy.history[-1].seconds == 0.
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_bias_throughout_attempt(circuit, propagation):
+    if propagation == 'stack': grid = _CellGrid(circuit, (5, 5), rand.Random(0))
+    else: grid = _WaveGrid(circuit, (5, 5), _compile_adjacency(circuit), rand.Random(0))
+    bias = np.zeros(25)
+    bias[[7, 8]] = 100., 50.
+    grid.reset()
+    grid.set_bias(bias)
+    assert grid.pop() == 7
+    grid.collapse(7)
+    grid.propagate(7)
+    # the neighbour keeps its bias after the propagation narrowed it
+    assert grid.pop() == 8
+
+    grid.reset()
+    assert grid.pop() == 0
+
+def test_success(circuit):
+    policy = RestartPolicy(max_attempts=5)
+    wfc = WFC((6, 6), circuit, seed=0, metrics=None, restart_policy=policy)
+    success, _ = wfc.run()
+    assert success and policy.history[-1].success
+    assert policy.history[-1].contradictions == ()
+
+@pytest.mark.parametrize('kwargs, error', [
+    ({'max_attempts': 0}, ValueError),
+    ({'max_attempts': 1.5}, TypeError),
+    ({'time_budget': 0}, ValueError),
+    ({'time_budget': '1'}, TypeError),
+    ({'hotspot_bias': -0.5}, ValueError),
+    ({'hotspot_bias': None}, TypeError),
+    ({'decay': -0.1}, ValueError),
+    ({'decay': '0.5'}, TypeError)
+])
+def test_validation(kwargs, error):
+    with pytest.raises(error):
+        RestartPolicy(**kwargs)
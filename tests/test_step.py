@@ -0,0 +1,34 @@
+import pytest
+
+from wfc.wfc import (
+    WFC,
+    CancellationToken,
+    CancelledError
+)
+
+
+def test_step_budget(circuit):
+    wfc = WFC((8, 8), circuit, seed=4, metrics=None)
+    progress = wfc.step(10)
+    assert progress.steps == 10 and not progress.finished and not progress.image is None
+    while not (progress := wfc.step(7)).finished: assert progress.steps == 7
+    assert (wfc.wfc_result[1] == WFC((8, 8), circuit, seed=4, metrics=None).run()[1]).all()
+
+def test_step_cancelled(circuit):
+    token = CancellationToken()
+    token.cancel()
+    wfc = WFC((8, 8), circuit, metrics=None)
+    assert wfc.step(token=token).steps == 0
+    with pytest.raises(CancelledError): wfc.run(token=token)
+
+def test_timeout_resumes(circuit):
+    expected = WFC((10, 10), circuit, seed=8, metrics=None, frames=False).run()
+    wfc = WFC((10, 10), circuit, seed=8, metrics=None, frames=False)
+    with pytest.raises(TimeoutError): wfc.run(timeout=1e-6)
+    assert wfc.run_stats.collapses >= 1
+    success, image = wfc.run()
+    assert success == expected[0] and (image == expected[1]).all()
+
+@pytest.mark.parametrize('value', [0, -1, 1.5])
+def test_bad_max_steps(circuit, value):
+    with pytest.raises((TypeError, ValueError)): WFC((4, 4), circuit, metrics=None).step(value)
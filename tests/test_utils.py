@@ -0,0 +1,62 @@
+import pytest
+
+from wfc import utils
+from wfc.cell_image import Direction
+from wfc.metrics import tileset_fingerprint
+from wfc.utils import load_patterns, load_tiles
+from wfc.wfc import WFC
+
+from conftest import CIRCUIT
+
+
+@pytest.fixture
+def decoded(monkeypatch):
+    """
+    The paths of the images decoded, as a list.
+    """
+    paths = []
+    read = utils._read_image
+    def _read_image(path):
+        paths.append(path)
+        return read(path)
+    monkeypatch.setattr(utils, '_read_image', _read_image)
+    return paths
+
+def test_load_orders(circuit):
+    eager = load_tiles(CIRCUIT, True, workers=0)
+    lazy = load_tiles(CIRCUIT, True, lazy=True, workers=2)
+    patterns = load_patterns(CIRCUIT, True, workers=4)
+    assert len(eager) == len(lazy) == len(patterns) == len(circuit)
+    for tile, lazy_tile, pattern in zip(eager, lazy, patterns):
+        assert (tile.image == pattern).all() and (lazy_tile.image == pattern).all()
+
+def test_mixed_adjacency(circuit):
+    lazy = load_tiles(CIRCUIT, True, lazy=True)
+    for direction in Direction:
+        for i in range(0, len(circuit), 5):
+            for j in range(len(circuit)):
+                expected = circuit[i].is_adjacent_to(circuit[j], direction)
+                assert circuit[i].is_adjacent_to(lazy[j], direction) == expected
+                assert lazy[i].is_adjacent_to(circuit[j], direction) == expected
+                assert lazy[i].is_adjacent_to(lazy[j], direction) == expected
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_lazy_run_decodes_used_tiles(decoded, propagation):
+    tiles = load_tiles(CIRCUIT, True, lazy=True, workers=0)
+    decoded.clear()
+    wfc = WFC((6, 6), tiles, propagation=propagation, seed=2, frames=False)
+    wfc.step(3)
+    assert not decoded
+    success, image = wfc.run()
+    # the result only needs the tiles it is made of, and the first tile for the shape of tiles
+    assert success and len(decoded) <= len(set(wfc.wfc_tiles.ravel().tolist())) + 1
+
+    eager = WFC((6, 6), load_tiles(CIRCUIT, True), propagation=propagation, seed=2, metrics=None)
+    assert (eager.run()[1] == image).all()
+
+def test_lazy_fingerprint(decoded):
+    tiles, again = load_tiles(CIRCUIT, True, lazy=True), load_tiles(CIRCUIT, True, lazy=True)
+    decoded.clear()
+    assert tileset_fingerprint(tiles) == tileset_fingerprint(again)
+    assert tileset_fingerprint(tiles) != tileset_fingerprint(tiles[::-1])
+    assert not decoded
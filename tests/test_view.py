@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from wfc._algos import _make_grid
+
+from wfc.wfc import WFC
+
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_view_windows(circuit, propagation):
+    wfc = WFC((9, 8), circuit, propagation=propagation, seed=1, metrics=None)
+    wfc.step(10)
+    tile_h, tile_w = circuit[0].image.shape[:2]
+    full, cells = wfc.view(), wfc.view(lod='cell')
+    assert full.shape == (9 * tile_h, 8 * tile_w, 3) and cells.shape == (9, 8, 3)
+    for rows, cols in [(slice(2, 5), slice(1, 7)), (slice(None), slice(6, None)), (slice(8, 9), slice(0, 1))]:
+        window = wfc.view(rows, cols)
+        start, stop, _ = rows.indices(9)
+        left, right, _ = cols.indices(8)
+        assert (window == full[start * tile_h:stop * tile_h, left * tile_w:right * tile_w]).all()
+        assert (wfc.view(rows, cols, lod='cell') == cells[rows, cols]).all()
+    strided = slice(None, None, 3), slice(1, None, 2)
+    assert (wfc.view(*strided, lod='cell') == cells[strided]).all()
+
+def test_view_cell_colours(circuit):
+    wfc = WFC((6, 6), circuit, propagation='batched', seed=0, metrics=None)
+    success, image = wfc.run()
+    assert success and (wfc.view() == image).all()
+    colours = np.array([tile.image.mean(axis=(0, 1)) for tile in circuit]).astype('uint8')
+    assert (wfc.view(lod='cell') == colours[wfc.wfc_tiles]).all()
+
+def test_view_errors(circuit):
+    wfc = WFC((4, 4), circuit, metrics=None)
+    with pytest.raises(ValueError):
+        wfc.view()
+    wfc.run()
+    with pytest.raises(ValueError):
+        wfc.view(lod='pixel')
+
+def test_overlapping_render(flowers):
+    rng = np.random.default_rng(5)
+    stack, batched = (_make_grid(flowers, (4, 5), mode) for mode in ('stack', 'batched'))
+    stack.reset()
+    batched.reset()
+    for _ in range(4):
+        domains = stack.domains()
+        open_cells = np.flatnonzero(domains.sum(axis=1) > 1)
+        if not open_cells.size: break
+        index = int(rng.choice(open_cells))
+        tile = int(rng.choice(np.flatnonzero(domains[index])))
+        stack.collapse(index, tile)
+        batched.collapse(index, tile)
+        if not (stack.propagate(index) and batched.propagate(index)): break
+        assert (stack.render() == batched.render()).all()
+        window = slice(1, 5), slice(2, None)
+        assert (stack.render(window) == batched.render(window)).all()
+
+@pytest.mark.parametrize('propagation', ['stack', 'batched'])
+def test_overlapping_result(flowers, propagation):
+    wfc = WFC((4, 4), flowers, propagation=propagation, seed=2, metrics=None)
+    success, image = wfc.run()
+    pixels = np.stack([tile.image[0, 0] for tile in flowers])
+    assert success and image.shape == (4, 4, 3)
+    assert (image == pixels[wfc.wfc_tiles]).all()
+
+def test_stack_wave_mirrors_cells(circuit):
+    rng = np.random.default_rng(1)
+    grid = _make_grid(circuit, (5, 5), 'stack')
+    indices = {id(tile): k for k, tile in enumerate(circuit)}
+    def _from_cells():
+        domains = np.zeros((25, len(circuit)), dtype=bool)
+        for i, cell in enumerate(grid._cells):
+            domains[i, [indices[id(tile)] for tile in cell.options]] = True
+        return domains
+
+    grid.reset()
+    while not grid.is_collapsed:
+        domains = grid.domains()
+        index = int(rng.choice(np.flatnonzero(domains.sum(axis=1) > 1)))
+        grid.collapse(index, int(rng.choice(np.flatnonzero(domains[index]))))
+        valid = grid.propagate(index)
+        assert (grid.wave == _from_cells()).all()
+        assert (grid._count == grid.wave.sum(axis=1)).all()
+        if not valid: break
+    grid.load(grid.domains())
+    assert (grid.wave == _from_cells()).all()